@@ -0,0 +1 @@
+"""Synthetic libraries (bench.synth) and the benchmark suite (bench.run)."""
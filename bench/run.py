@@ -0,0 +1,240 @@
+"""
+Benchmark suite.
+
+    python -m bench.run                    # run and compare with bench/baseline.json
+    python -m bench.run --save             # run and record a new baseline
+    python -m bench.run --only get_all_files,station_pick
+
+A synthetic library is generated from a seed into a temporary directory,
+each benchmark runs --repeat times and the median is compared with the
+baseline. A benchmark more than --tolerance slower than its baseline is a
+regression and makes the run exit with status 1. Baselines are only
+comparable on the same machine and with the same library parameters.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from bench.synth import make_library_db, make_mp3_corpus
+
+DEFAULT_BASELINE = str(Path(__file__).parent / "baseline.json")
+
+# Differences below this many seconds are noise, whatever the ratio
+_NOISE_FLOOR = 0.001
+
+
+# ── Benchmarks ────────────────────────────────────────────────────────────────
+
+def bench_get_all_files(ctx: dict) -> float:
+    from core.db import MusicDatabase
+    db = MusicDatabase(db_path=ctx["db_path"])
+    try:
+        start = time.perf_counter()
+        db.get_all_files()
+        return time.perf_counter() - start
+    finally:
+        db.close()
+
+
+def bench_get_feedback_history(ctx: dict) -> float:
+    """Mean time per call over 200 tracks, half of them with feedback."""
+    from core.db import MusicDatabase
+    db = MusicDatabase(db_path=ctx["db_path"])
+    try:
+        rng = random.Random(ctx["seed"])
+        rated = [r[0] for r in db.conn.execute("SELECT DISTINCT path FROM feedback")]
+        unrated = [r[0] for r in db.conn.execute("SELECT path FROM music_files LIMIT 1000")]
+        paths = rng.choices(rated, k=100) + rng.choices(unrated, k=100) if rated else rng.choices(unrated, k=200)
+        start = time.perf_counter()
+        for path in paths:
+            db.get_feedback_history(path)
+        return (time.perf_counter() - start) / len(paths)
+    finally:
+        db.close()
+
+
+def bench_scan_mp3_files(ctx: dict) -> float:
+    from scan_mp3_to_db import scan_mp3_files
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        scan_mp3_files(ctx["corpus"], print_metadata=False)
+        return time.perf_counter() - start
+
+
+async def _app_run(db_path: str) -> dict[str, float]:
+    """
+    Start the player headless once and time the first page of tracks, the
+    whole startup, playlist loading and station picks.
+    """
+    from core.audio import SimulatedAudioEngine
+    from core.library import TrackStore
+    from ui.app import MusicPlayerApp
+    from ui.playlist import TrackListView
+
+    start = time.perf_counter()
+    app = MusicPlayerApp(audio=SimulatedAudioEngine(), db_path=db_path)
+    # Synthetic tracks have no files; the integrity check would hide them all
+    app.session.check_interval = None
+    first_page = []
+    app.session.subscribe(
+        lambda event, data: first_page.append(time.perf_counter())
+        if event == "library" and data["count"] and not first_page else None
+    )
+    async with app.run_test(size=(140, 40)) as pilot:
+        await app.session.loaded.wait()
+        await pilot.pause()
+        timings = {
+            "app_first_page": first_page[0] - start if first_page else time.perf_counter() - start,
+            "app_startup": time.perf_counter() - start,
+        }
+
+        # A fresh store, so the sort order is computed as on a cold start
+        store = TrackStore(list(app.songs))
+        playlist = app.query_one(TrackListView)
+        start = time.perf_counter()
+        playlist.load_tracks(store)
+        timings["load_tracks"] = time.perf_counter() - start
+        playlist.load_tracks(app.songs)
+
+        picks = 20
+        start = time.perf_counter()
+        for _ in range(picks):
+            app.session.pick_station_song()
+        timings["station_pick"] = (time.perf_counter() - start) / picks
+    return timings
+
+
+def bench_app(ctx: dict) -> dict[str, float]:
+    return asyncio.run(_app_run(ctx["db_path"]))
+
+
+# name → function returning seconds, or a dict of name → seconds for
+# benchmarks that share one expensive setup
+BENCHMARKS = {
+    "get_all_files": bench_get_all_files,
+    "get_feedback_history": bench_get_feedback_history,
+    "scan_mp3_files": bench_scan_mp3_files,
+    "app": bench_app,
+}
+
+# Names reported by grouped benchmarks, for --only
+_GROUPS = {"app": ["app_first_page", "app_startup", "load_tracks", "station_pick"]}
+
+
+# ── Runner ────────────────────────────────────────────────────────────────────
+
+def run_benchmarks(ctx: dict, repeat: int, only: set[str] | None) -> dict[str, dict]:
+    """Run each selected benchmark `repeat` times; median and best time per name."""
+    samples: dict[str, list[float]] = {}
+    for key, func in BENCHMARKS.items():
+        names = _GROUPS.get(key, [key])
+        if only and key not in only and not only.intersection(names):
+            continue
+        for _ in range(repeat):
+            result = func(ctx)
+            if not isinstance(result, dict):
+                result = {key: result}
+            for name, seconds in result.items():
+                samples.setdefault(name, []).append(seconds)
+        for name in names:
+            print(f"  {name:<24} {statistics.median(samples[name]) * 1000:10.2f} ms", flush=True)
+    return {
+        name: {"median_s": statistics.median(s), "min_s": min(s), "runs": len(s)}
+        for name, s in samples.items()
+    }
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Print a comparison table and return the names of regressed benchmarks."""
+    regressions = []
+    print(f"\n  {'benchmark':<24} {'baseline':>12} {'current':>12} {'change':>8}")
+    for name, current in results.items():
+        base = baseline["results"].get(name)
+        if base is None:
+            print(f"  {name:<24} {'—':>12} {current['median_s'] * 1000:10.2f}ms {'new':>8}")
+            continue
+        ratio = current["median_s"] / base["median_s"] if base["median_s"] else float("inf")
+        regressed = (ratio > 1 + tolerance
+                     and current["median_s"] - base["median_s"] > _NOISE_FLOOR)
+        flag = "  REGRESSION" if regressed else ""
+        print(f"  {name:<24} {base['median_s'] * 1000:10.2f}ms {current['median_s'] * 1000:10.2f}ms "
+              f"{(ratio - 1) * 100:+7.1f}%{flag}")
+        if regressed:
+            regressions.append(name)
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Run the AIMU benchmark suite")
+    parser.add_argument("--tracks", type=int, default=10_000, help="Tracks in the synthetic library (default: 10000)")
+    parser.add_argument("--feedback", type=int, default=3_000, help="Feedback rows (default: 3000)")
+    parser.add_argument("--files", type=int, default=100, help="MP3 files for the scanner benchmark (default: 100)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per benchmark; the median is reported (default: 3)")
+    parser.add_argument("--only", type=str, default="", help="Comma-separated benchmark names to run")
+    parser.add_argument("--baseline", type=str, default=DEFAULT_BASELINE, help="Baseline JSON file")
+    parser.add_argument("--save", action="store_true", help="Record the results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="Allowed slowdown against the baseline before failing (default: 0.25 = 25%%)")
+    args = parser.parse_args()
+
+    params = {"tracks": args.tracks, "feedback": args.feedback, "files": args.files, "seed": args.seed}
+    only = {name.strip() for name in args.only.split(",") if name.strip()} or None
+
+    with tempfile.TemporaryDirectory(prefix="aimu-bench-") as tmp:
+        print(f"Generating library: {args.tracks} tracks, {args.feedback} feedback rows, {args.files} MP3 files...")
+        ctx = dict(params, db_path=str(Path(tmp) / "music.db"), corpus=str(Path(tmp) / "corpus"))
+        make_library_db(ctx["db_path"], args.tracks, args.feedback, args.seed)
+        make_mp3_corpus(ctx["corpus"], args.files, args.seed)
+        bench_scan_mp3_files(ctx)   # warm the page cache so the first run isn't an outlier
+
+        print(f"Running benchmarks ({args.repeat} runs each)...")
+        results = run_benchmarks(ctx, max(1, args.repeat), only)
+
+    report = {
+        "params": params,
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "recorded": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "results": results,
+    }
+
+    baseline_path = Path(args.baseline)
+    if args.save:
+        if baseline_path.exists() and only:
+            # Keep baselines for the benchmarks that weren't run
+            previous = json.loads(baseline_path.read_text())
+            if previous.get("params") == params:
+                report["results"] = {**previous["results"], **results}
+        baseline_path.write_text(json.dumps(report, indent=2))
+        print(f"\nBaseline written to {baseline_path}")
+        return 0
+
+    if not baseline_path.exists():
+        print(f"\nNo baseline at {baseline_path}; run with --save to record one.")
+        return 0
+    baseline = json.loads(baseline_path.read_text())
+    if baseline.get("params") != params:
+        print(f"\nBaseline was recorded with {baseline.get('params')}, not {params}; not comparing.")
+        return 2
+
+    regressions = compare(results, baseline, args.tolerance)
+    if regressions:
+        print(f"\n{len(regressions)} regression(s): {', '.join(regressions)}")
+        return 1
+    print("\nNo regressions.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
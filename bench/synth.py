@@ -0,0 +1,179 @@
+"""
+Synthetic libraries for benchmarking.
+
+    python -m bench.synth db PATH --tracks 50000 --feedback 20000
+    python -m bench.synth mp3 DIR --files 200
+
+Everything is generated from a seed, so the same arguments always produce
+the same library.
+"""
+
+import argparse
+import random
+from pathlib import Path
+
+import numpy as np
+from mutagen.easyid3 import EasyID3
+
+from core.db import MusicDatabase
+
+_GENRES = ["Rock", "Pop", "Jazz", "Electronic", "Hip-Hop", "Classical", "Folk", "Metal", "Ambient", "Soul"]
+_WORDS = [
+    "night", "blue", "fire", "river", "dream", "city", "light", "echo", "gold", "rain",
+    "heart", "summer", "ghost", "velvet", "machine", "ocean", "silver", "wild", "neon", "stone",
+]
+
+# One silent MPEG-1 Layer III frame: 128 kbps, 44.1 kHz, mono, no CRC.
+# Zeroed side info means every granule decodes to silence. 417 bytes, ~26 ms.
+_MP3_FRAME = bytes([0xFF, 0xFB, 0x90, 0xC0]) + bytes(417 - 4)
+_MP3_FRAME_SECONDS = 1152 / 44100
+
+
+def _name(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(_WORDS).capitalize() for _ in range(words))
+
+
+def _zipf_weights(n: int, skew: float) -> np.ndarray:
+    """Probability of each of n items when popularity falls off as 1 / rank**skew."""
+    weights = 1.0 / np.arange(1, n + 1) ** skew
+    return weights / weights.sum()
+
+
+def synthetic_tracks(n_tracks: int, seed: int = 0) -> tuple[list[str], list[dict]]:
+    """
+    Paths and scanner-style metadata for `n_tracks` tracks. Artists own a
+    Zipf-skewed share of the library (a few prolific artists, a long tail)
+    and albums hold about ten tracks each.
+    """
+    rng = random.Random(seed)
+    np_rng = np.random.default_rng(seed)
+    n_artists = max(1, n_tracks // 25)
+    artists = [f"{_name(rng, 2)} {i}" for i in range(n_artists)]
+    artist_of = np_rng.choice(n_artists, size=n_tracks, p=_zipf_weights(n_artists, 1.1))
+
+    paths, metadata = [], []
+    track_in_artist = [0] * n_artists
+    albums: dict[tuple[int, int], str] = {}
+    for i, a in enumerate(artist_of.tolist()):
+        number = track_in_artist[a]
+        track_in_artist[a] += 1
+        album = albums.get((a, number // 10))
+        if album is None:
+            album = albums[a, number // 10] = f"{_name(rng, 2)} {a}-{number // 10}"
+        title = _name(rng, rng.randint(1, 4))
+        paths.append(f"/music/{artists[a]}/{album}/{number % 10 + 1:02} {title} {i}.mp3")
+        metadata.append({
+            "duration": rng.randint(90, 420),
+            "bitrate": rng.choice([128, 192, 256, 320]),
+            "album": album,
+            "bpm": rng.randint(60, 180) if rng.random() < 0.7 else None,
+            "title": title,
+            "artist": artists[a],
+            "albumartist": artists[a],
+            "tracknumber": f"{number % 10 + 1}/10",
+            "genre": rng.choice(_GENRES),
+            "date": str(rng.randint(1960, 2024)),
+        })
+    return paths, metadata
+
+
+def synthetic_feedback(paths: list[str], n_feedback: int, seed: int = 0,
+                       skew: float = 0.9) -> list[tuple[str, int, int, int]]:
+    """
+    (path, mood_pleasure, mood_arousal, rating) rows. Which tracks get
+    feedback is Zipf-skewed — favourites are rated again and again while
+    most of the library is never rated — and each track's ratings cluster
+    around a mood of its own.
+    """
+    np_rng = np.random.default_rng(seed + 1)
+    n = len(paths)
+    if not n or not n_feedback:
+        return []
+    # Popularity rank is independent of library order
+    popular = np_rng.permutation(n)
+    picks = popular[np_rng.choice(n, size=n_feedback, p=_zipf_weights(n, skew))]
+
+    home_pleasure = np_rng.integers(1, 6, n)
+    home_arousal = np_rng.integers(1, 6, n)
+    taste = np_rng.integers(1, 4, n)
+    pleasure = np.clip(home_pleasure[picks] + np_rng.integers(-1, 2, n_feedback), 1, 5)
+    arousal = np.clip(home_arousal[picks] + np_rng.integers(-1, 2, n_feedback), 1, 5)
+    rating = np.clip(taste[picks] + np_rng.integers(-1, 2, n_feedback), 1, 3)
+
+    return [
+        (paths[i], p, a, r)
+        for i, p, a, r in zip(picks.tolist(), pleasure.tolist(), arousal.tolist(), rating.tolist())
+    ]
+
+
+def make_library_db(path: str, n_tracks: int, n_feedback: int, seed: int = 0) -> None:
+    """Create (or replace) a music.db at `path` with a synthetic library and feedback log."""
+    db_file = Path(path)
+    if db_file.exists():
+        db_file.unlink()
+    db = MusicDatabase(db_path=str(db_file))
+    try:
+        paths, metadata = synthetic_tracks(n_tracks, seed)
+        db.add_files_batch(paths, rating=1, metadata_list=metadata)
+        db.conn.executemany(
+            "INSERT INTO feedback (path, mood_pleasure, mood_arousal, rating) VALUES (?, ?, ?, ?)",
+            synthetic_feedback(paths, n_feedback, seed),
+        )
+        db.conn.commit()
+        db.rebuild_feedback_rollup()
+    finally:
+        db.close()
+
+
+def make_mp3_corpus(directory: str, n_files: int, seed: int = 0, seconds: float = 1.0) -> list[str]:
+    """
+    Write `n_files` short silent MP3s with ID3 tags into artist/album
+    folders under `directory`. The files are valid for mutagen and any
+    decoder. Returns their paths.
+    """
+    paths, metadata = synthetic_tracks(n_files, seed)
+    frame_count = max(1, round(seconds / _MP3_FRAME_SECONDS))
+    audio = _MP3_FRAME * frame_count
+    root = Path(directory)
+    written = []
+    for track_path, meta in zip(paths, metadata):
+        file_path = root / track_path.lstrip("/").removeprefix("music/")
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+        file_path.write_bytes(audio)
+
+        tags = EasyID3()
+        for key in ("title", "artist", "album", "albumartist", "tracknumber", "genre", "date"):
+            tags[key] = meta[key]
+        if meta["bpm"] is not None:
+            tags["bpm"] = str(meta["bpm"])
+        tags.save(str(file_path))
+        written.append(str(file_path))
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic AIMU libraries for benchmarking")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    db_parser = sub.add_parser("db", help="Create a synthetic music.db")
+    db_parser.add_argument("path", help="Database file to create (replaced if it exists)")
+    db_parser.add_argument("--tracks", type=int, default=10_000, help="Number of tracks (default: 10000)")
+    db_parser.add_argument("--feedback", type=int, default=3_000, help="Number of feedback rows (default: 3000)")
+    db_parser.add_argument("--seed", type=int, default=0)
+
+    mp3_parser = sub.add_parser("mp3", help="Create a folder of tagged silent MP3 files")
+    mp3_parser.add_argument("directory", help="Folder to write into")
+    mp3_parser.add_argument("--files", type=int, default=100, help="Number of files (default: 100)")
+    mp3_parser.add_argument("--seed", type=int, default=0)
+
+    args = parser.parse_args()
+    if args.command == "db":
+        make_library_db(args.path, args.tracks, args.feedback, args.seed)
+        print(f"Wrote {args.tracks} tracks and {args.feedback} feedback rows to {args.path}")
+    else:
+        written = make_mp3_corpus(args.directory, args.files, args.seed)
+        print(f"Wrote {len(written)} MP3 files under {args.directory}")
+
+
+if __name__ == "__main__":
+    main()
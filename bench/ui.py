@@ -0,0 +1,284 @@
+"""
+Headless UI benchmark.
+
+    python -m bench.ui                          # all scenarios, report to bench/ui_report.json
+    python -m bench.ui --only scroll,station --rows 2000
+    python -m bench.ui --no-alloc               # skip the allocation pass
+
+Drives the player through Textual's pilot against a synthetic library and
+the simulated audio engine, scripting the sessions a user actually has:
+scrolling the playlist, rating tracks, switching station mode on and off
+and letting the player auto-advance through an evening of tracks.
+
+For each scenario the report holds
+  * frame times — every screen update and layout pass, and the render
+    cost of each widget class (TrackInfoPanel, ParticleField, ...);
+  * event-loop lag — how late a probe task that sleeps every few
+    milliseconds wakes up, i.e. how long the UI could not react to input;
+  * allocations — peak and retained memory and the top allocation sites,
+    measured in a second pass under tracemalloc so that its overhead
+    does not distort the timings.
+"""
+
+import argparse
+import asyncio
+import json
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from textual import events
+
+from bench.synth import make_library_db
+from core.profiler import Histogram, Profiler
+
+DEFAULT_REPORT = str(Path(__file__).parent / "ui_report.json")
+
+# Terminal size the app is driven at
+_SIZE = (140, 40)
+
+# How often the lag probe wakes up, in seconds
+_PROBE_INTERVAL = 0.005
+
+# Allocation sites listed per scenario
+_TOP_SITES = 5
+
+
+# ── Scenarios ─────────────────────────────────────────────────────────────────
+# Each takes the running app, its pilot and the parsed arguments.
+
+async def _press(app, pilot, *keys: str) -> None:
+    """
+    Send keys one at a time, each as soon as the app has handled the last.
+    pilot.press() waits for the whole process to go idle after every key,
+    which with animations running takes most of a second.
+    """
+    for key in keys:
+        app.post_message(events.Key(key, key if len(key) == 1 else None))
+        await pilot.pause(0)
+
+
+async def scenario_scroll(app, pilot, args) -> None:
+    """Page down through --rows playlist rows, then step back up 500 rows a key at a time."""
+    from ui.playlist import TrackListView
+    playlist = app.query_one(TrackListView)
+    playlist.focus()
+    await _press(app, pilot, "home")
+    page = max(1, playlist.scrollable_content_region.height - 1)
+    await _press(app, pilot, *["pagedown"] * -(-args.rows // page))
+    await _press(app, pilot, *["up"] * 500)
+
+
+async def scenario_feedback(app, pilot, args) -> None:
+    """Open the feedback modal --modals times, saving every other one."""
+    for i in range(args.modals):
+        await _press(app, pilot, "down", "f", "right", "ctrl+s" if i % 2 else "escape")
+
+
+async def scenario_station(app, pilot, args) -> None:
+    """Switch station mode on (through the mood modal) and off again --toggles times."""
+    for _ in range(args.toggles):
+        await _press(app, pilot, "x", "right", "ctrl+s")
+        await pilot.pause(0.1)   # a moment of the station view animating
+        await _press(app, pilot, "x")
+
+
+async def scenario_auto_advance(app, pilot, args) -> None:
+    """Let --advance tracks play to the end and the player move on to the next."""
+    if app.current_index < 0:
+        await app.play_track(int(app.session.queue[0]))
+    for _ in range(args.advance):
+        app.audio.seek_relative(24 * 3600)
+        # What the 0.5 s status poll does; called directly so the run isn't paced by it
+        app.check_playback_status()
+        if app.session.advancing is not None:
+            await app.session.advancing
+        await pilot.pause(0)
+
+
+SCENARIOS = {
+    "scroll": scenario_scroll,
+    "feedback": scenario_feedback,
+    "station": scenario_station,
+    "auto_advance": scenario_auto_advance,
+}
+
+
+# ── Measurement ───────────────────────────────────────────────────────────────
+
+async def _lag_probe(histogram: Histogram, stop: asyncio.Event) -> None:
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        start = loop.time()
+        await asyncio.sleep(_PROBE_INTERVAL)
+        histogram.add(max(0.0, loop.time() - start - _PROBE_INTERVAL))
+
+
+def _install(profiler: Profiler) -> None:
+    from textual.screen import Screen
+    from textual.widget import Widget
+    # A screen update composites dirty regions and writes them to the driver;
+    # a layout pass also re-arranges widgets first
+    profiler.instrument(Screen, ["_compositor_refresh", "_refresh_layout"], "screen")
+    profiler.instrument_by_class(Widget, "render_lines", "render")
+
+
+def _timings(profiler: Profiler, lag: Histogram, wall: float) -> dict:
+    report = profiler.report()
+    return {
+        "wall_s": wall,
+        "frames": report.get("screen._compositor_refresh", Histogram().summary()),
+        "layout": report.get("screen._refresh_layout", Histogram().summary()),
+        "loop_lag": lag.summary(),
+        "render": {
+            name.removeprefix("render."): summary
+            for name, summary in report.items() if name.startswith("render.")
+        },
+    }
+
+
+def _allocations(before: tracemalloc.Snapshot, after: tracemalloc.Snapshot, peak: int) -> dict:
+    filters = [tracemalloc.Filter(False, tracemalloc.__file__)]
+    diff = after.filter_traces(filters).compare_to(before.filter_traces(filters), "lineno")
+    net = sum(stat.size_diff for stat in diff)
+    top = sorted(diff, key=lambda stat: -stat.size_diff)[:_TOP_SITES]
+    return {
+        "peak_kib": peak / 1024,
+        "net_kib": net / 1024,
+        "blocks": sum(stat.count_diff for stat in diff),
+        "top": [
+            {
+                "site": f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+                "size_kib": stat.size_diff / 1024,
+                "count": stat.count_diff,
+            }
+            for stat in top
+        ],
+    }
+
+
+async def _session(db_path: str, names: list[str], args, trace: bool) -> dict[str, dict]:
+    """
+    Start the player once and run each scenario in turn. Returns timings
+    per scenario, or allocation statistics when `trace` is set.
+    """
+    from core.audio import SimulatedAudioEngine
+    from ui.app import MusicPlayerApp
+
+    profiler = Profiler()
+    if not trace:
+        _install(profiler)
+    results = {}
+    try:
+        app = MusicPlayerApp(audio=SimulatedAudioEngine(), db_path=db_path)
+        # Synthetic tracks have no files; the integrity check would hide them all
+        app.session.check_interval = None
+        async with app.run_test(size=_SIZE) as pilot:
+            await app.session.loaded.wait()
+            await pilot.pause()
+            for name in names:
+                profiler.histograms.clear()
+                lag = Histogram()
+                stop = asyncio.Event()
+                if trace:
+                    tracemalloc.start()
+                    before = tracemalloc.take_snapshot()
+                probe = asyncio.create_task(_lag_probe(lag, stop))
+                start = time.perf_counter()
+
+                await SCENARIOS[name](app, pilot, args)
+                await pilot.pause()
+
+                wall = time.perf_counter() - start
+                stop.set()
+                await probe
+                if trace:
+                    after = tracemalloc.take_snapshot()
+                    peak = tracemalloc.get_traced_memory()[1]
+                    tracemalloc.stop()
+                    results[name] = _allocations(before, after, peak)
+                else:
+                    results[name] = _timings(profiler, lag, wall)
+    finally:
+        profiler.restore()
+    return results
+
+
+# ── Report ────────────────────────────────────────────────────────────────────
+
+def _print_summary(results: dict) -> None:
+    print(f"\n  {'scenario':<14} {'wall s':>8} {'frames':>7} {'p50 ms':>8} {'p95 ms':>8} "
+          f"{'max ms':>8} {'lag p95':>8} {'lag max':>8} {'peak KiB':>9}")
+    for name, r in results.items():
+        f, lag = r["frames"], r["loop_lag"]
+        peak = f"{r['allocations']['peak_kib']:9.0f}" if "allocations" in r else f"{'—':>9}"
+        print(f"  {name:<14} {r['wall_s']:8.2f} {f['count']:7} {f['p50_ms']:8.2f} {f['p95_ms']:8.2f} "
+              f"{f['max_ms']:8.2f} {lag['p95_ms']:8.2f} {lag['max_ms']:8.2f} {peak}")
+
+    print(f"\n  {'widget render':<28} {'calls':>8} {'p95 ms':>8} {'total ms':>10}")
+    totals: dict[str, dict] = {}
+    for r in results.values():
+        for widget, s in r["render"].items():
+            t = totals.setdefault(widget, {"count": 0, "total_ms": 0.0, "p95_ms": 0.0})
+            t["count"] += s["count"]
+            t["total_ms"] += s["total_ms"]
+            t["p95_ms"] = max(t["p95_ms"], s["p95_ms"])
+    for widget, t in sorted(totals.items(), key=lambda item: -item[1]["total_ms"])[:10]:
+        print(f"  {widget:<28} {t['count']:8} {t['p95_ms']:8.2f} {t['total_ms']:10.1f}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the AIMU interface headless")
+    parser.add_argument("--tracks", type=int, default=10_000, help="Tracks in the synthetic library (default: 10000)")
+    parser.add_argument("--feedback", type=int, default=3_000, help="Feedback rows (default: 3000)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--rows", type=int, default=10_000, help="Playlist rows to page through (default: 10000)")
+    parser.add_argument("--modals", type=int, default=20, help="Feedback modals to open (default: 20)")
+    parser.add_argument("--toggles", type=int, default=10, help="Station mode round trips (default: 10)")
+    parser.add_argument("--advance", type=int, default=100, help="Tracks to auto-advance through (default: 100)")
+    parser.add_argument("--only", type=str, default="", help=f"Comma-separated scenarios ({', '.join(SCENARIOS)})")
+    parser.add_argument("--no-alloc", action="store_true", help="Skip the tracemalloc pass")
+    parser.add_argument("--out", type=str, default=DEFAULT_REPORT, help="Report JSON file")
+    args = parser.parse_args()
+
+    names = [name.strip() for name in args.only.split(",") if name.strip()] or list(SCENARIOS)
+    unknown = [name for name in names if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenario(s): {', '.join(unknown)}")
+
+    with tempfile.TemporaryDirectory(prefix="aimu-bench-") as tmp:
+        print(f"Generating library: {args.tracks} tracks, {args.feedback} feedback rows...")
+        db_path = str(Path(tmp) / "music.db")
+        make_library_db(db_path, args.tracks, args.feedback, args.seed)
+
+        print(f"Timing {', '.join(names)}...", flush=True)
+        results = asyncio.run(_session(db_path, names, args, trace=False))
+        if not args.no_alloc:
+            # Feedback saved by the first pass stays in the library; it doesn't
+            # change what the second pass allocates
+            print("Tracing allocations...", flush=True)
+            for name, allocations in asyncio.run(_session(db_path, names, args, trace=True)).items():
+                results[name]["allocations"] = allocations
+
+    _print_summary(results)
+
+    report = {
+        "params": {
+            "tracks": args.tracks, "feedback": args.feedback, "seed": args.seed, "size": list(_SIZE),
+            "rows": args.rows, "modals": args.modals, "toggles": args.toggles, "advance": args.advance,
+        },
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "recorded": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "scenarios": results,
+    }
+    Path(args.out).write_text(json.dumps(report, indent=2))
+    print(f"\nReport written to {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,3 +1,5 @@
+import os
+import tempfile
 from pathlib import Path
 
 # --- CONFIGURATION ---
@@ -8,5 +10,96 @@ DB_PATH = str(Path(__file__).parent / "music.db")
 # Path to the keybindings override file
 KEYBINDINGS_PATH = str(Path(__file__).parent / "keybindings.json")
 
+# Worker threads with a read connection each for the player's database
+# access (core/async_db.py); writes go through one more, dedicated thread
+DB_READERS = 2
+
+# The player loads the library in chunks so the first page shows at once:
+# LIBRARY_FIRST_CHUNK tracks first, then twice as many each time, up to
+# LIBRARY_MAX_CHUNK
+LIBRARY_FIRST_CHUNK = 200
+LIBRARY_MAX_CHUNK = 8192
+
+# Read-ahead cache for libraries on a network mount (core/cache.py): the
+# track expected to play next is copied into CACHE_DIR in the background
+# and played from there, keeping at most CACHE_MAX_BYTES on disk. None
+# plays every track from where it is
+CACHE_DIR = None          # e.g. "~/.cache/aimu/tracks"
+CACHE_MAX_BYTES = 2 * 1024 ** 3
+
+# Library integrity check (core/integrity.py): how many files are checked
+# at once, and how often the player re-checks the whole library, in
+# seconds. Tracks whose files are gone are hidden and never picked
+INTEGRITY_WORKERS = 16
+INTEGRITY_INTERVAL = 3600
+
+# Duplicate detection (core/duplicates.py, scan --dedupe): tracks whose
+# acoustic signatures differ in at most this fraction of their bits, and
+# whose lengths differ by at most this many seconds, are the same song
+DUPLICATE_MAX_DISTANCE = 0.12
+DUPLICATE_MAX_LENGTH_DIFFERENCE = 5
+
 # Optional: Set the initial volume (0 to 100)
 DEFAULT_VOLUME = 80
+
+# Animation governor (ui/animation.py): the share of one CPU core that
+# decorative animations may use in total, how long without input before
+# the player counts as idle, and how much slower animations run when idle,
+# on battery or over SSH
+ANIMATION_CPU_BUDGET = 0.05
+ANIMATION_IDLE_AFTER = 30.0
+ANIMATION_SLOWDOWN = 3.0
+
+# Station view spectrum analyzer (core/spectrum.py, needs ffmpeg): number
+# of frequency bands, and how many times a second they are recomputed
+SPECTRUM_BANDS = 32
+SPECTRUM_FPS = 30
+
+# Where main.py --profile writes its latency report on exit
+PROFILE_PATH = str(Path(__file__).parent / "profile.json")
+
+# Structured debug log written with --debug (JSON lines, rotated by size).
+# DEBUG_LOG_MODE chooses which station candidates each pick records:
+# "topk" (the DEBUG_LOG_TOP_K highest weighted), "sample" (DEBUG_LOG_SAMPLE
+# chosen at random) or "all"
+DEBUG_LOG_PATH = str(Path(__file__).parent / "debug.jsonl")
+DEBUG_LOG_MODE = "topk"
+DEBUG_LOG_TOP_K = 50
+DEBUG_LOG_SAMPLE = 50
+DEBUG_LOG_MAX_BYTES = 5_000_000
+DEBUG_LOG_BACKUPS = 3
+
+# Station scoring (core/station.py). "nearest" scores a track by its single
+# feedback entry closest to the session mood; "kernel" combines all of its
+# entries, weighted by a Gaussian of mood distance with the given bandwidth
+# (in mood steps). STATION_KERNEL_PRIOR is the weight of neutral evidence
+# every track starts with, so repeated agreeing ratings add confidence.
+# STATION_HALF_LIFE_DAYS halves the weight of feedback for every so many
+# days of age (kernel mode only); None disables decay. Age is counted per
+# track and mood cell from its newest rating, as the rollup keeps no more,
+# so a fresh rating in a cell renews the older ones in it too
+STATION_SCORING = "nearest"
+STATION_KERNEL_BANDWIDTH = 1.0
+STATION_KERNEL_PRIOR = 0.5
+STATION_HALF_LIFE_DAYS = None
+
+# Tracks without feedback borrow the score of their album, or failing that
+# their artist, at this fraction of its strength; 0 disables the priors
+STATION_PRIOR_WEIGHT = 0.5
+
+# Tracks with neither own nor album/artist feedback borrow the score of
+# tracks with a similar measured tempo and loudness (scan --analyze), at
+# this fraction of its strength; 0 disables it
+STATION_SOUND_PRIOR_WEIGHT = 0.25
+
+# Playback levels every analysed track to this integrated loudness (LUFS;
+# -18 is the ReplayGain 2 reference) by scaling the volume, without letting
+# its peak clip. None plays every track at its own level
+LOUDNESS_TARGET = -18.0
+
+# Playback daemon (core/daemon.py): the Unix socket it listens on and
+# clients attach to, and how often it polls playback to auto-advance
+DAEMON_SOCKET_PATH = os.path.join(
+    os.environ.get("XDG_RUNTIME_DIR") or tempfile.gettempdir(), f"aimu-{os.getuid()}.sock"
+)
+DAEMON_TICK = 0.5
@@ -0,0 +1,379 @@
+"""
+Offline audio analysis.
+
+Tracks are decoded once with ffmpeg (an optional dependency; nothing here
+runs without it) and reduced to a compact envelope: WAVEFORM_BINS bins of
+peak and RMS level, one byte each. At 256 bins that is 512 bytes per track,
+small enough to keep in the database and load on every track change.
+
+analyze_features() measures what playback and station mode use: the
+integrated loudness after ITU-R BS.1770 (from which playback derives a
+ReplayGain-style gain), the sample peak, an estimated tempo and an RMS
+energy profile. It is pure NumPy on the decoded samples, so a process pool
+runs it in parallel (scan_mp3_to_db.py --analyze).
+
+acoustic_signature() reduces a track to SIGNATURE_BITS bits that survive
+re-encoding, another bitrate and added silence, for finding duplicate
+copies of a song (core/duplicates.py, scan_mp3_to_db.py --dedupe).
+"""
+
+import hashlib
+import os
+import shutil
+import subprocess
+
+import numpy as np
+
+# Number of envelope bins per track, regardless of its length
+WAVEFORM_BINS = 256
+
+# Decoding rate for analysis — an envelope needs no more than this
+ANALYSIS_SAMPLE_RATE = 8000
+
+# Decoding rate for feature analysis: enough bandwidth for the loudness
+# weighting and onset detection, half the data of 44.1 kHz
+FEATURE_SAMPLE_RATE = 22050
+
+# Number of energy profile bins per track, one byte each
+ENERGY_BINS = 64
+
+# Energy profile levels are stored from this many dB below full scale up to 0
+ENERGY_FLOOR_DB = 60.0
+
+# Least variation of the onset strength, relative to its mean, that can carry a beat
+_MIN_ONSET_CONTRAST = 0.25
+
+# Weakest onset autocorrelation, relative to lag 0, that counts as a beat
+_MIN_PERIODICITY = 0.2
+
+# Bytes read from the start, middle and end of a file for its fingerprint
+_FINGERPRINT_SPAN = 64 * 1024
+
+# Bits per acoustic signature
+SIGNATURE_BITS = 256
+
+# A signature describes this many log-spaced bands over this many equal
+# slices of the track, between these frequencies in Hz
+_SIGNATURE_BANDS = 16
+_SIGNATURE_SLICES = 48
+_SIGNATURE_LOWEST, _SIGNATURE_HIGHEST = 100.0, 3500.0
+
+# Leading and trailing frames this many dB below the track's loudest are
+# silence, left out of the signature
+_SIGNATURE_SILENCE_DB = 45.0
+
+# Fixed seed of the signature's random hyperplanes: every signature ever
+# stored must have been made with the same ones
+_SIGNATURE_SEED = 0x41494D55
+
+
+def ffmpeg_available() -> bool:
+    return shutil.which("ffmpeg") is not None
+
+
+def decode_pcm(path: str, sample_rate: int = ANALYSIS_SAMPLE_RATE, channels: int = 1) -> np.ndarray:
+    """
+    Decode an audio file to 16-bit PCM at `sample_rate`: a 1-D array for
+    mono, else one row per channel. Raises RuntimeError if ffmpeg fails or
+    produces no audio.
+    """
+    result = subprocess.run(
+        ["ffmpeg", "-v", "error", "-nostdin", "-i", path,
+         "-f", "s16le", "-ac", str(channels), "-ar", str(sample_rate), "-"],
+        capture_output=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.decode(errors="replace").strip() or "ffmpeg failed")
+    samples = np.frombuffer(result.stdout, dtype=np.int16)
+    if len(samples) < channels:
+        raise RuntimeError("no audio decoded")
+    if channels == 1:
+        return samples
+    return samples[: len(samples) - len(samples) % channels].reshape(-1, channels).T
+
+
+def compute_envelope(samples: np.ndarray, bins: int = WAVEFORM_BINS) -> bytes:
+    """
+    Reduce PCM samples to `bins` (peak, RMS) pairs, interleaved as bytes.
+    Levels are scaled to the track's own loudest peak so quiet recordings
+    still draw a full-height waveform.
+    """
+    x = np.abs(samples.astype(np.float32))
+    if len(x) < bins:
+        x = np.pad(x, (0, bins - len(x)))
+    # Equal-sized bins; the last few samples that don't divide evenly are dropped
+    x = x[: len(x) - len(x) % bins].reshape(bins, -1)
+
+    peak = x.max(axis=1)
+    rms = np.sqrt((x * x).mean(axis=1))
+    scale = peak.max() or 1.0
+
+    envelope = np.empty(bins * 2, dtype=np.uint8)
+    envelope[0::2] = np.round(peak / scale * 255)
+    envelope[1::2] = np.round(rms / scale * 255)
+    return envelope.tobytes()
+
+
+def decode_envelope(data: bytes) -> tuple[np.ndarray, np.ndarray]:
+    """Unpack an envelope into (peak, rms) float arrays in 0.0–1.0."""
+    envelope = np.frombuffer(data, dtype=np.uint8).astype(np.float32) / 255.0
+    return envelope[0::2], envelope[1::2]
+
+
+def analyze_waveform(path: str, bins: int = WAVEFORM_BINS) -> bytes:
+    """Decode `path` and return its envelope. Raises RuntimeError on decode failure."""
+    return compute_envelope(decode_pcm(path), bins)
+
+
+# ── Features ──────────────────────────────────────────────────────────────────
+
+def file_fingerprint(path: str) -> str:
+    """
+    Identify a file by its size and the bytes at its start, middle and end,
+    so analysis results survive renames and rescans without reading whole
+    files. Raises OSError if the file can't be read.
+    """
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        digest.update(str(size).encode())
+        for offset in (0, size // 2, size - _FINGERPRINT_SPAN):
+            f.seek(max(0, offset))
+            digest.update(f.read(_FINGERPRINT_SPAN))
+    return digest.hexdigest()
+
+
+def _biquad_power(b, a, freqs: np.ndarray, sample_rate: int) -> np.ndarray:
+    """|H(f)|² of a biquad with coefficients b, a at `freqs` Hz."""
+    z = np.exp(-2j * np.pi * freqs / sample_rate)
+    h = (b[0] + b[1] * z + b[2] * z * z) / (a[0] + a[1] * z + a[2] * z * z)
+    return np.abs(h) ** 2
+
+
+def k_weighting(freqs: np.ndarray, sample_rate: int) -> np.ndarray:
+    """
+    Power response of the BS.1770 K-weighting filter at `freqs`: a +4 dB
+    shelf above ~1.7 kHz (the head's acoustic effect) followed by a high
+    pass at ~38 Hz. The biquads are redesigned for `sample_rate` from the
+    analogue parameters behind the standard's 48 kHz coefficients.
+    """
+    k = np.tan(np.pi * 1681.974450955533 / sample_rate)
+    q = 0.7071752369554196
+    vh = 10 ** (3.999843853973347 / 20)
+    vb = vh ** 0.4996667741545416
+    a0 = 1 + k / q + k * k
+    shelf_b = ((vh + vb * k / q + k * k) / a0, 2 * (k * k - vh) / a0, (vh - vb * k / q + k * k) / a0)
+    shelf_a = (1.0, 2 * (k * k - 1) / a0, (1 - k / q + k * k) / a0)
+
+    k = np.tan(np.pi * 38.13547087602444 / sample_rate)
+    q = 0.5003270373238773
+    a0 = 1 + k / q + k * k
+    pass_b = (1.0, -2.0, 1.0)
+    pass_a = (1.0, 2 * (k * k - 1) / a0, (1 - k / q + k * k) / a0)
+    return _biquad_power(shelf_b, shelf_a, freqs, sample_rate) * _biquad_power(pass_b, pass_a, freqs, sample_rate)
+
+
+def integrated_loudness(channels: np.ndarray, sample_rate: int) -> float:
+    """
+    Integrated loudness in LUFS of int16 PCM, one row per channel, after
+    BS.1770: K-weighted mean square over 400 ms blocks overlapping by 75%,
+    gated at −70 LUFS and then 10 LU below the mean of what is left.
+
+    The filter is applied in the frequency domain to 100 ms segments, four
+    of which make a block, rather than as a running IIR filter; that keeps
+    it to a few vectorised FFTs and differs from the exact filter by well
+    under the 1 dB that matters for levelling playback. Returns -inf for
+    silence.
+    """
+    segment = sample_rate // 10
+    count = channels.shape[1] // segment
+    if count < 4:
+        return float("-inf")
+    weight = k_weighting(np.fft.rfftfreq(segment, 1 / sample_rate), sample_rate)
+    # One-sided spectrum: every bin but DC (and Nyquist, for even lengths) stands for two
+    weight[1:(segment + 1) // 2] *= 2
+    power = np.zeros(count)
+    for channel in channels:
+        x = channel[: count * segment].reshape(count, segment).astype(np.float32) / 32768.0
+        spectrum = np.fft.rfft(x, axis=1)
+        power += (np.abs(spectrum) ** 2 @ weight) / segment ** 2
+    blocks = np.convolve(power, np.full(4, 0.25), mode="valid")
+
+    with np.errstate(divide="ignore"):
+        levels = -0.691 + 10 * np.log10(blocks)
+    gated = blocks[levels > -70.0]
+    if not len(gated):
+        return float("-inf")
+    relative = -0.691 + 10 * np.log10(gated.mean()) - 10.0
+    gated = blocks[levels > max(-70.0, relative)]
+    return float(-0.691 + 10 * np.log10(gated.mean()))
+
+
+def estimate_tempo(samples: np.ndarray, sample_rate: int, low: float = 60.0, high: float = 200.0) -> float | None:
+    """
+    Estimated tempo in BPM of mono PCM, or None if no beat stands out.
+
+    The onset strength (the rise in log-magnitude spectrum from frame to
+    frame) is autocorrelated, and the lag with the strongest periodicity
+    between `low` and `high` BPM wins, weighted towards 120 BPM so that a
+    beat is not reported at double or half speed without reason.
+    """
+    frame, hop = 1024, 512
+    count = 1 + (len(samples) - frame) // hop
+    if count < 64:
+        return None
+    frames = np.lib.stride_tricks.sliding_window_view(samples, frame)[::hop][:count]
+    magnitude = np.log1p(np.abs(np.fft.rfft(frames.astype(np.float32) * np.hanning(frame), axis=1)) / 1024)
+    onset = np.maximum(0.0, np.diff(magnitude, axis=0)).sum(axis=1)
+    # A steady sound has a flat onset curve: any periodicity in it is noise
+    if onset.std() < _MIN_ONSET_CONTRAST * onset.mean():
+        return None
+    # Widen each onset over a few frames, so a beat period that falls
+    # between two whole frames still lines up with itself
+    onset = np.convolve(onset - onset.mean(), np.hanning(7), mode="same")
+
+    size = 1 << (2 * len(onset) - 1).bit_length()
+    spectrum = np.fft.rfft(onset, size)
+    autocorr = np.fft.irfft(spectrum * np.conj(spectrum), size)[: len(onset)]
+    if autocorr[0] <= 0:
+        return None
+    fps = sample_rate / hop
+    lags = np.arange(max(1, int(fps * 60 / high)), min(len(onset) - 1, int(fps * 60 / low) + 1))
+    if len(lags) < 3:
+        return None
+    bpm = fps * 60 / lags
+    strength = autocorr[lags] * np.exp(-0.5 * np.log2(bpm / 120.0) ** 2)
+    best = int(np.argmax(strength))
+    # Steady sound correlates with itself weakly at every lag
+    if autocorr[lags[best]] < _MIN_PERIODICITY * autocorr[0]:
+        return None
+    # Refine the lag between its neighbours with a parabola through three points
+    lag = float(lags[best])
+    if 0 < best < len(lags) - 1:
+        left, mid, right = strength[best - 1], strength[best], strength[best + 1]
+        denominator = left - 2 * mid + right
+        if denominator < 0:
+            lag += 0.5 * (left - right) / denominator
+    return float(fps * 60 / lag)
+
+
+def energy_profile(samples: np.ndarray, bins: int = ENERGY_BINS) -> bytes:
+    """
+    RMS level of mono PCM in `bins` equal slices of the track, one byte
+    each from ENERGY_FLOOR_DB below full scale (0) to full scale (255).
+    Unlike the waveform envelope it is not scaled to the track's own peak.
+    """
+    x = samples.astype(np.float32) / 32768.0
+    if len(x) < bins:
+        x = np.pad(x, (0, bins - len(x)))
+    x = x[: len(x) - len(x) % bins].reshape(bins, -1)
+    with np.errstate(divide="ignore"):
+        level = 20 * np.log10(np.sqrt((x * x).mean(axis=1)))
+    level = np.clip(level + ENERGY_FLOOR_DB, 0.0, ENERGY_FLOOR_DB) / ENERGY_FLOOR_DB * 255
+    return np.round(level).astype(np.uint8).tobytes()
+
+
+def decode_energy(data: bytes) -> np.ndarray:
+    """Unpack an energy profile into levels in dBFS."""
+    return np.frombuffer(data, dtype=np.uint8).astype(np.float32) / 255 * ENERGY_FLOOR_DB - ENERGY_FLOOR_DB
+
+
+def analyze_features(path: str) -> dict:
+    """
+    Decode `path` and measure it: {"loudness": LUFS or None for silence,
+    "peak": sample peak 0–1, "tempo": BPM or None, "energy": profile bytes}.
+    Raises RuntimeError on decode failure.
+    """
+    channels = decode_pcm(path, FEATURE_SAMPLE_RATE, channels=2)
+    mono = (channels[0].astype(np.int32) + channels[1]) // 2
+    loudness = integrated_loudness(channels, FEATURE_SAMPLE_RATE)
+    return {
+        "loudness": loudness if np.isfinite(loudness) else None,
+        "peak": float(np.abs(channels.astype(np.int32)).max()) / 32768.0,
+        "tempo": estimate_tempo(mono.astype(np.int16), FEATURE_SAMPLE_RATE),
+        "energy": energy_profile(mono.astype(np.int16)),
+    }
+
+
+def track_gain(loudness: float | None, peak: float | None, target: float) -> float:
+    """
+    Gain in dB that brings a track of `loudness` LUFS to `target`, reduced
+    where needed so its peak stays below full scale. 0 for unanalysed tracks.
+    """
+    if loudness is None:
+        return 0.0
+    gain = target - loudness
+    if peak:
+        gain = min(gain, -20 * np.log10(peak))
+    return float(gain)
+
+
+# ── Signatures ────────────────────────────────────────────────────────────────
+
+# Projection onto the hyperplanes, made on first use in each process
+_planes: np.ndarray | None = None
+
+
+def _hyperplanes() -> np.ndarray:
+    global _planes
+    if _planes is None:
+        rng = np.random.default_rng(_SIGNATURE_SEED)
+        _planes = rng.standard_normal((_SIGNATURE_BANDS * _SIGNATURE_SLICES, SIGNATURE_BITS)).astype(np.float32)
+    return _planes
+
+
+def acoustic_signature(samples: np.ndarray, sample_rate: int) -> bytes:
+    """
+    SIGNATURE_BITS / 8 bytes describing how mono PCM evolves, or b"" for
+    silence or anything too short to describe.
+
+    The log energy of _SIGNATURE_BANDS bands is averaged over
+    _SIGNATURE_SLICES equal slices of the track between its leading and
+    trailing silence, and each band's mean over the track is subtracted,
+    so the signature follows the song's course rather than its tone,
+    level or encoder. Its sign against random hyperplanes then gives one
+    bit each (SimHash): the fraction of differing bits between two
+    signatures estimates the angle between their feature vectors.
+    """
+    frame, hop = 1024, 512
+    count = 1 + (len(samples) - frame) // hop
+    if count < _SIGNATURE_SLICES:
+        return b""
+    frames = np.lib.stride_tricks.sliding_window_view(samples, frame)[::hop][:count]
+    power = np.abs(np.fft.rfft(frames.astype(np.float32) * np.hanning(frame), axis=1)) ** 2
+    edges = np.round(np.geomspace(_SIGNATURE_LOWEST, _SIGNATURE_HIGHEST, _SIGNATURE_BANDS + 1)
+                     * frame / sample_rate).astype(np.intp)
+    bands = np.add.reduceat(power[:, : edges[-1]], edges[:-1], axis=1)
+
+    total = bands.sum(axis=1)
+    with np.errstate(divide="ignore"):
+        level = 10 * np.log10(total)
+    if not np.isfinite(level.max()):
+        return b""
+    sound = np.flatnonzero(level > level.max() - _SIGNATURE_SILENCE_DB)
+    bands = bands[sound[0]:sound[-1] + 1]
+    if len(bands) < _SIGNATURE_SLICES:
+        return b""
+
+    # Each slice is a triangular average twice its width around its centre
+    # (a moving average applied twice), so where its edges fall matters little
+    width = len(bands) // _SIGNATURE_SLICES
+    smooth = bands
+    for _ in range(2):
+        total = np.cumsum(np.vstack([np.zeros(_SIGNATURE_BANDS), smooth]), axis=0)
+        smooth = (total[width:] - total[:-width]) / width
+    centres = np.linspace(0, len(smooth) - 1, _SIGNATURE_SLICES).round().astype(np.intp)
+    slices = smooth[centres]
+    # Coding noise in bands the song leaves empty mustn't count, so levels
+    # are floored _SIGNATURE_SILENCE_DB below the average band
+    features = np.log10(slices + slices.mean() * 10 ** (-_SIGNATURE_SILENCE_DB / 10))
+    features -= features.mean(axis=0)
+    vector = features.ravel()
+    if np.linalg.norm(vector) < 1e-6:
+        return b""
+    return np.packbits(vector.astype(np.float32) @ _hyperplanes() > 0).tobytes()
+
+
+def analyze_signature(path: str) -> bytes:
+    """Decode `path` and return its acoustic signature. Raises RuntimeError on decode failure."""
+    return acoustic_signature(decode_pcm(path), ANALYSIS_SAMPLE_RATE)
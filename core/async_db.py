@@ -0,0 +1,107 @@
+"""
+Awaitable database access for code running on an asyncio event loop.
+
+A sqlite3 connection may only be used on the thread that opened it, and a
+query on the event loop thread stalls input and animation for as long as
+the disk takes. AsyncMusicDatabase runs MusicDatabase's methods on worker
+threads instead: reads on a small pool of threads with a read connection
+each, writes on one dedicated thread, so writes stay in order and never
+contend with each other for SQLite's write lock.
+
+The database is switched to write-ahead logging, so readers see the last
+committed state while a write (or a library scan in another process) is
+in progress rather than waiting for it.
+"""
+
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from config import DB_PATH, DB_READERS
+from core.db import MusicDatabase
+
+# MusicDatabase methods run on the read pool
+READ_METHODS = (
+    "get_all_files", "get_files_chunk", "get_feedback_history", "get_all_feedback", "get_feedback_rollup",
+    "get_waveform", "get_paths_without_waveform", "get_paths_without_fingerprint",
+    "get_files_without_features", "get_files_without_signature", "get_signatures", "get_duplicate_groups",
+    "count",
+)
+
+# MusicDatabase methods run, in call order, on the writer thread
+WRITE_METHODS = (
+    "add_file", "add_files_batch", "add_feedback", "rebuild_feedback_rollup",
+    "set_waveforms_batch", "set_fingerprints_batch", "set_features_batch", "set_signatures_batch",
+    "set_duplicate_groups", "set_availability", "update_feedback", "delete_file",
+)
+
+
+class AsyncMusicDatabase:
+    """
+    MusicDatabase with every method in READ_METHODS and WRITE_METHODS as a
+    coroutine of the same name and arguments.
+
+        db = AsyncMusicDatabase(path)
+        rows = await db.get_all_files()
+        await db.add_feedback(path, 4, 2, 3)
+        db.close()
+    """
+
+    def __init__(self, db_path: str = DB_PATH, readers: int = DB_READERS):
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections: list[MusicDatabase] = []
+        self._writer = ThreadPoolExecutor(
+            1, thread_name_prefix="aimu-db-write", initializer=self._open, initargs=(db_path, True),
+        )
+        # The writer's connection creates and migrates the schema; readers
+        # open only once that is done
+        self._writer.submit(lambda: None).result()
+        self._readers = ThreadPoolExecutor(
+            max(1, readers), thread_name_prefix="aimu-db-read", initializer=self._open, initargs=(db_path, False),
+        )
+
+    def _open(self, db_path: str, writer: bool) -> None:
+        # Each connection stays on the thread that opened it; close() only
+        # touches them after every worker has stopped. Only the writer
+        # creates and migrates the schema: readers open read-only, so they
+        # never contend for the write lock with another process's writes
+        db = MusicDatabase(db_path=db_path, check_same_thread=False, read_only=not writer)
+        if writer:
+            db.conn.execute("PRAGMA journal_mode=WAL")
+        self._local.db = db
+        with self._lock:
+            self._connections.append(db)
+
+    def _run(self, name: str, *args, **kwargs):
+        return getattr(self._local.db, name)(*args, **kwargs)
+
+    async def _call(self, executor: ThreadPoolExecutor, name: str, *args, **kwargs):
+        call = functools.partial(self._run, name, *args, **kwargs)
+        return await asyncio.get_running_loop().run_in_executor(executor, call)
+
+    def close(self) -> None:
+        """Finish queued work, then close every connection."""
+        self._readers.shutdown(wait=True)
+        self._writer.shutdown(wait=True)
+        with self._lock:
+            for db in self._connections:
+                db.close()
+            self._connections.clear()
+
+
+def _delegate(name: str, pool: str):
+    async def method(self, *args, **kwargs):
+        return await self._call(getattr(self, pool), name, *args, **kwargs)
+
+    method.__name__ = name
+    method.__qualname__ = f"AsyncMusicDatabase.{name}"
+    method.__doc__ = getattr(MusicDatabase, name).__doc__
+    return method
+
+
+for _name in READ_METHODS:
+    setattr(AsyncMusicDatabase, _name, _delegate(_name, "_readers"))
+for _name in WRITE_METHODS:
+    setattr(AsyncMusicDatabase, _name, _delegate(_name, "_writer"))
@@ -12,10 +12,13 @@ class AudioEngine:
         # '--quiet' keeps VLC from printing log noise to your terminal.
         self._instance = vlc.Instance('--quiet') 
         self._player = self._instance.media_player_new()
-        
-    def play(self, file_path: str):
+        self._volume = 100
+        self._gain = 1.0
+
+    def play(self, file_path: str, gain_db: float = 0.0):
         """
-        Loads a file path and starts playback immediately.
+        Loads a file path and starts playback immediately, `gain_db` louder
+        or quieter than the set volume.
         """
         # Create a new Media object
         media = self._instance.media_new(str(file_path))
@@ -23,6 +26,10 @@ class AudioEngine:
         # Set the media to the player
         self._player.set_media(media)
         
+        # Level the new track before its first sample is heard
+        self._gain = 10 ** (gain_db / 20)
+        self._apply_volume()
+
         # Start playing
         self._player.play()
 
@@ -81,11 +88,93 @@ class AudioEngine:
 
     def set_volume(self, volume: int):
         """Set volume (0 to 100)."""
-        self._player.audio_set_volume(volume)
+        self._volume = volume
+        self._apply_volume()
 
     def get_volume(self) -> int:
         """Return current volume (0 to 100)."""
-        return self._player.audio_get_volume()
+        return self._volume
+
+    def _apply_volume(self):
+        # The track's gain scales VLC's volume, which goes up to 200%
+        self._player.audio_set_volume(max(0, min(200, round(self._volume * self._gain))))
+
+class SimulatedAudioEngine:
+    """
+    A drop-in stand-in for AudioEngine that plays nothing.
+    Playback position follows the wall clock, so auto-advance, seeking and
+    the progress bar behave as they would with VLC. Used by benchmarks and
+    headless runs where no audio device or libvlc is available.
+    """
+
+    def __init__(self, track_length_ms: int = 180_000):
+        self._track_length_ms = track_length_ms
+        self._path = None
+        self._started = 0.0      # monotonic time at which position 0 was playing
+        self._paused_at = None   # position in ms while paused, else None
+        self._volume = 100
+        self.gain_db = 0.0
+
+    def _position_ms(self) -> int:
+        if self._path is None:
+            return -1
+        if self._paused_at is not None:
+            return self._paused_at
+        return min(self._track_length_ms, int((time.monotonic() - self._started) * 1000))
+
+    def play(self, file_path: str, gain_db: float = 0.0):
+        self.gain_db = gain_db
+        self._path = str(file_path)
+        self._started = time.monotonic()
+        self._paused_at = None
+
+    def stop(self):
+        self._path = None
+        self._paused_at = None
+
+    def pause(self):
+        if self._path is not None and self._paused_at is None:
+            self._paused_at = self._position_ms()
+
+    def resume(self):
+        if self._paused_at is not None:
+            self._started = time.monotonic() - self._paused_at / 1000
+            self._paused_at = None
+
+    def toggle_pause(self):
+        if self._paused_at is None:
+            self.pause()
+        else:
+            self.resume()
+
+    def get_info(self):
+        current = self._position_ms()
+        total = self._track_length_ms if self._path is not None else -1
+        return {
+            "progress": max(0, current / total) if total > 0 else 0,
+            "current_ms": current,
+            "total_ms": total,
+            "is_playing": self._path is not None and self._paused_at is None and not self.has_finished(),
+        }
+
+    def has_finished(self):
+        return self._path is not None and self._position_ms() >= self._track_length_ms
+
+    def seek_relative(self, seconds: int):
+        current = self._position_ms()
+        if current < 0:
+            return
+        target = max(0, min(self._track_length_ms, current + seconds * 1000))
+        if self._paused_at is not None:
+            self._paused_at = target
+        else:
+            self._started = time.monotonic() - target / 1000
+
+    def set_volume(self, volume: int):
+        self._volume = volume
+
+    def get_volume(self) -> int:
+        return self._volume
 
 # --- Quick Test Block ---
 # This allows you to run 'python core/audio.py' to verify it works
@@ -0,0 +1,173 @@
+"""
+Read-ahead cache of tracks on a local disk.
+
+For libraries on a network mount, where opening and seeking a track pays
+the network's latency every time. The session names the track it expects
+to play next and the cache copies it in the background into CACHE_DIR;
+when the track starts it plays from the local copy. The directory is kept
+under CACHE_MAX_BYTES by evicting the least recently played copies.
+
+Copies are named by a hash of the source path, size and modification
+time, so the cache survives restarts without an index file, and a file
+re-ripped or retagged in place is fetched again rather than played from
+its stale copy, which ages out like any other. A copy's own modification
+time records when it was last played.
+"""
+
+import hashlib
+import os
+import shutil
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from config import CACHE_MAX_BYTES
+
+# Suffix of a copy still being written
+_PARTIAL = ".part"
+
+# Read size while copying
+_COPY_BUFFER = 1024 * 1024
+
+
+class TrackCache:
+    """
+    Bounded LRU cache of track files. prefetch() and local_path() may be
+    called from any thread; copying happens on one background thread.
+    """
+
+    def __init__(self, directory: str, max_bytes: int = CACHE_MAX_BYTES):
+        self.directory = Path(directory).expanduser()
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[str, int] = OrderedDict()   # copy name → size, oldest first
+        self._pending: set[str] = set()                         # source paths being fetched
+        self._size = 0
+        self._copier = ThreadPoolExecutor(1, thread_name_prefix="aimu-cache")
+        self.hits = 0
+        self.misses = 0
+        self.bytes_fetched = 0
+        self.fetches = 0
+        self.evictions = 0
+        self.errors = 0
+        self._scan()
+
+    def _scan(self) -> None:
+        """Pick up copies left by earlier runs, oldest played first, and drop unfinished ones."""
+        found = []
+        for entry in os.scandir(self.directory):
+            if not entry.is_file():
+                continue
+            if entry.name.endswith(_PARTIAL):
+                os.unlink(entry.path)
+                continue
+            stat = entry.stat()
+            found.append((stat.st_mtime, entry.name, stat.st_size))
+        for _, name, size in sorted(found):
+            self._entries[name] = size
+            self._size += size
+        self._evict(0)
+
+    @staticmethod
+    def _name(path: str, stat: os.stat_result) -> str:
+        key = f"{path}\0{stat.st_size}\0{stat.st_mtime_ns}"
+        return hashlib.sha1(key.encode("utf-8", "surrogateescape")).hexdigest() + Path(path).suffix.lower()
+
+    def local_path(self, path: str) -> str:
+        """Where to play `path` from: its local copy if it is of the file as it is now, else the original."""
+        try:
+            name = self._name(path, os.stat(path))
+        except OSError:
+            name = None
+        with self._lock:
+            if name not in self._entries:
+                self.misses += 1
+                return path
+            self._entries.move_to_end(name)
+            self.hits += 1
+        copy = self.directory / name
+        try:
+            os.utime(copy)
+        except OSError:
+            pass
+        return str(copy)
+
+    def prefetch(self, path: str) -> None:
+        """Copy `path` into the cache in the background, unless it's there or on its way."""
+        with self._lock:
+            if path in self._pending:
+                return
+            self._pending.add(path)
+        # Stat on the copier thread too: on a network mount it's a round trip
+        self._copier.submit(self._fetch, path)
+
+    def _fetch(self, path: str) -> None:
+        partial = None
+        try:
+            stat = os.stat(path)
+            name = self._name(path, stat)
+            size = stat.st_size
+            with self._lock:
+                if name in self._entries:
+                    return
+            if size > self.max_bytes:
+                return
+            with self._lock:
+                self._evict(size)
+            partial = self.directory / (name + _PARTIAL)
+            with open(path, "rb") as source, open(partial, "wb") as target:
+                shutil.copyfileobj(source, target, _COPY_BUFFER)
+            if self._name(path, os.stat(path)) != name:
+                # Changed while being copied; the copy is of neither version
+                raise OSError(f"{path} changed while being cached")
+            os.replace(partial, self.directory / name)
+            with self._lock:
+                # Other copies may have landed meanwhile
+                self._evict(size)
+                self._entries[name] = size
+                self._size += size
+                self.bytes_fetched += size
+                self.fetches += 1
+        except OSError:
+            with self._lock:
+                self.errors += 1
+            if partial is not None:
+                try:
+                    os.unlink(partial)
+                except OSError:
+                    pass
+        finally:
+            with self._lock:
+                self._pending.discard(path)
+
+    def _evict(self, incoming: int) -> None:
+        """Delete least recently played copies until `incoming` more bytes fit. Call with the lock held."""
+        while self._entries and self._size + incoming > self.max_bytes:
+            name, size = self._entries.popitem(last=False)
+            self._size -= size
+            self.evictions += 1
+            try:
+                os.unlink(self.directory / name)
+            except OSError:
+                pass
+
+    def stats(self) -> dict:
+        with self._lock:
+            plays = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / plays if plays else 0.0,
+                "bytes_fetched": self.bytes_fetched,
+                "fetches": self.fetches,
+                "evictions": self.evictions,
+                "errors": self.errors,
+                "files": len(self._entries),
+                "bytes_cached": self._size,
+            }
+
+    def close(self) -> None:
+        """Stop copying; a copy in progress is finished first."""
+        self._copier.shutdown(wait=True, cancel_futures=True)
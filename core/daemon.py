@@ -0,0 +1,520 @@
+"""
+Playback daemon.
+
+    python -m core.daemon serve                  # keep playing after the player closes
+    python main.py --attach                      # attach the player to it
+    python -m core.daemon send next              # control it from scripts
+    python -m core.daemon send station on=1 pleasure=4 arousal=2
+    python -m core.daemon watch                  # print every event as it happens
+
+The daemon holds one PlayerSession (the audio engine, the database, the
+library and the station scorer) and serves it on a Unix socket. Any
+number of clients can attach at once. Each sends commands and receives
+every event the session emits, so all of them stay in step. A client
+mirrors the library a chunk at a time, as the player loads it from the
+database, so attaching to a large library doesn't stall it.
+
+Each client has its own play order (the queue command, e.g. its playlist
+as sorted); outside station mode the session plays on in the order of
+the client that last started a track.
+
+The protocol is JSON, one message per line:
+
+    request   {"id": 1, "cmd": "play", "args": {"index": 42}}
+    reply     {"id": 1, "ok": true, "result": null}
+              {"id": 1, "ok": false, "error": "..."}
+    event     {"event": "track", "data": {"index": 42, "waveform": "<base64>"}}
+"""
+
+import argparse
+import asyncio
+import base64
+import contextlib
+import inspect
+import itertools
+import json
+import os
+import signal
+import socket
+import sys
+import time
+
+import numpy as np
+
+from config import DAEMON_SOCKET_PATH, DAEMON_TICK, DB_PATH, LIBRARY_FIRST_CHUNK, LIBRARY_MAX_CHUNK
+from core.session import PlayerSession, SessionState
+from core.station import StationScorer
+
+# Longest message either side accepts. A library chunk, or a queue of the
+# whole library, runs to megabytes: far above asyncio's 64 KiB default
+LINE_LIMIT = 64 * 1024 * 1024
+
+# A client that lets this much unread output pile up is dropped
+MAX_CLIENT_BUFFER = 16 * 1024 * 1024
+
+
+def _encode(message: dict) -> bytes:
+    return json.dumps(message, default=_json_default, separators=(",", ":")).encode() + b"\n"
+
+
+def _json_default(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, bytes):
+        return base64.b64encode(value).decode("ascii")
+    return str(value)
+
+
+class DaemonError(Exception):
+    """A command the daemon refused or failed to carry out."""
+
+
+# ── Server ────────────────────────────────────────────────────────────────────
+
+class PlayerDaemon:
+    """Serves one PlayerSession to every client connected to `socket_path`."""
+
+    def __init__(self, session: PlayerSession, socket_path: str = DAEMON_SOCKET_PATH):
+        self.session = session
+        self.socket_path = socket_path
+        self._clients: set[asyncio.StreamWriter] = set()
+        self._handlers: set[asyncio.Task] = set()
+        self._stopped = asyncio.Event()
+        # Each client's play order, and the client whose order the session follows
+        self._queues: dict[asyncio.StreamWriter, list[int]] = {}
+        self._queue_owner: asyncio.StreamWriter | None = None
+        self.commands = {
+            "hello": self._cmd_hello,
+            "library": self._cmd_library,
+            "state": lambda: self.session.snapshot(),
+            "next": self.session.next,
+            "pause": self.session.toggle_pause,
+            "seek": self.session.seek,
+            "volume": self.session.set_volume,
+            "station": self.session.set_station,
+            "feedback": self.session.add_feedback,
+            "shutdown": self.stop,
+        }
+
+    def _client_commands(self, writer: asyncio.StreamWriter) -> dict:
+        """The commands whose effect depends on which client sent them."""
+
+        def queue(queue: list[int]) -> None:
+            self._queues[writer] = queue
+            if self._queue_owner is writer:
+                self.session.set_queue(queue)
+
+        async def play(index: int) -> None:
+            # The client that starts a track decides what follows it
+            if writer in self._queues and self._queue_owner is not writer:
+                self._queue_owner = writer
+                self.session.set_queue(self._queues[writer])
+            await self.session.play(index)
+
+        return {**self.commands, "queue": queue, "play": play}
+
+    def _cmd_hello(self) -> dict:
+        """The session state and the size of the library, for a client to mirror."""
+        return {"state": self.session.snapshot(), "tracks": len(self.session.songs)}
+
+    def _cmd_library(self, start: int, limit: int) -> dict:
+        """Up to `limit` tracks from store index `start` on, with their feedback rollup cells."""
+        songs = self.session.songs
+        indices = range(max(0, start), min(len(songs), start + limit))
+        feedback = self.session.station.feedback
+        return {
+            "songs": [songs[i] for i in indices],
+            "feedback": [cell for i in indices for cell in feedback.get(i, ())],
+        }
+
+    def stop(self) -> None:
+        self._stopped.set()
+
+    async def serve(self) -> None:
+        """Listen until stop() or a shutdown command, polling playback every DAEMON_TICK seconds."""
+        _claim_socket(self.socket_path)
+        # Bind under a private umask: chmod after binding would leave the
+        # socket open to every local user until then
+        umask = os.umask(0o077)
+        try:
+            server = await asyncio.start_unix_server(self._handle, path=self.socket_path, limit=LINE_LIMIT)
+        finally:
+            os.umask(umask)
+        os.chmod(self.socket_path, 0o600)
+        self.session.subscribe(self._broadcast)
+        ticker = asyncio.create_task(self._tick())
+        try:
+            await self._stopped.wait()
+        finally:
+            ticker.cancel()
+            server.close()
+            for writer in list(self._clients):
+                writer.close()
+            # Each handler sees its connection close and returns
+            await asyncio.gather(*self._handlers, return_exceptions=True)
+            await server.wait_closed()
+            self.session.unsubscribe(self._broadcast)
+            with contextlib.suppress(FileNotFoundError):
+                os.unlink(self.socket_path)
+
+    async def _tick(self) -> None:
+        while True:
+            await asyncio.sleep(DAEMON_TICK)
+            self.session.tick()
+
+    def _broadcast(self, event: str, data: dict) -> None:
+        line = _encode({"event": event, "data": data})
+        for writer in list(self._clients):
+            self._write(writer, line)
+
+    def _write(self, writer: asyncio.StreamWriter, line: bytes) -> None:
+        if writer.transport.get_write_buffer_size() > MAX_CLIENT_BUFFER:
+            # Not reading; don't let it hold the daemon's memory hostage
+            self._clients.discard(writer)
+            writer.close()
+            return
+        writer.write(line)
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self._clients.add(writer)
+        self._handlers.add(asyncio.current_task())
+        commands = self._client_commands(writer)
+        try:
+            while line := await reader.readline():
+                request = None
+                try:
+                    request = json.loads(line)
+                    result = commands[request["cmd"]](**request.get("args", {}))
+                    if inspect.isawaitable(result):
+                        result = await result
+                    reply = {"id": request.get("id"), "ok": True, "result": result}
+                except Exception as e:
+                    request_id = request.get("id") if isinstance(request, dict) else None
+                    error = f"unknown command {e}" if isinstance(e, KeyError) else str(e)
+                    reply = {"id": request_id, "ok": False, "error": error or type(e).__name__}
+                if writer in self._clients:
+                    self._write(writer, _encode(reply))
+        except (ConnectionError, asyncio.LimitOverrunError, ValueError):
+            pass
+        finally:
+            self._clients.discard(writer)
+            self._handlers.discard(asyncio.current_task())
+            # The session keeps the order of a client that left while it was followed
+            self._queues.pop(writer, None)
+            if self._queue_owner is writer:
+                self._queue_owner = None
+            writer.close()
+
+
+def _claim_socket(path: str) -> None:
+    """Remove a socket left behind by a daemon that died; refuse if one is still listening."""
+    if not os.path.exists(path):
+        return
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(path)
+    except OSError:
+        os.unlink(path)
+    else:
+        raise DaemonError(f"a daemon is already listening on {path}")
+    finally:
+        probe.close()
+
+
+# ── Client ────────────────────────────────────────────────────────────────────
+
+class DaemonClient:
+    """
+    One connection to the daemon. request() awaits a command's result;
+    send() fires a command without waiting. Events, and the errors of
+    commands sent with send(), go to the callbacks.
+    """
+
+    def __init__(self, socket_path: str = DAEMON_SOCKET_PATH, on_event=None, on_error=None):
+        self.socket_path = socket_path
+        self.on_event = on_event
+        self.on_error = on_error
+        self._ids = itertools.count(1)
+        self._pending: dict[int, asyncio.Future] = {}
+        self._reader: asyncio.StreamReader | None = None
+        self._writer: asyncio.StreamWriter | None = None
+        self._reading: asyncio.Task | None = None
+
+    async def connect(self) -> None:
+        self._reader, self._writer = await asyncio.open_unix_connection(self.socket_path, limit=LINE_LIMIT)
+        self._reading = asyncio.create_task(self._read())
+
+    async def close(self) -> None:
+        if self._reading is not None:
+            self._reading.cancel()
+        if self._writer is not None:
+            self._writer.close()
+            with contextlib.suppress(ConnectionError):
+                await self._writer.wait_closed()
+
+    async def wait_closed(self) -> None:
+        """Wait until the daemon closes the connection."""
+        with contextlib.suppress(asyncio.CancelledError):
+            await self._reading
+
+    def send(self, cmd: str, **args) -> int:
+        request_id = next(self._ids)
+        self._writer.write(_encode({"id": request_id, "cmd": cmd, "args": args}))
+        return request_id
+
+    async def request(self, cmd: str, **args):
+        future = asyncio.get_running_loop().create_future()
+        self._pending[self.send(cmd, **args)] = future
+        return await future
+
+    async def _read(self) -> None:
+        try:
+            while line := await self._reader.readline():
+                message = json.loads(line)
+                if "event" in message:
+                    if self.on_event is not None:
+                        self.on_event(message["event"], message["data"])
+                    continue
+                future = self._pending.pop(message.get("id"), None)
+                if future is None:
+                    if not message["ok"] and self.on_error is not None:
+                        self.on_error(message["error"])
+                elif message["ok"]:
+                    future.set_result(message["result"])
+                else:
+                    future.set_exception(DaemonError(message["error"]))
+        finally:
+            for future in self._pending.values():
+                if not future.done():
+                    future.set_exception(DaemonError("connection to the daemon closed"))
+            self._pending.clear()
+
+
+class RemoteSession(SessionState):
+    """
+    A mirror of the daemon's session with PlayerSession's methods. Commands
+    go to the daemon; the mirror changes only when its events come back,
+    and then re-emits them to its own listeners.
+    """
+
+    def __init__(self, socket_path: str = DAEMON_SOCKET_PATH):
+        super().__init__()
+        self.client = DaemonClient(socket_path, on_event=self._on_event, on_error=self._on_error)
+        self.errors: list[str] = []
+        self._status: dict = {}
+        self._status_at = 0.0
+        self._tracks = 0
+        # Events that change the library or its scores, held until load() has mirrored it
+        self._held: list[tuple[str, dict]] = []
+
+    async def attach(self) -> None:
+        """Connect and mirror the session state; load() then mirrors the library."""
+        await self.client.connect()
+        hello = await self.client.request("hello")
+        state = hello["state"]
+        self._tracks = hello["tracks"]
+        self.station_pleasure = state["station_pleasure"]
+        self.station_arousal = state["station_arousal"]
+        self.current_index = state["current_index"]
+        self.station_mode = state["station_mode"]
+        self.volume_level = state["volume_level"]
+        self._status = state["status"]
+
+    async def load(self) -> list[str]:
+        """
+        Mirror the daemon's library in chunks, as PlayerSession.load reads
+        it from the database, emitting a library event after each; then
+        build the station scorer off the event loop. Returns error
+        messages, if any.
+        """
+        errors = []
+        cells = []
+        start, limit = 0, LIBRARY_FIRST_CHUNK
+        try:
+            while start < self._tracks:
+                chunk = await self.client.request("library", start=start, limit=limit)
+                self.songs.extend(chunk["songs"])
+                cells.extend(chunk["feedback"])
+                self._emit("library", count=len(self.songs), done=False)
+                if len(chunk["songs"]) < limit:
+                    break
+                start, limit = start + limit, min(limit * 2, LIBRARY_MAX_CHUNK)
+        except DaemonError as e:
+            errors.append(f"Error loading the library from the daemon: {e}")
+        self._use_station(await asyncio.to_thread(StationScorer, self.songs, cells))
+        held, self._held = self._held, []
+        for event, data in held:
+            self._on_event(event, data)
+        self._emit("library", count=len(self.songs), done=True)
+        return errors
+
+    async def watch_files(self) -> None:
+        """The daemon checks the library's files itself and reports what changed."""
+
+    def close(self) -> None:
+        """Detach; the daemon keeps playing."""
+        asyncio.ensure_future(self.client.close())
+
+    def _on_error(self, message: str) -> None:
+        self.errors.append(message)
+        self._emit("error", message=message)
+
+    def _on_event(self, event: str, data: dict) -> None:
+        if event in ("station", "feedback", "availability") and not self.loaded.is_set():
+            self._held.append((event, data))
+            return
+        if event == "track":
+            self.current_index = data["index"]
+            if data["waveform"] is not None:
+                data["waveform"] = base64.b64decode(data["waveform"])
+        elif event == "status":
+            self._status = data
+            self._status_at = time.monotonic()
+            self.current_index = data["current_index"]
+        elif event == "station":
+            self._apply_station(data["on"], data["pleasure"], data["arousal"])
+        elif event == "feedback":
+            self._apply_feedback(data["index"], data["cells"], data["mood_pleasure"],
+                                 data["mood_arousal"], data["rating"])
+        elif event == "volume":
+            self.volume_level = data["level"]
+        elif event == "availability":
+            self._apply_availability(data["missing"], data["found"])
+        self._emit(event, **data)
+
+    async def play(self, index: int) -> None:
+        self.client.send("play", index=index)
+
+    async def next(self) -> None:
+        self.client.send("next")
+
+    def toggle_pause(self) -> None:
+        self.client.send("pause")
+
+    def seek(self, seconds: int) -> None:
+        self.client.send("seek", seconds=seconds)
+
+    def set_volume(self, level: int) -> None:
+        self.client.send("volume", level=level)
+
+    async def set_station(self, on: bool, pleasure: int | None = None, arousal: int | None = None) -> None:
+        self.client.send("station", on=on, pleasure=pleasure, arousal=arousal)
+
+    def set_queue(self, queue) -> None:
+        self.client.send("queue", queue=queue)
+
+    async def add_feedback(self, index: int, pleasure: int, arousal: int, rating: int) -> None:
+        self.client.send("feedback", index=index, pleasure=pleasure, arousal=arousal, rating=rating)
+
+    def status(self) -> dict:
+        return self._status
+
+    def tick(self) -> dict:
+        """The daemon polls playback itself; this is the status it last reported."""
+        return self._status
+
+    def position_ms(self) -> int:
+        """The playhead, carried forward from the last status event while playing; -1 if none."""
+        status = self._status
+        if not status or status["current_ms"] < 0:
+            return -1
+        if not status["is_playing"]:
+            return status["current_ms"]
+        elapsed = int((time.monotonic() - self._status_at) * 1000)
+        return min(status["current_ms"] + elapsed, max(status["total_ms"], status["current_ms"]))
+
+
+# ── Command line ──────────────────────────────────────────────────────────────
+
+def _parse_value(text: str):
+    try:
+        return json.loads(text)
+    except ValueError:
+        return text
+
+
+async def _serve(args) -> None:
+    from core.debuglog import DebugLog
+    if args.simulate:
+        from core.audio import SimulatedAudioEngine
+        audio = SimulatedAudioEngine()
+    else:
+        audio = None
+    session = PlayerSession(audio=audio, db_path=args.db, debug_log=DebugLog() if args.debug else None)
+    for error in await session.load():
+        print(error, file=sys.stderr)
+    daemon = PlayerDaemon(session, args.socket)
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, daemon.stop)
+    print(f"Serving {len(session.songs)} tracks on {args.socket}", file=sys.stderr)
+    watcher = asyncio.create_task(session.watch_files())
+    try:
+        await daemon.serve()
+    finally:
+        watcher.cancel()
+        session.close()
+
+
+async def _send(args) -> int:
+    client = DaemonClient(args.socket)
+    await client.connect()
+    try:
+        params = dict(pair.split("=", 1) for pair in args.args)
+        result = await client.request(args.cmd, **{key: _parse_value(value) for key, value in params.items()})
+    except DaemonError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    finally:
+        await client.close()
+    if result is not None:
+        print(json.dumps(result, indent=2))
+    return 0
+
+
+async def _watch(args) -> int:
+    def on_event(event: str, data: dict) -> None:
+        if event != "status" or args.status:
+            data.pop("waveform", None)
+            print(json.dumps({"event": event, **data}), flush=True)
+
+    client = DaemonClient(args.socket, on_event=on_event)
+    await client.connect()
+    await client.wait_closed()
+    return 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="AIMU playback daemon")
+    parser.add_argument("--socket", type=str, default=DAEMON_SOCKET_PATH,
+                        help=f"Unix socket (default: {DAEMON_SOCKET_PATH})")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    serve_parser = sub.add_parser("serve", help="Run the daemon in the foreground")
+    serve_parser.add_argument("--db", type=str, default=DB_PATH, help=f"Database file (default: {DB_PATH})")
+    serve_parser.add_argument("--simulate", action="store_true", help="Use the silent simulated audio engine")
+    serve_parser.add_argument("--debug", action="store_true", help="Log station picks to the debug log")
+
+    send_parser = sub.add_parser("send", help="Send one command and print its result")
+    send_parser.add_argument("cmd", help="hello, state, play, next, pause, seek, volume, station, "
+                                         "feedback, queue or shutdown")
+    send_parser.add_argument("args", nargs="*", metavar="KEY=VALUE", help="Arguments; values are JSON or text")
+
+    watch_parser = sub.add_parser("watch", help="Print the session's events as JSON lines")
+    watch_parser.add_argument("--status", action="store_true", help="Include the twice-a-second status events")
+
+    args = parser.parse_args()
+    try:
+        if args.command == "serve":
+            asyncio.run(_serve(args))
+            return 0
+        return asyncio.run(_send(args) if args.command == "send" else _watch(args))
+    except (DaemonError, OSError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
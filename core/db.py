@@ -1,26 +1,80 @@
 import sqlite3
+import uuid
+from collections.abc import Iterable, Iterator
+from itertools import islice
 from pathlib import Path
 import os
 
+# Sort key of get_files_chunk, matching TrackStore's artist sort: SQLite's
+# binary collation orders text by code point, as Python does
+_LIBRARY_ORDER = "IFNULL({t}artist, ''), IFNULL({t}title, ''), {t}path"
+
+# import_feedback drops and rebuilds the path index when its first batch of
+# rows is at least 1 / this share of the log, and rebuilds the whole rollup
+# once the import touches 1 / this share of the tracks with feedback
+_BULK_IMPORT_SHARE = 4
+
+# Page cache of an import, in KiB. Rows reach the UUID index in random
+# order; with the index held in memory each costs no disk read
+_IMPORT_CACHE_KIB = 256 * 1024
+
+# Recency of a feedback entry, or of a rollup cell's newest one: by when it
+# was given, then by id. Entries merged or imported from elsewhere get ids
+# after everything already here, whatever their age, so id alone won't do
+_NEWEST = "printf('%s %020d', {t}, {id})"
+
+# Summarise the feedback log (or, with `where`, part of it) into rollup rows.
+# rating, id and created_at are bare columns, taken from the newest row
+_ROLLUP_INSERT = f"""
+    INSERT INTO feedback_rollup
+        (path, pleasure_cell, arousal_cell, count, rating_sum, poor, ok, great,
+         last_rating, last_id, last_at)
+    SELECT path, pleasure_cell, arousal_cell, count, rating_sum, poor, ok, great,
+           last_rating, last_id, last_at
+    FROM (
+        SELECT path, CAST(ROUND(mood_pleasure) AS INTEGER) AS pleasure_cell,
+               CAST(ROUND(mood_arousal) AS INTEGER) AS arousal_cell,
+               COUNT(*) AS count, SUM(rating) AS rating_sum,
+               SUM(rating = 1) AS poor, SUM(rating = 2) AS ok, SUM(rating = 3) AS great,
+               rating AS last_rating, id AS last_id, created_at AS last_at,
+               MAX({_NEWEST.format(t="created_at", id="id")})
+        FROM feedback
+        WHERE mood_pleasure IS NOT NULL AND mood_arousal IS NOT NULL AND rating IN (1, 2, 3) {{where}}
+        GROUP BY 1, 2, 3
+    )
+"""
+
 
 class MusicDatabase:
     """
     Manages the SQLite database for storing music file paths and ratings.
     """
 
-    def __init__(self, db_path: str = "./music.db"):
+    def __init__(self, db_path: str = "./music.db", check_same_thread: bool = True, read_only: bool = False):
         """
         Initialize the database connection.
         
         Args:
             db_path: Path to the SQLite database file
+            check_same_thread: Refuse use of the connection from other threads
+                (the sqlite3 default). AsyncMusicDatabase turns this off for
+                connections it confines to one worker thread itself
+            read_only: Open an existing database for reading only, without
+                creating or migrating the schema, so opening never waits
+                for SQLite's write lock
         """
+        if read_only:
+            uri = Path(db_path).resolve().as_uri() + "?mode=ro"
+            self.conn = sqlite3.connect(uri, uri=True, check_same_thread=check_same_thread)
+            self.conn.row_factory = sqlite3.Row
+            return
+
         # Ensure the database directory exists
         db_file = Path(db_path)
         db_file.parent.mkdir(parents=True, exist_ok=True)
         
         # Connect to SQLite database
-        self.conn = sqlite3.connect(db_path)
+        self.conn = sqlite3.connect(db_path, check_same_thread=check_same_thread)
         self.conn.row_factory = sqlite3.Row  # Return rows as dict-like objects
         
         # Create table if it doesn't exist, then apply any migrations
@@ -30,6 +84,8 @@ class MusicDatabase:
     def _create_table(self):
         """Create the music_files and feedback tables if they don't exist."""
         cursor = self.conn.cursor()
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'feedback_rollup'")
+        had_rollup = cursor.fetchone() is not None
         cursor.execute("""
             CREATE TABLE IF NOT EXISTS music_files (
                 path TEXT PRIMARY KEY,
@@ -46,7 +102,10 @@ class MusicDatabase:
                 date TEXT,
                 feedback TEXT,
                 mood_pleasure REAL,
-                mood_arousal REAL
+                mood_arousal REAL,
+                available INTEGER NOT NULL DEFAULT 1,
+                last_seen TEXT,
+                fingerprint TEXT
             )
         """)
         cursor.execute("""
@@ -57,10 +116,70 @@ class MusicDatabase:
                 mood_arousal REAL,
                 rating INTEGER,
                 created_at TEXT NOT NULL DEFAULT (datetime('now')),
+                uuid TEXT,
+                FOREIGN KEY (path) REFERENCES music_files(path)
+            )
+        """)
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_feedback_path ON feedback (path, id)")
+        # Library order for get_files_chunk: the playlist's default (artist, title) sort
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_music_files_order ON music_files ({_LIBRARY_ORDER.format(t='')})")
+        # One row per (track, mood cell, energy cell) summarising the feedback
+        # log, kept up to date by add_feedback. Scoring and the info panel read
+        # this; its size is bounded by the library, not the listening history
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS feedback_rollup (
+                path TEXT NOT NULL,
+                pleasure_cell INTEGER NOT NULL,
+                arousal_cell INTEGER NOT NULL,
+                count INTEGER NOT NULL,
+                rating_sum INTEGER NOT NULL,
+                poor INTEGER NOT NULL,
+                ok INTEGER NOT NULL,
+                great INTEGER NOT NULL,
+                last_rating INTEGER NOT NULL,
+                last_id INTEGER NOT NULL,
+                last_at TEXT NOT NULL,
+                PRIMARY KEY (path, pleasure_cell, arousal_cell)
+            ) WITHOUT ROWID
+        """)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS waveforms (
+                path TEXT PRIMARY KEY,
+                bins INTEGER NOT NULL,
+                envelope BLOB NOT NULL,
                 FOREIGN KEY (path) REFERENCES music_files(path)
             )
         """)
+        # Measured audio features, keyed by file fingerprint rather than path
+        # so that a file is analysed once however often it is moved or copied
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS audio_features (
+                fingerprint TEXT PRIMARY KEY,
+                loudness REAL,
+                peak REAL,
+                tempo REAL,
+                energy BLOB
+            )
+        """)
+        # Acoustic signatures, keyed like audio_features; an empty signature
+        # marks a file analysed without result (e.g. silence)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS acoustic_signatures (
+                fingerprint TEXT PRIMARY KEY,
+                signature BLOB NOT NULL
+            )
+        """)
+        # Tracks found to be copies of one song share a group; tracks
+        # without copies have no row
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS duplicates (
+                path TEXT PRIMARY KEY,
+                group_id INTEGER NOT NULL
+            )
+        """)
         self.conn.commit()
+        if not had_rollup:
+            self.rebuild_feedback_rollup()
 
     def _migrate(self):
         """Add any columns that didn't exist in older versions of the schema."""
@@ -71,10 +190,22 @@ class MusicDatabase:
             ("feedback", "ALTER TABLE music_files ADD COLUMN feedback TEXT"),
             ("mood_pleasure", "ALTER TABLE music_files ADD COLUMN mood_pleasure REAL"),
             ("mood_arousal", "ALTER TABLE music_files ADD COLUMN mood_arousal REAL"),
+            ("available", "ALTER TABLE music_files ADD COLUMN available INTEGER NOT NULL DEFAULT 1"),
+            ("last_seen", "ALTER TABLE music_files ADD COLUMN last_seen TEXT"),
+            ("fingerprint", "ALTER TABLE music_files ADD COLUMN fingerprint TEXT"),
         ]
         for column, sql in migrations:
             if column not in existing:
                 cursor.execute(sql)
+
+        # Every feedback entry has a UUID that stays with it when it is
+        # synced to another database (core/sync.py); entries recorded
+        # before there were UUIDs, or inserted without one, get one here
+        cursor.execute("PRAGMA table_info(feedback)")
+        if "uuid" not in {row[1] for row in cursor.fetchall()}:
+            cursor.execute("ALTER TABLE feedback ADD COLUMN uuid TEXT")
+        cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_feedback_uuid ON feedback (uuid)")
+        cursor.execute("UPDATE feedback SET uuid = lower(hex(randomblob(16))) WHERE uuid IS NULL")
         self.conn.commit()
 
     def _recreate_table(self):
@@ -97,7 +228,10 @@ class MusicDatabase:
                 date TEXT,
                 feedback TEXT,
                 mood_pleasure REAL,
-                mood_arousal REAL
+                mood_arousal REAL,
+                available INTEGER NOT NULL DEFAULT 1,
+                last_seen TEXT,
+                fingerprint TEXT
             )
         """)
         self.conn.commit()
@@ -178,58 +312,457 @@ class MusicDatabase:
             List of dictionaries with all metadata fields
         """
         cursor = self.conn.cursor()
-        cursor.execute("""
+        cursor.execute(f"""
             SELECT m.path, m.rating, m.duration, m.bitrate, m.album, m.bpm,
                    m.title, m.artist, m.albumartist, m.tracknumber, m.genre,
-                   m.date, m.feedback,
-                   f.mood_pleasure, f.mood_arousal, f.rating AS f_rating
+                   m.date, m.feedback, m.available,
+                   f.mood_pleasure, f.mood_arousal, f.rating AS f_rating,
+                   a.loudness, a.peak, a.tempo, d.group_id AS duplicate_group
             FROM music_files m
-            LEFT JOIN feedback f ON f.path = m.path
-                AND f.id = (SELECT MAX(f2.id) FROM feedback f2 WHERE f2.path = m.path)
+            LEFT JOIN audio_features a ON a.fingerprint = m.fingerprint
+            LEFT JOIN duplicates d ON d.path = m.path
+            LEFT JOIN (
+                -- SQLite takes the bare columns from the newest cell's row
+                SELECT path, pleasure_cell AS mood_pleasure, arousal_cell AS mood_arousal,
+                       last_rating AS rating, MAX({_NEWEST.format(t="last_at", id="last_id")})
+                FROM feedback_rollup GROUP BY path
+            ) f ON f.path = m.path
         """)
-        rows = cursor.fetchall()
-
-        result = []
-        for row in rows:
-            result.append({
-                "path": row["path"],
-                "rating": row["f_rating"] if row["f_rating"] is not None else row["rating"],
-                "duration": row["duration"],
-                "bitrate": row["bitrate"],
-                "album": row["album"],
-                "bpm": row["bpm"],
-                "title": row["title"],
-                "artist": row["artist"],
-                "albumartist": row["albumartist"],
-                "tracknumber": row["tracknumber"],
-                "genre": row["genre"],
-                "date": row["date"],
-                "feedback": row["feedback"],
-                "mood_pleasure": row["mood_pleasure"],
-                "mood_arousal": row["mood_arousal"],
-            })
-
-        return result
+        return [self._file_row(row) for row in cursor.fetchall()]
+
+    def get_files_chunk(self, after: tuple[str, str, str] | None = None, limit: int = 1000) -> list[dict]:
+        """
+        Up to `limit` files in library order (artist, then title, then path),
+        starting after the file whose (artist or "", title or "", path) is
+        `after`, or from the start. Rows are as get_all_files returns them.
+        Paging on the sort key reads each chunk straight off an index, so
+        loading the library a chunk at a time costs no more than all at once.
+        """
+        cursor = self.conn.cursor()
+        order = _LIBRARY_ORDER.format(t="m.")
+        # The leading-column bound lets SQLite seek into the index; the
+        # row-value comparison alone would scan it from the start
+        where = f"WHERE IFNULL(m.artist, '') >= ? AND ({order}) > (?, ?, ?)" if after else ""
+        cursor.execute(f"""
+            SELECT m.path, m.rating, m.duration, m.bitrate, m.album, m.bpm,
+                   m.title, m.artist, m.albumartist, m.tracknumber, m.genre,
+                   m.date, m.feedback, m.available,
+                   f.pleasure_cell AS mood_pleasure, f.arousal_cell AS mood_arousal, f.last_rating AS f_rating,
+                   a.loudness, a.peak, a.tempo, d.group_id AS duplicate_group
+            FROM music_files m
+            LEFT JOIN audio_features a ON a.fingerprint = m.fingerprint
+            LEFT JOIN duplicates d ON d.path = m.path
+            LEFT JOIN feedback_rollup f ON f.path = m.path
+                AND f.last_id = (SELECT last_id FROM feedback_rollup WHERE path = m.path
+                                 ORDER BY last_at DESC, last_id DESC LIMIT 1)
+            {where}
+            ORDER BY {order}
+            LIMIT ?
+        """, (after[0], *after, limit) if after else (limit,))
+        return [self._file_row(row) for row in cursor.fetchall()]
+
+    @staticmethod
+    def _file_row(row: sqlite3.Row) -> dict:
+        return {
+            "path": row["path"],
+            "rating": row["f_rating"] if row["f_rating"] is not None else row["rating"],
+            "duration": row["duration"],
+            "bitrate": row["bitrate"],
+            "album": row["album"],
+            "bpm": row["bpm"],
+            "title": row["title"],
+            "artist": row["artist"],
+            "albumartist": row["albumartist"],
+            "tracknumber": row["tracknumber"],
+            "genre": row["genre"],
+            "date": row["date"],
+            "feedback": row["feedback"],
+            "mood_pleasure": row["mood_pleasure"],
+            "mood_arousal": row["mood_arousal"],
+            "available": bool(row["available"]),
+            "loudness": row["loudness"],
+            "peak": row["peak"],
+            "tempo": row["tempo"],
+            "duplicate_group": row["duplicate_group"],
+        }
 
     def get_feedback_history(self, file_path: str) -> list[dict]:
         """Return all feedback entries for a track, newest first."""
         cursor = self.conn.cursor()
         cursor.execute(
-            "SELECT mood_pleasure, mood_arousal, rating FROM feedback WHERE path = ? ORDER BY id DESC",
+            "SELECT mood_pleasure, mood_arousal, rating, created_at FROM feedback WHERE path = ? ORDER BY id DESC",
             (file_path,),
         )
         return [
-            {"mood_pleasure": r["mood_pleasure"], "mood_arousal": r["mood_arousal"], "rating": r["rating"]}
+            {"mood_pleasure": r["mood_pleasure"], "mood_arousal": r["mood_arousal"],
+             "rating": r["rating"], "created_at": r["created_at"]}
+            for r in cursor.fetchall()
+        ]
+
+    def get_all_feedback(self) -> list[dict]:
+        """Return every feedback entry in the database, newest first."""
+        cursor = self.conn.cursor()
+        cursor.execute(
+            "SELECT path, mood_pleasure, mood_arousal, rating, created_at FROM feedback ORDER BY id DESC"
+        )
+        return [
+            {"path": r["path"], "mood_pleasure": r["mood_pleasure"],
+             "mood_arousal": r["mood_arousal"], "rating": r["rating"], "created_at": r["created_at"]}
+            for r in cursor.fetchall()
+        ]
+
+    def get_feedback_rollup(self, file_path: str | None = None) -> list[dict]:
+        """
+        Return the feedback summary of one track, or of every track, one
+        entry per mood cell, most recently rated first.
+        """
+        cursor = self.conn.cursor()
+        where = "WHERE path = ?" if file_path is not None else ""
+        cursor.execute(f"""
+            SELECT path, pleasure_cell, arousal_cell, count, rating_sum, poor, ok, great,
+                   last_rating, last_id, last_at
+            FROM feedback_rollup {where} ORDER BY last_at DESC, last_id DESC
+        """, (file_path,) if file_path is not None else ())
+        return [
+            {"path": r["path"], "mood_pleasure": r["pleasure_cell"], "mood_arousal": r["arousal_cell"],
+             "count": r["count"], "rating_sum": r["rating_sum"],
+             "poor": r["poor"], "ok": r["ok"], "great": r["great"],
+             "last_rating": r["last_rating"], "last_id": r["last_id"], "last_at": r["last_at"]}
             for r in cursor.fetchall()
         ]
 
     def add_feedback(self, file_path: str, mood_pleasure: float, mood_arousal: float, rating: int) -> None:
-        """Insert a new feedback record for a track (never updates)."""
+        """Insert a new feedback record for a track (never updates) and fold it into the rollup."""
         cursor = self.conn.cursor()
         cursor.execute(
-            "INSERT INTO feedback (path, mood_pleasure, mood_arousal, rating) VALUES (?, ?, ?, ?)",
-            (file_path, mood_pleasure, mood_arousal, rating),
+            "INSERT INTO feedback (path, mood_pleasure, mood_arousal, rating, uuid) VALUES (?, ?, ?, ?, ?)",
+            (file_path, mood_pleasure, mood_arousal, rating, uuid.uuid4().hex),
+        )
+        if mood_pleasure is not None and mood_arousal is not None and rating in (1, 2, 3):
+            cursor.execute("""
+                INSERT INTO feedback_rollup
+                    (path, pleasure_cell, arousal_cell, count, rating_sum, poor, ok, great,
+                     last_rating, last_id, last_at)
+                SELECT path, CAST(ROUND(mood_pleasure) AS INTEGER), CAST(ROUND(mood_arousal) AS INTEGER),
+                       1, rating, rating = 1, rating = 2, rating = 3, rating, id, created_at
+                FROM feedback WHERE id = ?
+                ON CONFLICT (path, pleasure_cell, arousal_cell) DO UPDATE SET
+                    count = count + 1,
+                    rating_sum = rating_sum + excluded.rating_sum,
+                    poor = poor + excluded.poor,
+                    ok = ok + excluded.ok,
+                    great = great + excluded.great,
+                    -- The new entry is the cell's newest unless one merged in is dated later
+                    last_rating = iif((excluded.last_at, excluded.last_id) > (last_at, last_id),
+                                      excluded.last_rating, last_rating),
+                    last_id = iif((excluded.last_at, excluded.last_id) > (last_at, last_id),
+                                  excluded.last_id, last_id),
+                    last_at = max(excluded.last_at, last_at)
+            """, (cursor.lastrowid,))
+        self.conn.commit()
+
+    def rebuild_feedback_rollup(self) -> int:
+        """
+        Recompute the rollup from the raw feedback log in one pass and
+        return the number of rollup rows. Entries without a mood or with a
+        rating outside 1–3 are kept in the log but not summarised.
+        """
+        cursor = self.conn.cursor()
+        cursor.execute("DELETE FROM feedback_rollup")
+        cursor.execute(_ROLLUP_INSERT.format(where=""))
+        self.conn.commit()
+        cursor.execute("SELECT COUNT(*) FROM feedback_rollup")
+        return cursor.fetchone()[0]
+
+    def get_feedback_watermark(self) -> int:
+        """The id of the newest feedback entry, 0 if there is none."""
+        cursor = self.conn.cursor()
+        cursor.execute("SELECT IFNULL(MAX(id), 0) FROM feedback")
+        return cursor.fetchone()[0]
+
+    def iter_feedback_since(self, since: int, until: int) -> Iterator[dict]:
+        """
+        Yield the feedback entries with ids in (since, until], oldest first,
+        with their UUID and the fingerprint of the track's file (None if it
+        has none). Rows are read as they are yielded, not all at once.
+        """
+        cursor = self.conn.cursor()
+        cursor.execute("""
+            SELECT f.uuid, f.path, f.mood_pleasure, f.mood_arousal, f.rating, f.created_at, m.fingerprint
+            FROM feedback f LEFT JOIN music_files m ON m.path = f.path
+            WHERE f.id > ? AND f.id <= ?
+            ORDER BY f.id
+        """, (since, until))
+        for r in cursor:
+            yield {"uuid": r["uuid"], "fingerprint": r["fingerprint"], "path": r["path"],
+                   "mood_pleasure": r["mood_pleasure"], "mood_arousal": r["mood_arousal"],
+                   "rating": r["rating"], "created_at": r["created_at"]}
+
+    def iter_feedback_log(self) -> Iterator[tuple]:
+        """
+        Yield every feedback entry, oldest first, as a (uuid, path,
+        mood_pleasure, mood_arousal, rating, created_at) tuple read
+        straight off the cursor.
+        """
+        cursor = self.conn.cursor()
+        cursor.row_factory = None
+        cursor.execute("SELECT uuid, path, mood_pleasure, mood_arousal, rating, created_at FROM feedback ORDER BY id")
+        yield from cursor
+
+    def get_fingerprint_paths(self) -> dict[str, str]:
+        """{fingerprint: path} over the library; of several files with one fingerprint, the first path."""
+        cursor = self.conn.cursor()
+        cursor.execute("""
+            SELECT fingerprint, MIN(path) AS path FROM music_files
+            WHERE fingerprint IS NOT NULL GROUP BY fingerprint
+        """)
+        return {r["fingerprint"]: r["path"] for r in cursor.fetchall()}
+
+    def merge_feedback(self, entries: list[tuple]) -> int:
+        """
+        Insert (uuid, path, mood_pleasure, mood_arousal, rating, created_at)
+        entries whose UUID isn't in the log yet, and bring the rollup of the
+        tracks they are for up to date, in one transaction. Returns how many
+        were new; merging the same entries again adds nothing.
+        """
+        if not entries:
+            return 0
+        cursor = self.conn.cursor()
+        before = self.conn.total_changes
+        cursor.executemany("""
+            INSERT INTO feedback (uuid, path, mood_pleasure, mood_arousal, rating, created_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT (uuid) DO NOTHING
+        """, entries)
+        added = self.conn.total_changes - before
+        if added:
+            self._rebuild_rollup_of(cursor, {entry[1] for entry in entries})
+        self.conn.commit()
+        return added
+
+    def import_feedback(self, rows: Iterable[tuple], batch_size: int = 20000) -> int:
+        """
+        Insert (uuid, path, mood_pleasure, mood_arousal, rating, created_at)
+        rows in one transaction and return how many were added. Rows whose
+        UUID is already in the log, or earlier in `rows`, are skipped; a
+        None UUID gets a new one and a None created_at the current time.
+        `rows` is consumed a batch at a time, so it may stream a file of
+        any size.
+
+        Once an import has inserted 1 / _BULK_IMPORT_SHARE as many rows as
+        the log had, it drops the path index and rebuilds it at the end
+        rather than updating it row by row; into an empty log, the UUID
+        index too. One that touched as large a share of the tracks
+        rebuilds the whole rollup; a smaller one only the rollup of the
+        tracks it touched.
+        """
+        cursor = self.conn.cursor()
+        rows = iter(rows)
+        cache_size = cursor.execute("PRAGMA cache_size").fetchone()[0]
+        try:
+            cursor.execute(f"PRAGMA cache_size = -{_IMPORT_CACHE_KIB}")
+            cursor.execute("BEGIN")
+            before = self.conn.total_changes
+            logged = cursor.execute("SELECT COUNT(*) FROM feedback").fetchone()[0]
+            tracks = cursor.execute("SELECT COUNT(DISTINCT path) FROM feedback_rollup").fetchone()[0]
+            if not logged:
+                # Nothing to collide with but the import itself: check its UUIDs once, at the end
+                cursor.execute("DROP INDEX IF EXISTS idx_feedback_uuid")
+            bulk = False
+            inserted = 0
+            touched: set[str] = set()
+            for batch in iter(lambda: list(islice(rows, batch_size)), []):
+                inserted += len(batch)
+                if not bulk and inserted * _BULK_IMPORT_SHARE >= logged:
+                    cursor.execute("DROP INDEX IF EXISTS idx_feedback_path")
+                    bulk = True
+                touched.update(row[1] for row in batch)
+                cursor.executemany(f"""
+                    INSERT INTO feedback (uuid, path, mood_pleasure, mood_arousal, rating, created_at)
+                    VALUES (IFNULL(?, lower(hex(randomblob(16)))), ?, ?, ?, ?, IFNULL(?, datetime('now')))
+                    {"ON CONFLICT (uuid) DO NOTHING" if logged else ""}
+                """, batch)
+            added = self.conn.total_changes - before
+            if not logged:
+                added -= self._index_feedback_uuids(cursor)
+            partial = len(touched) * _BULK_IMPORT_SHARE < tracks
+            if added and not partial:
+                # Before the path index is back, so that the log is read in table order
+                cursor.execute("DELETE FROM feedback_rollup")
+                cursor.execute(_ROLLUP_INSERT.format(where=""))
+            if bulk:
+                cursor.execute("CREATE INDEX idx_feedback_path ON feedback (path, id)")
+            if added and partial:
+                self._rebuild_rollup_of(cursor, touched)
+        except BaseException:
+            self.conn.rollback()
+            raise
+        finally:
+            cursor.execute(f"PRAGMA cache_size = {cache_size}")
+        self.conn.commit()
+        return added
+
+    @staticmethod
+    def _index_feedback_uuids(cursor: sqlite3.Cursor) -> int:
+        """
+        Recreate the UUID index, first deleting all but the oldest of any
+        entries that share a UUID; returns how many were deleted.
+        """
+        try:
+            cursor.execute("CREATE UNIQUE INDEX idx_feedback_uuid ON feedback (uuid)")
+            return 0
+        except sqlite3.IntegrityError:
+            cursor.execute("DELETE FROM feedback WHERE id NOT IN (SELECT MIN(id) FROM feedback GROUP BY uuid)")
+            deleted = cursor.rowcount
+            cursor.execute("CREATE UNIQUE INDEX idx_feedback_uuid ON feedback (uuid)")
+            return deleted
+
+    @staticmethod
+    def _rebuild_rollup_of(cursor: sqlite3.Cursor, paths: Iterable[str]) -> None:
+        """Recompute the rollup rows of `paths` from the log, without committing."""
+        paths = [(path,) for path in paths]
+        cursor.executemany("DELETE FROM feedback_rollup WHERE path = ?", paths)
+        cursor.executemany(_ROLLUP_INSERT.format(where="AND path = ?"), paths)
+
+    def get_waveform(self, file_path: str) -> bytes | None:
+        """Return the stored peak/RMS envelope for a track, or None if it hasn't been analysed."""
+        cursor = self.conn.cursor()
+        cursor.execute("SELECT envelope FROM waveforms WHERE path = ?", (file_path,))
+        row = cursor.fetchone()
+        return row["envelope"] if row else None
+
+    def set_waveforms_batch(self, envelopes: list[tuple[str, int, bytes]]) -> None:
+        """Store (path, bins, envelope) rows, replacing any existing envelope."""
+        if not envelopes:
+            return
+        cursor = self.conn.cursor()
+        cursor.executemany(
+            "INSERT OR REPLACE INTO waveforms (path, bins, envelope) VALUES (?, ?, ?)",
+            envelopes,
+        )
+        self.conn.commit()
+
+    def get_paths_without_waveform(self) -> list[str]:
+        """Return the paths of all tracks that have no stored envelope."""
+        cursor = self.conn.cursor()
+        cursor.execute("""
+            SELECT m.path FROM music_files m
+            LEFT JOIN waveforms w ON w.path = m.path
+            WHERE w.path IS NULL
+            ORDER BY m.path
+        """)
+        return [r["path"] for r in cursor.fetchall()]
+
+    def get_paths_without_fingerprint(self) -> list[str]:
+        """Return the paths of all tracks whose file hasn't been fingerprinted yet."""
+        cursor = self.conn.cursor()
+        cursor.execute("SELECT path FROM music_files WHERE fingerprint IS NULL ORDER BY path")
+        return [r["path"] for r in cursor.fetchall()]
+
+    def set_fingerprints_batch(self, fingerprints: list[tuple[str, str]]) -> None:
+        """Store (path, fingerprint) pairs."""
+        if not fingerprints:
+            return
+        cursor = self.conn.cursor()
+        cursor.executemany(
+            "UPDATE music_files SET fingerprint = ? WHERE path = ?",
+            ((fingerprint, path) for path, fingerprint in fingerprints),
+        )
+        self.conn.commit()
+
+    def get_files_without_features(self) -> list[tuple[str, str]]:
+        """
+        (path, fingerprint) of one file per fingerprint that has no stored
+        features, so copies of the same file are analysed once.
+        """
+        cursor = self.conn.cursor()
+        cursor.execute("""
+            SELECT MIN(m.path) AS path, m.fingerprint FROM music_files m
+            LEFT JOIN audio_features a ON a.fingerprint = m.fingerprint
+            WHERE m.fingerprint IS NOT NULL AND a.fingerprint IS NULL
+            GROUP BY m.fingerprint
+            ORDER BY path
+        """)
+        return [(r["path"], r["fingerprint"]) for r in cursor.fetchall()]
+
+    def set_features_batch(self, features: list[tuple[str, float | None, float, float | None, bytes]]) -> None:
+        """Store (fingerprint, loudness, peak, tempo, energy) rows, replacing any existing ones."""
+        if not features:
+            return
+        cursor = self.conn.cursor()
+        cursor.executemany(
+            "INSERT OR REPLACE INTO audio_features (fingerprint, loudness, peak, tempo, energy) VALUES (?, ?, ?, ?, ?)",
+            features,
+        )
+        self.conn.commit()
+
+    def get_files_without_signature(self) -> list[tuple[str, str]]:
+        """
+        (path, fingerprint) of one file per fingerprint that has no stored
+        acoustic signature yet.
+        """
+        cursor = self.conn.cursor()
+        cursor.execute("""
+            SELECT MIN(m.path) AS path, m.fingerprint FROM music_files m
+            LEFT JOIN acoustic_signatures s ON s.fingerprint = m.fingerprint
+            WHERE m.fingerprint IS NOT NULL AND s.fingerprint IS NULL
+            GROUP BY m.fingerprint
+            ORDER BY path
+        """)
+        return [(r["path"], r["fingerprint"]) for r in cursor.fetchall()]
+
+    def set_signatures_batch(self, signatures: list[tuple[str, bytes]]) -> None:
+        """Store (fingerprint, signature) pairs, replacing any existing ones."""
+        if not signatures:
+            return
+        cursor = self.conn.cursor()
+        cursor.executemany(
+            "INSERT OR REPLACE INTO acoustic_signatures (fingerprint, signature) VALUES (?, ?)", signatures,
+        )
+        self.conn.commit()
+
+    def get_signatures(self) -> list[tuple[str, int | None, bytes]]:
+        """(path, duration, signature) of every track with a non-empty acoustic signature, by path."""
+        cursor = self.conn.cursor()
+        cursor.execute("""
+            SELECT m.path, m.duration, s.signature FROM music_files m
+            JOIN acoustic_signatures s ON s.fingerprint = m.fingerprint
+            WHERE length(s.signature) > 0
+            ORDER BY m.path
+        """)
+        return [(r["path"], r["duration"], r["signature"]) for r in cursor.fetchall()]
+
+    def set_duplicate_groups(self, groups: list[list[str]]) -> None:
+        """Replace all duplicate groups with `groups`, each a list of paths to tracks of one song."""
+        cursor = self.conn.cursor()
+        cursor.execute("DELETE FROM duplicates")
+        cursor.executemany(
+            "INSERT OR REPLACE INTO duplicates (path, group_id) VALUES (?, ?)",
+            ((path, group_id) for group_id, paths in enumerate(groups, 1) for path in paths),
+        )
+        self.conn.commit()
+
+    def get_duplicate_groups(self) -> list[list[str]]:
+        """Every duplicate group as a list of paths, by group."""
+        cursor = self.conn.cursor()
+        cursor.execute("SELECT path, group_id FROM duplicates ORDER BY group_id, path")
+        groups: dict[int, list[str]] = {}
+        for row in cursor.fetchall():
+            groups.setdefault(row["group_id"], []).append(row["path"])
+        return list(groups.values())
+
+    def set_availability(self, found: list[str], missing: list[str]) -> None:
+        """
+        Record the result of an integrity check: `found` paths exist and are
+        stamped as seen now; `missing` ones don't, and keep the time they
+        were last seen.
+        """
+        cursor = self.conn.cursor()
+        cursor.executemany(
+            "UPDATE music_files SET available = 1, last_seen = datetime('now') WHERE path = ?",
+            ((path,) for path in found),
         )
+        cursor.executemany("UPDATE music_files SET available = 0 WHERE path = ?", ((path,) for path in missing))
         self.conn.commit()
 
     def update_feedback(self, file_path: str, feedback: str):
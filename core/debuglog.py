@@ -0,0 +1,117 @@
+"""
+Structured debug channel (main.py --debug).
+
+Events are JSON lines. The calling thread only queues a record; a
+background listener serialises it and appends it to a size-rotated file,
+so logging costs the UI thread next to nothing however large a record is.
+"""
+
+import json
+import logging
+import logging.handlers
+import queue
+
+import numpy as np
+
+from config import (
+    DEBUG_LOG_BACKUPS, DEBUG_LOG_MAX_BYTES, DEBUG_LOG_MODE, DEBUG_LOG_PATH,
+    DEBUG_LOG_SAMPLE, DEBUG_LOG_TOP_K,
+)
+
+MODES = ("topk", "sample", "all")
+
+
+class Deferred:
+    """A field whose value is computed by the logging thread when the record is written."""
+
+    __slots__ = ("_compute",)
+
+    def __init__(self, compute):
+        self._compute = compute
+
+    def __call__(self):
+        return self._compute()
+
+
+def _json_default(value):
+    if isinstance(value, Deferred):
+        return value()
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    return str(value)
+
+
+class _JsonLineFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        data = {"ts": round(record.created, 3), "event": record.getMessage()}
+        data.update(getattr(record, "fields", {}))
+        return json.dumps(data, default=_json_default, ensure_ascii=False)
+
+
+class DebugLog:
+    """
+    Buffered JSONL debug log.
+
+    `mode` decides how much of a large candidate set select() keeps:
+    the `top_k` highest weights, a random `sample`, or everything.
+    """
+
+    def __init__(
+        self,
+        path: str = DEBUG_LOG_PATH,
+        mode: str = DEBUG_LOG_MODE,
+        top_k: int = DEBUG_LOG_TOP_K,
+        sample: int = DEBUG_LOG_SAMPLE,
+        max_bytes: int = DEBUG_LOG_MAX_BYTES,
+        backups: int = DEBUG_LOG_BACKUPS,
+    ):
+        if mode not in MODES:
+            raise ValueError(f"debug log mode must be one of {', '.join(MODES)}, not {mode!r}")
+        self.mode = mode
+        self.top_k = top_k
+        self.sample = sample
+        self._rng = np.random.default_rng()
+
+        handler = logging.handlers.RotatingFileHandler(
+            path, maxBytes=max_bytes, backupCount=backups, encoding="utf-8", delay=True,
+        )
+        handler.setFormatter(_JsonLineFormatter())
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._listener = logging.handlers.QueueListener(self._queue, handler)
+        self._queue_handler = logging.handlers.QueueHandler(self._queue)
+
+        self._logger = logging.getLogger(f"aimu.debug.{id(self)}")
+        self._logger.setLevel(logging.DEBUG)
+        self._logger.propagate = False
+        self._logger.addHandler(self._queue_handler)
+        self._listener.start()
+
+    def event(self, name: str, **fields) -> None:
+        """
+        Queue one record. Field values must not be mutated afterwards — they
+        are serialised later on the logging thread. Wrap expensive values in
+        Deferred to compute them there too.
+        """
+        self._logger.debug(name, extra={"fields": fields})
+
+    def select(self, weights: np.ndarray) -> np.ndarray:
+        """Indices of the candidates to log under the current mode, best first for topk."""
+        n = len(weights)
+        if self.mode == "all":
+            return np.arange(n)
+        if self.mode == "sample":
+            return np.sort(self._rng.choice(n, size=min(self.sample, n), replace=False))
+        k = min(self.top_k, n)
+        if k == 0:
+            return np.arange(0)
+        top = np.argpartition(weights, n - k)[n - k:]
+        return top[np.argsort(weights[top], kind="stable")[::-1]]
+
+    def close(self) -> None:
+        """Flush queued records and stop the logging thread."""
+        self._listener.stop()
+        self._logger.removeHandler(self._queue_handler)
+        for handler in self._listener.handlers:
+            handler.close()
@@ -0,0 +1,109 @@
+"""
+Duplicate tracks: the same song ripped twice, on its album and on a
+compilation, or at another bitrate.
+
+Copies of a song have neither the same bytes nor, reliably, the same tags,
+but their acoustic signatures (core/analysis.py) differ in few bits. Comparing
+every signature with every other is out of the question at 200,000 tracks,
+so the signatures are indexed by locality-sensitive hashing: each is cut
+into _BANDS bands of _BAND_BITS bits, and only tracks that agree on all of
+one band become candidates. Two copies that differ in a twentieth of their
+bits still agree on some band 97% of the time; two unrelated tracks, which
+differ in about half, almost never do. Candidates are then compared in full
+and by length, and the pairs that pass are joined into groups with a
+union-find.
+"""
+
+import numpy as np
+
+from config import DUPLICATE_MAX_DISTANCE, DUPLICATE_MAX_LENGTH_DIFFERENCE
+from core.analysis import SIGNATURE_BITS
+
+# The first _BANDS × _BAND_BITS bits of a signature are indexed, a band at a time
+_BANDS = 10
+_BAND_BITS = 24
+
+# Buckets with more tracks than this say nothing about any of them (e.g.
+# near-silent tracks) and are not searched for candidates
+_MAX_BUCKET = 64
+
+# Candidate pairs compared per step, bounding memory on large libraries
+_COMPARE_BATCH = 1 << 16
+
+
+def _band_keys(signatures: np.ndarray) -> np.ndarray:
+    """One integer per signature and band: the band's bits."""
+    step = _BAND_BITS // 8
+    keys = np.zeros((len(signatures), _BANDS), dtype=np.int64)
+    for band in range(_BANDS):
+        for byte in range(step):
+            keys[:, band] = keys[:, band] << 8 | signatures[:, band * step + byte]
+    return keys
+
+
+def candidate_pairs(signatures: np.ndarray) -> np.ndarray:
+    """
+    Distinct (i, j), i < j, of rows of `signatures` (one packed signature
+    per row) that share a bucket in any band, as an (n, 2) array.
+    """
+    count = len(signatures)
+    found = []
+    for key in _band_keys(signatures).T:
+        order = np.argsort(key, kind="stable")
+        ordered = key[order]
+        # Members of a bucket are adjacent once sorted: pair each with the
+        # ones `offset` places after it, for every offset the bucket spans
+        start = np.flatnonzero(np.r_[True, ordered[1:] != ordered[:-1]])
+        size = np.diff(np.r_[start, count])
+        searched = np.repeat(size <= _MAX_BUCKET, size)
+        for offset in range(1, min(int(size.max()), _MAX_BUCKET)):
+            same = (ordered[offset:] == ordered[:-offset]) & searched[offset:]
+            if not same.any():
+                break
+            first, second = order[:-offset][same], order[offset:][same]
+            found.append(np.stack([np.minimum(first, second), np.maximum(first, second)], axis=1))
+    if not found:
+        return np.zeros((0, 2), dtype=np.intp)
+    return np.unique(np.concatenate(found), axis=0)
+
+
+def find_duplicates(signatures: list[bytes], lengths: list[float | None]) -> list[list[int]]:
+    """
+    Groups of at least two indices into `signatures` (as from
+    acoustic_signature; b"" for none) that are copies of the same song,
+    each sorted, in order of their first index. `lengths` are the tracks'
+    durations in seconds, or None where unknown.
+    """
+    valid = np.array([len(s) == SIGNATURE_BITS // 8 for s in signatures], dtype=bool)
+    indices = np.flatnonzero(valid)
+    if len(indices) < 2:
+        return []
+    packed = np.frombuffer(b"".join(signatures[i] for i in indices), dtype=np.uint8).reshape(len(indices), -1)
+    length = np.array([np.nan if lengths[i] is None else float(lengths[i]) for i in indices])
+
+    pairs = candidate_pairs(packed)
+    matched = []
+    for at in range(0, len(pairs), _COMPARE_BATCH):
+        i, j = pairs[at:at + _COMPARE_BATCH].T
+        distance = np.unpackbits(packed[i] ^ packed[j], axis=1).sum(axis=1) / SIGNATURE_BITS
+        gap = np.abs(length[i] - length[j])
+        same = (distance <= DUPLICATE_MAX_DISTANCE) & ~(gap > DUPLICATE_MAX_LENGTH_DIFFERENCE)
+        matched.append(pairs[at:at + _COMPARE_BATCH][same])
+
+    parent = list(range(len(indices)))
+
+    def root(x: int) -> int:
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    for i, j in (np.concatenate(matched) if matched else []):
+        a, b = root(int(i)), root(int(j))
+        if a != b:
+            parent[max(a, b)] = min(a, b)
+
+    groups: dict[int, list[int]] = {}
+    for x in range(len(indices)):
+        groups.setdefault(root(x), []).append(int(indices[x]))
+    return [members for members in groups.values() if len(members) > 1]
@@ -0,0 +1,35 @@
+"""
+Library integrity check: which tracks' files are still there.
+
+Files get deleted, renamed outside the scanner or sit on a mount that has
+gone offline, and playing one fails without a sound. The check stats every
+path in the library on a bounded pool of threads — a stalled network mount
+holds up INTEGRITY_WORKERS threads, not the player — and returns the result
+as one bool per track. The session records it in the database and keeps it
+as a mask over the track store, so station picks and the playlist skip
+missing tracks without touching the filesystem themselves.
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from config import INTEGRITY_WORKERS
+
+# Paths stat'ed per task; keeps scheduling overhead low on large libraries
+_BATCH = 256
+
+
+def _exist(paths: list[str]) -> list[bool]:
+    return [os.path.isfile(path) for path in paths]
+
+
+def check_paths(paths: list[str], workers: int = INTEGRITY_WORKERS) -> np.ndarray:
+    """Bool array: whether each of `paths` is an existing file. Blocks until every path is checked."""
+    batches = [paths[i:i + _BATCH] for i in range(0, len(paths), _BATCH)]
+    found = np.zeros(len(paths), dtype=bool)
+    with ThreadPoolExecutor(max(1, workers), thread_name_prefix="aimu-integrity") as pool:
+        for i, exist in enumerate(pool.map(_exist, batches)):
+            found[i * _BATCH:i * _BATCH + len(exist)] = exist
+    return found
@@ -8,10 +8,14 @@ DEFAULT_BINDINGS: list[tuple[str, str, str]] = [
     ("n",     "next_song",      "Next"),
     ("s",     "toggle_station", "Station"),
     ("f",     "feedback",       "Feedback"),
+    ("slash", "search",         "Search"),
+    ("o",     "cycle_sort",     "Sort"),
+    ("r",     "reverse_sort",   "Reverse sort"),
     ("left",  "seek_backward",  "- 10s"),
     ("right", "seek_forward",   "+ 10s"),
     ("z",     "volume_down",    "Vol -"),
     ("x",     "volume_up",      "Vol +"),
+    ("p",     "profile",        "Profiler"),
 ]
 
 
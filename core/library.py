@@ -0,0 +1,315 @@
+import math
+import re
+from pathlib import Path
+
+import numpy as np
+
+
+def song_from_row(file_entry: dict) -> dict:
+    """Build the in-memory song dict used by the UI from a database row."""
+    artist = file_entry.get("artist") if file_entry.get("artist") else "Unknown Artist"
+    title = file_entry.get("title") if file_entry.get("title") else Path(file_entry["path"]).stem
+    display_name = f"{artist} - {title}"
+    # The tag's BPM if it has one, else the tempo measured by scan --analyze
+    tempo = file_entry.get("tempo")
+    bpm = file_entry.get("bpm") or (round(tempo) if tempo else None)
+
+    return {
+        "name": display_name,
+        "path": file_entry["path"],
+        "rating": file_entry.get("rating", 1),
+        "duration": file_entry.get("duration"),
+        "bitrate": file_entry.get("bitrate"),
+        "album": file_entry.get("album"),
+        "bpm": bpm,
+        "title": file_entry.get("title"),
+        "artist": file_entry.get("artist"),
+        "albumartist": file_entry.get("albumartist"),
+        "tracknumber": file_entry.get("tracknumber"),
+        "genre": file_entry.get("genre"),
+        "date": file_entry.get("date"),
+        "feedback": file_entry.get("feedback"),
+        "mood_pleasure": file_entry.get("mood_pleasure"),
+        "mood_arousal": file_entry.get("mood_arousal"),
+        "available": file_entry.get("available", True),
+        "loudness": file_entry.get("loudness"),
+        "peak": file_entry.get("peak"),
+        "tempo": tempo,
+        "duplicate_group": file_entry.get("duplicate_group"),
+    }
+
+
+def _leading_int(value) -> float:
+    """Parse '1997-04-01', '3/12' or 128 into a number; NaN if there is none."""
+    if value is None:
+        return np.nan
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    match = re.match(r"\s*(\d+)", str(value))
+    return float(match.group(1)) if match else np.nan
+
+
+# Numeric columns and how each is read from a song dict. Columns not listed
+# here (e.g. "station") are computed elsewhere and stored with set_column().
+NUMERIC_COLUMNS = {
+    "year":     lambda s: _leading_int(s.get("date")),
+    "bpm":      lambda s: _leading_int(s.get("bpm")),
+    "duration": lambda s: _leading_int(s.get("duration")),
+    "rating":   lambda s: _leading_int(s.get("rating")),
+}
+
+
+def _track_number(song: dict) -> float:
+    number = _leading_int(song.get("tracknumber"))
+    return 0.0 if np.isnan(number) else number
+
+
+# Text columns sort on a tuple key, like the original (artist, title) ordering
+TEXT_COLUMNS = {
+    "artist": lambda s: (s.get("artist") or "", s.get("title") or ""),
+    "album":  lambda s: (s.get("album") or "", _track_number(s), s.get("title") or ""),
+}
+
+
+def _artist_key(song: dict) -> str:
+    return (song.get("albumartist") or song.get("artist") or "").casefold()
+
+
+def _album_key(song: dict) -> tuple | str:
+    album = (song.get("album") or "").casefold()
+    # The same album title by different artists is a different album
+    return (_artist_key(song), album) if album else ""
+
+
+def _sound_key(song: dict) -> tuple | str:
+    # Measured tempo in quarter-octave steps and loudness in 3 LU steps:
+    # coarse enough that each cell holds tracks of a similar drive
+    tempo, loudness = song.get("tempo"), song.get("loudness")
+    if not tempo or loudness is None:
+        return ""
+    return (round(math.log2(tempo) * 4), round(loudness / 3))
+
+
+# Keys for group_ids(): tracks with equal keys share a group; an empty key
+# means the track belongs to none
+GROUP_KEYS = {
+    "artist": _artist_key,
+    "album":  _album_key,
+    "sound":  _sound_key,
+    # Copies of one song found by scan --dedupe
+    "duplicate": lambda s: s.get("duplicate_group") or "",
+}
+
+
+class TrackStore:
+    """
+    The in-memory track library.
+
+    Every track is addressed by its integer index into the store. Widgets,
+    the playlist cursor and station mode all pass these indices around
+    instead of paths, so nothing has to be looked up or rebuilt per row.
+
+    Sortable columns are materialised once as NumPy arrays and each sort
+    order as an integer permutation of store indices. Both are cached until
+    touch() reports that the column changed, so switching sort order is a
+    dictionary lookup rather than a re-sort.
+
+    The store belongs to the event loop's thread. A worker may build sort
+    orders with sort_orders(), which caches nothing; add_sort_orders() then
+    keeps those whose column hasn't changed since.
+    """
+
+    def __init__(self, songs: list[dict] | None = None):
+        self._songs: list[dict] = list(songs) if songs else []
+        self._columns: dict[str, np.ndarray] = {}
+        self._permutations: dict[tuple[str, bool], np.ndarray] = {}
+        self._groups: dict[str, np.ndarray] = {}
+        self._path_index: dict[str, int] | None = None
+        self._available: np.ndarray | None = None
+        # Bumped when the store is extended or cleared, and per column when it changes
+        self._resets = 0
+        self._changes: dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._songs)
+
+    def __getitem__(self, index: int) -> dict:
+        return self._songs[index]
+
+    def __iter__(self):
+        return iter(self._songs)
+
+    def extend(self, songs: list[dict]) -> range:
+        """
+        Append songs to the store and return the range of their new indices.
+        A cached ascending text sort order survives when the new songs arrive
+        already in that order and after every existing song, as they do when
+        the library is loaded a chunk at a time.
+        """
+        start = len(self._songs)
+        kept = {}
+        for name, sort_key in TEXT_COLUMNS.items():
+            perm = self._permutations.get((name, False))
+            if perm is None or not songs:
+                continue
+            keys = [sort_key(song) for song in songs]
+            if len(perm) and sort_key(self._songs[perm[-1]]) > keys[0]:
+                continue
+            if all(a <= b for a, b in zip(keys, keys[1:])):
+                kept[name, False] = np.concatenate([perm, np.arange(start, start + len(songs))])
+        self._songs.extend(songs)
+        self._resets += 1
+        self._columns.clear()
+        self._permutations = kept
+        self._groups.clear()
+        self._path_index = None
+        self._available = None
+        return range(start, len(self._songs))
+
+    def clear(self) -> None:
+        """Remove all songs from the store."""
+        self._songs.clear()
+        self._resets += 1
+        self._columns.clear()
+        self._permutations.clear()
+        self._groups.clear()
+        self._path_index = None
+        self._available = None
+
+    def index_of(self, path: str) -> int:
+        """Store index of the track at `path`, or -1."""
+        if self._path_index is None:
+            self._path_index = {song["path"]: i for i, song in enumerate(self._songs)}
+        return self._path_index.get(path, -1)
+
+    # ── Columns ───────────────────────────────────────────────────────────────
+
+    def column(self, name: str) -> np.ndarray:
+        """Float array of a numeric column over the whole store (NaN = missing)."""
+        values = self._columns.get(name)
+        if values is None:
+            # A computed column not set yet is cached like the others, as
+            # the playlist reads it for every row it draws
+            values = self._columns[name] = self._read_column(name)
+        return values
+
+    def _read_column(self, name: str) -> np.ndarray:
+        read = NUMERIC_COLUMNS.get(name)
+        if read is None:
+            return np.full(len(self._songs), np.nan)
+        return np.fromiter((read(s) for s in self._songs), dtype=np.float64, count=len(self._songs))
+
+    def group_ids(self, name: str) -> np.ndarray:
+        """
+        Dense group number per track under GROUP_KEYS[name] (0 … groups−1,
+        numbered in order of first appearance), or -1 for tracks without one.
+        """
+        ids = self._groups.get(name)
+        if ids is None:
+            key_of = GROUP_KEYS[name]
+            numbers: dict = {"": -1}
+            ids = np.fromiter(
+                (numbers.setdefault(key_of(s), len(numbers) - 1) for s in self._songs),
+                dtype=np.int64, count=len(self._songs),
+            )
+            self._groups[name] = ids
+        return ids
+
+    def set_column(self, name: str, values: np.ndarray) -> None:
+        """Store a computed column (e.g. station score) and drop its cached sort orders."""
+        self._columns[name] = values
+        self._drop_permutations(name)
+
+    def touch(self, name: str) -> None:
+        """Mark a column as changed; its values and sort orders are rebuilt on next use."""
+        if name in NUMERIC_COLUMNS:
+            self._columns.pop(name, None)
+        self._drop_permutations(name)
+
+    def _drop_permutations(self, name: str) -> None:
+        self._changes[name] = self._changes.get(name, 0) + 1
+        for key in [k for k in self._permutations if k[0] == name]:
+            del self._permutations[key]
+
+    def _stamp(self, name: str) -> tuple[int, int]:
+        return self._resets, self._changes.get(name, 0)
+
+    def availability(self) -> np.ndarray:
+        """Bool array over the store: False where the last integrity check didn't find the file."""
+        if self._available is None:
+            self._available = np.fromiter(
+                (s.get("available", True) for s in self._songs), dtype=bool, count=len(self._songs),
+            )
+        return self._available
+
+    def set_available(self, indices, available: bool) -> None:
+        """Mark the tracks at `indices` as present on disk or gone."""
+        mask = self.availability()
+        for i in indices:
+            self._songs[i]["available"] = available
+            mask[i] = available
+
+    # ── Sorting ───────────────────────────────────────────────────────────────
+
+    def sort_orders(self, names) -> list[tuple]:
+        """
+        The ascending and descending permutations of each of `names`, as
+        (key, stamp, permutation) for add_sort_orders(). Nothing is cached,
+        so a worker thread may call this while the store is in use.
+        """
+        orders = []
+        for name in names:
+            # Stamped before reading, so a change made meanwhile voids the result
+            stamp = self._stamp(name)
+            values = None
+            if name not in TEXT_COLUMNS:
+                values = self._columns.get(name)
+                if values is None:
+                    values = self._read_column(name)
+            ascending = self._ascending(name, values)
+            orders.append(((name, False), stamp, ascending))
+            orders.append(((name, True), stamp, self._descending(name, ascending, values)))
+        return orders
+
+    def add_sort_orders(self, orders: list[tuple]) -> None:
+        """Cache the sort orders from sort_orders() whose column hasn't changed since."""
+        for key, stamp, perm in orders:
+            if stamp == self._stamp(key[0]):
+                self._permutations.setdefault(key, perm)
+
+    def sort_permutation(self, name: str, descending: bool = False) -> np.ndarray:
+        """
+        Store indices ordered by column `name`. Missing values always sort
+        last. The descending order is derived from the ascending one without
+        sorting again.
+        """
+        key = (name, descending)
+        perm = self._permutations.get(key)
+        if perm is not None:
+            return perm
+        values = None if name in TEXT_COLUMNS else self.column(name)
+        if descending:
+            perm = self._descending(name, self.sort_permutation(name), values)
+        else:
+            perm = self._ascending(name, values)
+        self._permutations[key] = perm
+        return perm
+
+    def _ascending(self, name: str, values: np.ndarray | None) -> np.ndarray:
+        if name in TEXT_COLUMNS:
+            sort_key = TEXT_COLUMNS[name]
+            songs = self._songs
+            return np.array(sorted(range(len(songs)), key=lambda i: sort_key(songs[i])), dtype=np.int64)
+        # argsort puts NaN last; stable keeps store order among equal values
+        return np.argsort(values, kind="stable")
+
+    @staticmethod
+    def _descending(name: str, ascending: np.ndarray, values: np.ndarray | None) -> np.ndarray:
+        if name in TEXT_COLUMNS:
+            return ascending[::-1].copy()
+        n_valid = int(np.count_nonzero(~np.isnan(values)))
+        return np.concatenate([ascending[:n_valid][::-1], ascending[n_valid:]])
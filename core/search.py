@@ -0,0 +1,330 @@
+import re
+import unicodedata
+
+import numpy as np
+
+# Fields of a song that take part in search
+SEARCH_FIELDS = ("title", "artist", "album", "genre")
+
+# `field:value` filters accepted in a query, mapped to store columns
+TEXT_FILTERS = {"title", "artist", "album", "genre"}
+NUMERIC_FILTERS = {
+    "year": "year",
+    "bpm": "bpm",
+    "time": "duration",
+    "duration": "duration",
+    "rating": "rating",
+    "station": "station",
+}
+
+_RANGE = re.compile(r"^(?P<lo>[\d.:]*)-(?P<hi>[\d.:]*)$")
+_COMPARE = re.compile(r"^(?P<op><=|>=|<|>|=)?(?P<num>[\d.:]+)$")
+
+# Codepoints fit in 21 bits; 0x1FFFFF is never a valid codepoint, so it pads
+# unigram and bigram keys and keeps all three n-gram sizes in one key space.
+_BITS = 21
+_PAD = (1 << _BITS) - 1
+
+
+def normalise(text: str) -> str:
+    """Case-fold and strip accents so 'Beyoncé' matches 'beyonce'."""
+    if text.isascii():
+        return text.lower()
+    decomposed = unicodedata.normalize("NFKD", text.casefold())
+    return "".join(c for c in decomposed if not unicodedata.combining(c))
+
+
+def _gram_key(gram: str) -> int:
+    c = [ord(ch) for ch in gram] + [_PAD] * (3 - len(gram))
+    return (c[0] << (2 * _BITS)) | (c[1] << _BITS) | c[2]
+
+
+class _Postings:
+    """
+    An inverted list in CSR form: the values posted under each key are kept
+    in one flat array, in ascending order, and sliced out by key.
+    """
+
+    def __init__(self, keys: np.ndarray, values: np.ndarray, dense_keys: int | None = None):
+        order = np.argsort(keys, kind="stable")
+        keys, values = keys[order], values[order]
+        # Drop repeated pairs, e.g. a gram occurring twice in one word ("banana")
+        if len(keys):
+            keep = np.ones(len(keys), dtype=bool)
+            keep[1:] = (keys[1:] != keys[:-1]) | (values[1:] != values[:-1])
+            keys, values = keys[keep], values[keep]
+        self.values = values
+        if dense_keys is not None:
+            # Keys are 0..dense_keys-1, so offsets can be indexed directly
+            self.keys = None
+            self.offsets = np.searchsorted(keys, np.arange(dense_keys + 1))
+        else:
+            self.keys, first = np.unique(keys, return_index=True)
+            self.offsets = np.append(first, len(keys))
+
+    def get(self, key: int) -> np.ndarray:
+        i = int(np.searchsorted(self.keys, key))
+        if i >= len(self.keys) or self.keys[i] != key:
+            return self.values[:0]
+        return self.values[self.offsets[i]:self.offsets[i + 1]]
+
+    def gather(self, dense_ids: np.ndarray) -> np.ndarray:
+        """Concatenate the postings of many dense keys without a Python loop."""
+        dense_ids = dense_ids[dense_ids < len(self.offsets) - 1]
+        starts = self.offsets[dense_ids]
+        lengths = self.offsets[dense_ids + 1] - starts
+        total = int(lengths.sum())
+        if not total:
+            return self.values[:0]
+        shift = np.repeat(starts - np.concatenate([[0], np.cumsum(lengths)[:-1]]), lengths)
+        return self.values[shift + np.arange(total)]
+
+
+def _gram_postings(words: list[str], first_id: int) -> _Postings:
+    """Post every unigram, bigram and trigram of each word under its word id."""
+    joined = "\x00".join(words) + "\x00"
+    codes = np.frombuffer(joined.encode("utf-32-le"), dtype=np.uint32).astype(np.int64)
+    lengths = np.fromiter((len(w) + 1 for w in words), dtype=np.int64, count=len(words))
+    word_of = np.repeat(np.arange(first_id, first_id + len(words), dtype=np.int64), lengths)
+
+    n = len(codes)
+    padded = np.concatenate([codes, np.zeros(2, dtype=np.int64)])
+    c0, c1, c2 = padded[:n], padded[1:n + 1], padded[2:n + 2]
+
+    # A gram is valid only if none of its characters is the separator
+    m1 = c0 != 0
+    m2 = m1 & (c1 != 0)
+    m3 = m2 & (c2 != 0)
+    keys = np.concatenate([
+        (c0 << (2 * _BITS) | _PAD << _BITS | _PAD)[m1],
+        (c0 << (2 * _BITS) | c1 << _BITS | _PAD)[m2],
+        (c0 << (2 * _BITS) | c1 << _BITS | c2)[m3],
+    ])
+    ids = np.concatenate([word_of[m1], word_of[m2], word_of[m3]])
+
+    return _Postings(keys, ids)
+
+
+class TrigramIndex:
+    """
+    In-memory substring index over title/artist/album/genre of the track store.
+
+    Track metadata is highly repetitive (the same artist, album and genre
+    words recur on thousands of tracks), so the index works on the
+    vocabulary: every unigram, bigram and trigram of each distinct word is
+    posted under the word, and each word is posted under the tracks that use
+    it. A query term is matched against the vocabulary first, then expanded
+    to tracks. Tracks are indexed in segments, so they can be appended as the
+    library loads.
+    """
+
+    def __init__(self):
+        self._word_ids: dict[str, int] = {}
+        self._words: list[str] = []
+        self._gram_segments: list[_Postings] = []
+        self._track_segments: list[_Postings] = []
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def add(self, songs, start: int | None = None) -> None:
+        """Index `songs`, whose store indices begin at `start` (default: the next free index)."""
+        if start is None:
+            start = self._size
+        word_ids = self._word_ids
+        first_new = len(self._words)
+
+        texts = [
+            normalise(" ".join([str(song.get(f) or "") for f in SEARCH_FIELDS]))
+            for song in songs
+        ]
+        counts = np.empty(len(texts), dtype=np.int64)
+        word_col: list[int] = []
+        vocab = self._words
+        for offset, text in enumerate(texts):
+            words = set(text.split())
+            counts[offset] = len(words)
+            for word in words:
+                wid = word_ids.setdefault(word, len(vocab))
+                if wid == len(vocab):
+                    vocab.append(word)
+                word_col.append(wid)
+        track_col = np.repeat(np.arange(start, start + len(texts), dtype=np.int32), counts)
+        self._size = max(self._size, start + len(texts))
+
+        if len(self._words) > first_new:
+            self._gram_segments.append(_gram_postings(self._words[first_new:], first_new))
+        if word_col:
+            self._track_segments.append(_Postings(
+                np.array(word_col, dtype=np.int64),
+                track_col,
+                dense_keys=len(self._words),
+            ))
+
+    def _match_words(self, term: str) -> np.ndarray:
+        """Ids of vocabulary words containing `term`."""
+        if len(term) <= 3:
+            key = _gram_key(term)
+            return np.concatenate([seg.get(key) for seg in self._gram_segments] or [[]]).astype(np.int64)
+
+        grams = {_gram_key(term[i:i + 3]) for i in range(len(term) - 2)}
+        words = self._words
+        result = []
+        for seg in self._gram_segments:
+            lists = sorted((seg.get(k) for k in grams), key=len)
+            candidates = lists[0]
+            for other in lists[1:]:
+                if not len(candidates):
+                    break
+                candidates = np.intersect1d(candidates, other, assume_unique=True)
+            # Every trigram being present doesn't make them contiguous
+            result.extend(i for i in candidates.tolist() if term in words[i])
+        return np.array(result, dtype=np.int64)
+
+    def search(self, query: str) -> np.ndarray | None:
+        """
+        Return ascending store indices of tracks matching every whitespace-
+        separated term of `query`, or None when the query is empty.
+        """
+        terms = set(normalise(query).split())
+        if not terms:
+            return None
+
+        mask = None
+        for term in terms:
+            word_ids = self._match_words(term)
+            hits = np.zeros(self._size, dtype=bool)
+            for seg in self._track_segments:
+                hits[seg.gather(word_ids)] = True
+            mask = hits if mask is None else mask & hits
+            if not mask.any():
+                break
+        return np.flatnonzero(mask)
+
+
+def parse_query(query: str) -> tuple[str, list[tuple[str, str]]]:
+    """Split a query into free text and (field, value) filters like 'year:1990-1999'."""
+    terms, filters = [], []
+    for token in query.split():
+        field, sep, value = token.partition(":")
+        field = field.lower()
+        if sep and value and (field in TEXT_FILTERS or field in NUMERIC_FILTERS):
+            filters.append((field, value))
+        else:
+            terms.append(token)
+    return " ".join(terms), filters
+
+
+def _number(text: str) -> float:
+    """'245', '4.5' or a duration like '4:05' (seconds)."""
+    if ":" in text:
+        minutes, _, seconds = text.partition(":")
+        return float(minutes or 0) * 60 + float(seconds or 0)
+    return float(text)
+
+
+def _numeric_mask(values: np.ndarray, spec: str) -> np.ndarray | None:
+    """Mask of `values` matching '120', '>120', '<=3', '1990-1999'; None if spec is malformed."""
+    try:
+        match = _RANGE.match(spec)
+        if match:
+            lo = _number(match["lo"]) if match["lo"] else -np.inf
+            hi = _number(match["hi"]) if match["hi"] else np.inf
+            return (values >= lo) & (values <= hi)
+        match = _COMPARE.match(spec)
+        if match:
+            num = _number(match["num"])
+            op = match["op"] or "="
+            with np.errstate(invalid="ignore"):
+                if op == "<":
+                    return values < num
+                if op == "<=":
+                    return values <= num
+                if op == ">":
+                    return values > num
+                if op == ">=":
+                    return values >= num
+                return values == num
+    except ValueError:
+        pass
+    return None
+
+
+def query_mask(query: str, store, index: "TrigramIndex | None") -> np.ndarray | None:
+    """
+    Boolean mask over the track store for a playlist query: free-text terms
+    go through the index, `field:value` filters through the store's column
+    arrays. Returns None when the query filters nothing.
+
+    Until the index is built, free text and text filters are left out: a
+    text filter without it would test every track in Python, far too slow
+    to run per keystroke on the event loop. Callers apply the query again
+    once the index is ready.
+    """
+    text, filters = parse_query(query)
+    mask = None
+
+    if index is not None:
+        hits = index.search(text)
+        if hits is not None:
+            mask = np.zeros(len(store), dtype=bool)
+            mask[hits[hits < len(store)]] = True
+
+    for field, value in filters:
+        if field in NUMERIC_FILTERS:
+            part = _numeric_mask(store.column(NUMERIC_FILTERS[field]), value)
+            if part is None:
+                continue
+        elif index is None:
+            continue
+        else:
+            # Narrow with the index, then check the term is in that field
+            term = normalise(value)
+            candidates = index.search(term)
+            part = np.zeros(len(store), dtype=bool)
+            for i in candidates.tolist():
+                if i < len(store) and term in normalise(str(store[i].get(field) or "")):
+                    part[i] = True
+        mask = part if mask is None else mask & part
+    return mask
+
+
+# --- Quick Benchmark Block ---
+# python -m core.search [N]  — builds an index over N synthetic tracks and
+# times a few typical search-as-you-type keystroke sequences.
+if __name__ == "__main__":
+    import random
+    import sys
+    import time
+
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    rng = random.Random(7)
+    words = ["love", "night", "blue", "dance", "fire", "heart", "rain", "city",
+             "dream", "gold", "sky", "road", "river", "moon", "song", "wild"]
+    genres = ["Rock", "Pop", "Jazz", "Electronic", "Hip-Hop", "Folk", "Metal"]
+    songs = [
+        {
+            "title": " ".join(rng.choices(words, k=rng.randint(1, 4))).title() + f" {rng.randint(0, n)}",
+            "artist": f"Artist {rng.randint(0, n // 12)}",
+            "album": f"{rng.choice(words).title()} Album {rng.randint(0, n // 10)}",
+            "genre": rng.choice(genres),
+        }
+        for _ in range(n)
+    ]
+
+    t0 = time.perf_counter()
+    index = TrigramIndex()
+    index.add(songs)
+    print(f"Built index over {n} tracks in {time.perf_counter() - t0:.2f}s")
+
+    for query in ["midnight dance", "artist 42", "jazz blue moon", "golden river"]:
+        timings = []
+        for k in range(1, len(query) + 1):
+            t0 = time.perf_counter()
+            hits = index.search(query[:k])
+            timings.append((time.perf_counter() - t0) * 1000)
+        timings.sort()
+        print(f"{query!r:>18}: {len(timings)} keystrokes  "
+              f"median {timings[len(timings) // 2]:.2f} ms  max {timings[-1]:.2f} ms  "
+              f"final hits {0 if hits is None else len(hits)}")
@@ -0,0 +1,397 @@
+"""
+The player session: the library, what is playing and what plays next.
+
+A PlayerSession owns the audio engine, the database connection, the
+in-memory library and the station scorer, and has no UI of its own. The
+Textual app either drives one in-process or attaches to the one held by
+the playback daemon (core/daemon.py). Either way, clients learn what
+changed from the events the session emits:
+
+    library   {count, done}            more of the library has loaded
+    track     {index, waveform}        a track started playing
+    station   {on, pleasure, arousal}  station mode or the session mood changed
+    feedback  {index, cells, mood_pleasure, mood_arousal, rating}
+    volume    {level}
+    availability {missing, found}      tracks whose files went missing or came back
+    status    {progress, current_ms, total_ms, is_playing, current_index}
+"""
+
+import asyncio
+import random
+from typing import Callable
+
+import numpy as np
+
+from config import (
+    CACHE_DIR, DB_PATH, DEFAULT_VOLUME, INTEGRITY_INTERVAL, LIBRARY_FIRST_CHUNK, LIBRARY_MAX_CHUNK,
+    LOUDNESS_TARGET,
+)
+from core.analysis import track_gain
+from core.async_db import AsyncMusicDatabase
+from core.cache import TrackCache
+from core.debuglog import DebugLog, Deferred
+from core.integrity import check_paths
+from core.library import TrackStore, song_from_row
+from core.station import StationScorer, normalise_scores, pick_weights, song_station_score
+
+# Seconds seek() moves by when a client doesn't say
+SEEK_STEP = 10
+
+# Order tracks play in outside station mode until a client sends its own
+DEFAULT_QUEUE_ORDER = "artist"
+
+Listener = Callable[[str, dict], None]
+
+
+def _songs_from_rows(db_files: list[dict]) -> list[dict]:
+    songs = []
+    for file_entry in db_files:
+        try:
+            songs.append(song_from_row(file_entry))
+        except Exception:
+            continue
+    return songs
+
+
+class SessionState:
+    """
+    Library and station state shared by a session and its mirrors: the
+    track store, the station scorer, the session mood and the station
+    column derived from them.
+    """
+
+    def __init__(self):
+        self.songs = TrackStore()
+        self.station = StationScorer(self.songs, [])
+        self.station_raw: np.ndarray | None = None
+        self.station_pick_raw: np.ndarray | None = None
+        self.current_index = -1
+        self.station_mode = False
+        self.station_pleasure: int = 3
+        self.station_arousal: int = 3
+        self.volume_level: int = DEFAULT_VOLUME // 10
+        # Set once the whole library and its station scores are loaded
+        self.loaded = asyncio.Event()
+        self._listeners: list[Listener] = []
+
+    def subscribe(self, listener: Listener) -> None:
+        """Call `listener(event, data)` for every event the session emits."""
+        self._listeners.append(listener)
+
+    def unsubscribe(self, listener: Listener) -> None:
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    def _emit(self, event: str, **data) -> None:
+        for listener in list(self._listeners):
+            listener(event, data)
+
+    def _use_station(self, station: StationScorer) -> None:
+        self.station = station
+        self.refresh_station_scores()
+        self.loaded.set()
+
+    def refresh_station_scores(self) -> None:
+        """Recompute every track's score for the session mood and publish it as the station column."""
+        raw, self.station_pick_raw = self.station.scores(self.station_pleasure, self.station_arousal)
+        self.station_raw = raw
+        normalised = normalise_scores(raw)
+        normalised[np.isnan(raw)] = np.nan
+        self.songs.set_column("station", normalised)
+
+    def song_station_score(self, cells: list) -> float | None:
+        """Return the mood-proximity raw score for a single song, or None if no valid feedback."""
+        return song_station_score(cells, self.station_pleasure, self.station_arousal)
+
+    def _apply_station(self, on: bool, pleasure: int, arousal: int) -> None:
+        self.station_mode = on
+        if (pleasure, arousal) != (self.station_pleasure, self.station_arousal):
+            self.station_pleasure, self.station_arousal = pleasure, arousal
+            self.refresh_station_scores()
+
+    def _apply_feedback(self, index: int, cells: list[dict], pleasure: int, arousal: int, rating: int) -> None:
+        song = self.songs[index]
+        song["mood_pleasure"] = pleasure
+        song["mood_arousal"] = arousal
+        song["rating"] = rating
+        self.station.update_track(index, cells)
+        self.songs.touch("rating")
+        self.refresh_station_scores()
+
+    def _apply_availability(self, missing: list[int], found: list[int]) -> None:
+        self.songs.set_available(missing, False)
+        self.songs.set_available(found, True)
+
+
+class PlayerSession(SessionState):
+    """
+    The playing session, driven from an asyncio event loop. Methods that
+    touch the database are coroutines and wait for it on worker threads,
+    never on the loop. Auto-advance happens in tick(), which the owner
+    calls about twice a second.
+    """
+
+    def __init__(self, audio=None, db: AsyncMusicDatabase | None = None, db_path: str = DB_PATH,
+                 debug_log: DebugLog | None = None, cache: TrackCache | None = None):
+        """`cache` defaults to a TrackCache in CACHE_DIR, or none if that isn't set."""
+        super().__init__()
+        if audio is None:
+            # Imported here so that headless sessions don't need python-vlc
+            from core.audio import AudioEngine
+            audio = AudioEngine()
+        self.audio = audio
+        self.db = db if db is not None else AsyncMusicDatabase(db_path=db_path)
+        self.debug_log = debug_log
+        if cache is None and CACHE_DIR:
+            cache = TrackCache(CACHE_DIR)
+        self.cache = cache
+        # Store indices in play order outside station mode
+        self.queue = np.arange(0)
+        # The track next() will play, chosen when the current one starts so
+        # that the cache can fetch it ahead of time; -1 for none
+        self.upcoming = -1
+        # The move to the next track that tick() started, while it runs
+        self.advancing: asyncio.Task | None = None
+        # Seconds between integrity checks in watch_files(); None for none
+        self.check_interval: float | None = INTEGRITY_INTERVAL
+        self.audio.set_volume(self.volume_level * 10)
+
+    async def load(self) -> list[str]:
+        """
+        Load the library in chunks, in playlist order, emitting a library
+        event after each; then build the station scores from the feedback
+        rollup, read meanwhile on another connection. Returns error
+        messages, if any.
+        """
+        errors = []
+        feedback = asyncio.ensure_future(self.db.get_feedback_rollup())
+        after, limit = None, LIBRARY_FIRST_CHUNK
+        try:
+            while True:
+                db_files = await self.db.get_files_chunk(after, limit)
+                self.songs.extend(await asyncio.to_thread(_songs_from_rows, db_files))
+                self._emit("library", count=len(self.songs), done=False)
+                if len(db_files) < limit:
+                    break
+                last = db_files[-1]
+                after = (last["artist"] or "", last["title"] or "", last["path"])
+                limit = min(limit * 2, LIBRARY_MAX_CHUNK)
+        except Exception as e:
+            errors.append(f"Error loading database: {e}")
+
+        try:
+            cells = await feedback
+        except Exception as e:
+            errors.append(f"Error loading feedback: {e}")
+            cells = []
+        # Grouping a large library by album and artist takes a while; the
+        # store no longer changes, so it can be done off the event loop
+        self._use_station(await asyncio.to_thread(StationScorer, self.songs, cells))
+        self.queue = self.songs.sort_permutation(DEFAULT_QUEUE_ORDER)
+        self._emit("library", count=len(self.songs), done=True)
+        return errors
+
+    async def check_files(self) -> int:
+        """
+        Stat every track's file off the event loop, record which are there
+        in the database and publish the tracks whose state changed. Returns
+        how many files are missing.
+        """
+        paths = [song["path"] for song in self.songs]
+        found = await asyncio.to_thread(check_paths, paths)
+        await self.db.set_availability(
+            [p for p, ok in zip(paths, found.tolist()) if ok],
+            [p for p, ok in zip(paths, found.tolist()) if not ok],
+        )
+        was = self.songs.availability()
+        missing = np.flatnonzero(was & ~found).tolist()
+        back = np.flatnonzero(~was & found).tolist()
+        if missing or back:
+            self._apply_availability(missing, back)
+            self._emit("availability", missing=missing, found=back)
+            if not self.station_mode:
+                self._plan_next()
+        return len(paths) - int(np.count_nonzero(found))
+
+    async def watch_files(self) -> None:
+        """Run check_files() once the library is loaded and every check_interval seconds after."""
+        await self.loaded.wait()
+        while self.check_interval:
+            try:
+                await self.check_files()
+            except Exception as e:
+                self._emit("error", message=f"Error checking library files: {e}")
+            await asyncio.sleep(self.check_interval)
+
+    def close(self) -> None:
+        self.audio.stop()
+        self.db.close()
+        if self.cache is not None:
+            self.cache.close()
+        if self.debug_log is not None:
+            self.debug_log.close()
+
+    # ── Station ───────────────────────────────────────────────────────────────
+
+    def pick_station_song(self) -> int:
+        """
+        Return a random song index weighted by mood-proximity and feedback
+        rating, or -1 if no track whose file is there can be picked.
+        """
+        px, py = self.station_pleasure, self.station_arousal
+
+        # Songs with no feedback of their own or in their album/artist score 0, i.e. neutral
+        normalised = normalise_scores(self.station_pick_raw)
+        weights = pick_weights(normalised, self.songs.availability(), self.songs.group_ids("duplicate"))
+        if not weights.any():
+            return -1
+
+        index = random.choices(range(len(self.songs)), weights=weights.tolist(), k=1)[0]
+        if self.debug_log is not None:
+            self._log_station_pick(px, py, normalised, weights, index)
+        return index
+
+    def _log_station_pick(self, pleasure: int, arousal: int, normalised: np.ndarray,
+                          weights: np.ndarray, index: int) -> None:
+        """Summary stats plus the candidates chosen by the debug log mode; lists are built off-thread."""
+        songs = self.songs
+        logged = self.debug_log.select(weights)
+        total = float(weights.sum())
+        self.debug_log.event(
+            "station_pick",
+            mood=pleasure,
+            energy=arousal,
+            candidates=len(weights),
+            with_feedback=int(np.count_nonzero(~np.isnan(self.station_raw))),
+            score_min=float(normalised.min()),
+            score_mean=float(normalised.mean()),
+            score_max=float(normalised.max()),
+            chosen={
+                "index": index,
+                "name": songs[index]["name"],
+                "score": float(normalised[index]),
+                "probability": float(weights[index]) / total if total else 0.0,
+            },
+            mode=self.debug_log.mode,
+            logged=Deferred(lambda: [
+                {"index": i, "name": songs[i]["name"], "score": round(float(normalised[i]), 3)}
+                for i in logged.tolist()
+            ]),
+        )
+
+    async def set_station(self, on: bool, pleasure: int | None = None, arousal: int | None = None) -> None:
+        """
+        Switch station mode. Switching it on (or changing the mood while on)
+        starts a track picked for the mood.
+        """
+        if not self.songs:
+            return
+        pleasure = self.station_pleasure if pleasure is None else max(1, min(5, int(pleasure)))
+        arousal = self.station_arousal if arousal is None else max(1, min(5, int(arousal)))
+        self._apply_station(bool(on), pleasure, arousal)
+        self._emit("station", on=self.station_mode, pleasure=pleasure, arousal=arousal)
+        if self.station_mode:
+            await self.play(self.pick_station_song())
+        else:
+            self._plan_next()
+
+    # ── Playback ──────────────────────────────────────────────────────────────
+
+    def set_queue(self, queue) -> None:
+        """Play tracks in this order (store indices) outside station mode."""
+        self.queue = np.asarray(queue, dtype=np.intp)
+        if not self.station_mode:
+            self._plan_next()
+
+    def _plan_next(self) -> None:
+        """Choose what follows the current track and have the cache fetch it."""
+        if self.station_mode:
+            self.upcoming = self.pick_station_song()
+        else:
+            hits = np.flatnonzero(self.queue == self.current_index)
+            rest = self.queue[hits[0] + 1:] if len(hits) else self.queue[:0]
+            rest = rest[self.songs.availability()[rest]]
+            self.upcoming = int(rest[0]) if len(rest) else -1
+        if self.cache is not None and self.upcoming >= 0:
+            self.cache.prefetch(self.songs[self.upcoming]["path"])
+
+    async def play(self, index: int) -> None:
+        if 0 <= index < len(self.songs):
+            self.current_index = index
+            song = self.songs[index]
+            path = song["path"]
+            gain = 0.0 if LOUDNESS_TARGET is None else track_gain(song["loudness"], song["peak"], LOUDNESS_TARGET)
+            self.audio.play(path if self.cache is None else self.cache.local_path(path), gain_db=gain)
+            self._plan_next()
+            waveform = await self.db.get_waveform(path)
+            # Another track may have started while the envelope was read
+            if self.current_index == index:
+                self._emit("track", index=index, waveform=waveform)
+
+    async def next(self) -> None:
+        """Play the station pick or queue entry chosen when the current track started."""
+        if self.upcoming >= 0:
+            await self.play(self.upcoming)
+
+    def toggle_pause(self) -> None:
+        self.audio.toggle_pause()
+
+    def seek(self, seconds: int = SEEK_STEP) -> None:
+        self.audio.seek_relative(seconds)
+
+    def set_volume(self, level: int) -> None:
+        """Set the volume in steps of 10%, from 1 to 10."""
+        level = max(1, min(10, int(level)))
+        if level != self.volume_level:
+            self.volume_level = level
+            self.audio.set_volume(level * 10)
+            self._emit("volume", level=level)
+
+    async def add_feedback(self, index: int, pleasure: int, arousal: int, rating: int) -> None:
+        """Record a rating of the track at `index` and rescore the station."""
+        if not 0 <= index < len(self.songs):
+            return
+        path = self.songs[index]["path"]
+        await self.db.add_feedback(path, pleasure, arousal, rating)
+        cells = await self.db.get_feedback_rollup(path)
+        self._apply_feedback(index, cells, pleasure, arousal, rating)
+        self._emit("feedback", index=index, cells=cells,
+                   mood_pleasure=pleasure, mood_arousal=arousal, rating=rating)
+
+    def status(self) -> dict:
+        info = self.audio.get_info()
+        return {
+            "progress": info["progress"],
+            "current_ms": info["current_ms"],
+            "total_ms": info["total_ms"],
+            "is_playing": info["is_playing"],
+            "current_index": self.current_index,
+        }
+
+    def position_ms(self) -> int:
+        """The playhead in milliseconds, or -1 if nothing is loaded. Safe to call from any thread."""
+        return self.audio.get_info()["current_ms"]
+
+    def tick(self) -> dict:
+        """
+        Publish the playback status and, if the track has finished, start
+        moving on to the next. Returns the status.
+        """
+        status = self.status()
+        self._emit("status", **status)
+        advancing = self.advancing is not None and not self.advancing.done()
+        if self.audio.has_finished() and self.current_index != -1 and not advancing:
+            self.advancing = asyncio.ensure_future(self.next())
+        return status
+
+    def snapshot(self) -> dict:
+        """Everything a client needs to mirror the session."""
+        return {
+            "current_index": self.current_index,
+            "station_mode": self.station_mode,
+            "station_pleasure": self.station_pleasure,
+            "station_arousal": self.station_arousal,
+            "volume_level": self.volume_level,
+            "status": self.status(),
+            "cache": self.cache.stats() if self.cache is not None else None,
+        }
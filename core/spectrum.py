@@ -0,0 +1,231 @@
+"""
+Live spectrum of the playing track, for the station view.
+
+Playback itself is left alone. Tapping VLC's output through libvlc's audio
+callbacks would mean taking over the audio device from it, so any stall in
+Python would be heard. Instead a worker thread decodes the same file with
+ffmpeg into a ring buffer, a little ahead of the playhead. SPECTRUM_FPS
+times a second it takes a windowed FFT of the samples under the playhead
+and reduces it to SPECTRUM_BANDS log-spaced bands.
+
+The UI reads the newest bands with latest(). The worker publishes every
+frame as a new array and never changes one it has published, so reading
+is a plain attribute read: the UI never waits on the worker, nor the
+worker on the UI. The worker idles when nobody has read the bands for a
+second, e.g. while the station view is hidden.
+"""
+
+import subprocess
+import threading
+import time
+from typing import Callable
+
+import numpy as np
+
+from config import SPECTRUM_BANDS, SPECTRUM_FPS
+
+# Decoding rate; the top band ends below its Nyquist frequency
+SAMPLE_RATE = 22050
+
+# Samples per FFT: ~93 ms, fine enough for the lowest bands
+FFT_SIZE = 2048
+
+# Ring buffer of decoded samples, about 3 s
+_RING_SIZE = 32 * FFT_SIZE
+
+# Samples decoded ahead of the playhead, so a frame rarely waits on ffmpeg
+_LEAD = 4 * FFT_SIZE
+
+# A seek further ahead than this restarts the decoder instead of decoding through
+_MAX_SKIP = SAMPLE_RATE * 2
+
+# Band edges in Hz
+_LOWEST, _HIGHEST = 40.0, 10000.0
+
+# Band levels span this many dB below a full-scale sine
+_RANGE_DB = 70.0
+
+# Fraction of its level a band keeps per frame when the sound drops
+_FALLOFF = 0.85
+
+# Seconds without a latest() call after which the worker idles
+_IDLE_AFTER = 1.0
+
+# Weight of the newest frame in the running cost average
+_COST_SMOOTHING = 0.05
+
+
+class SpectrumAnalyzer:
+    """
+    Band levels (0–1) of whatever is playing. `position` returns the
+    playhead in milliseconds, or -1 when nothing plays; it is called from
+    the worker thread.
+    """
+
+    def __init__(self, position: Callable[[], int], bands: int = SPECTRUM_BANDS, fps: float = SPECTRUM_FPS):
+        self._position = position
+        self._interval = 1.0 / fps
+        self.bands = np.zeros(bands, dtype=np.float32)
+
+        edges = np.geomspace(_LOWEST, _HIGHEST, bands + 1) * FFT_SIZE / SAMPLE_RATE
+        # Bands narrower than a bin at the bottom all read their one bin
+        self._starts = np.floor(edges[:-1]).astype(np.intp)
+        self._end = int(np.ceil(edges[-1]))
+        self._window = np.hanning(FFT_SIZE).astype(np.float32)
+        # A full-scale sine peaks at FFT_SIZE / 4 after the Hann window
+        self._full_scale = 32768.0 * FFT_SIZE / 4
+
+        self._ring = np.zeros(_RING_SIZE, dtype=np.int16)
+        self._path: str | None = None       # the track to analyse
+        self._decoding: str | None = None   # the track the decoder has open
+        self._failed: str | None = None     # a track ffmpeg couldn't decode
+        self._decoder: subprocess.Popen | None = None
+        self._start = 0                     # sample the decoder started at
+        self._written = 0                   # sample after the last one decoded
+        self._eof = False
+        self._last_position = None
+
+        self._last_read = time.monotonic()
+        self._idle = False
+        self._wake = threading.Event()
+        self._closed = False
+
+        self.frames = 0
+        self.restarts = 0
+        self.frame_cost = 0.0
+        self._cpu = 0.0
+        self._active = 0.0
+        self._thread = threading.Thread(target=self._run, name="aimu-spectrum", daemon=True)
+        self._thread.start()
+
+    # ── Interface ─────────────────────────────────────────────────────────────
+
+    def play(self, path: str) -> None:
+        """Analyse `path` from now on; call when a track starts."""
+        self._path = path
+        self._wake.set()
+
+    def latest(self) -> np.ndarray:
+        """The newest band levels. Don't modify the array."""
+        self._last_read = time.monotonic()
+        if self._idle:
+            self._wake.set()
+        return self.bands
+
+    def stats(self) -> dict:
+        """Frames analysed, their CPU cost, and the worker's share of one core while active."""
+        return {
+            "frames": self.frames,
+            "frame_ms": self.frame_cost * 1000,
+            "cpu_share": self._cpu / self._active if self._active else 0.0,
+            "decoder_restarts": self.restarts,
+        }
+
+    def close(self) -> None:
+        self._closed = True
+        self._wake.set()
+        self._thread.join()
+        self._stop_decoder()
+
+    # ── Worker ────────────────────────────────────────────────────────────────
+
+    def _run(self) -> None:
+        while not self._closed:
+            if self._path is None or time.monotonic() - self._last_read > _IDLE_AFTER:
+                self._idle = True
+                self._wake.wait()
+                self._wake.clear()
+                self._idle = False
+                continue
+            started = time.monotonic()
+            cpu = time.thread_time()
+            try:
+                self._frame()
+            except (OSError, ValueError):
+                self._stop_decoder()
+            cost = time.thread_time() - cpu
+            self._cpu += cost
+            self.frame_cost += _COST_SMOOTHING * (cost - self.frame_cost) if self.frames else cost
+            self.frames += 1
+            elapsed = time.monotonic() - started
+            if self._wake.wait(max(0.0, self._interval - elapsed)):
+                self._wake.clear()
+            self._active += time.monotonic() - started
+
+    def _frame(self) -> None:
+        # play() may change the track meanwhile; this frame sticks to one
+        path = self._path
+        position = self._position()
+        if position is None or position < 0 or path is None or position == self._last_position:
+            # Nothing new playing: let the bars fall
+            if self.bands.any():
+                fallen = self.bands * _FALLOFF
+                fallen[fallen < 0.01] = 0.0
+                self.bands = fallen
+            return
+        self._last_position = position
+        target = position * SAMPLE_RATE // 1000
+
+        if path == self._failed:
+            return
+        lowest = max(self._start, self._written - _RING_SIZE)
+        if path != self._decoding or max(0, target - FFT_SIZE) < lowest or target > self._written + _MAX_SKIP:
+            self._restart(path, max(0, target - FFT_SIZE))
+        self._fill(min(target + _LEAD, target - FFT_SIZE + _RING_SIZE))
+        if self._eof and self._written == self._start:
+            self._failed = path
+            return
+
+        levels = self._levels(self._samples(target - FFT_SIZE, target))
+        self.bands = np.maximum(levels, self.bands * _FALLOFF)
+
+    def _restart(self, path: str, sample: int) -> None:
+        self._stop_decoder()
+        self.restarts += 1
+        self._decoding = path
+        self._start = self._written = sample
+        self._eof = False
+        self._decoder = subprocess.Popen(
+            ["ffmpeg", "-v", "quiet", "-nostdin", "-ss", f"{sample / SAMPLE_RATE:.3f}", "-i", path,
+             "-f", "s16le", "-ac", "1", "-ar", str(SAMPLE_RATE), "-"],
+            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+        )
+
+    def _stop_decoder(self) -> None:
+        if self._decoder is not None:
+            self._decoder.kill()
+            self._decoder.stdout.close()
+            self._decoder.wait()
+            self._decoder = None
+        self._decoding = None
+
+    def _fill(self, until: int) -> None:
+        """Decode up to sample `until` into the ring."""
+        while not self._eof and self._written < until:
+            data = self._decoder.stdout.read(2 * (until - self._written))
+            if len(data) < 2:
+                self._eof = True
+                return
+            samples = np.frombuffer(data[: len(data) // 2 * 2], dtype=np.int16)
+            at = (self._written - self._start) % _RING_SIZE
+            first = min(len(samples), _RING_SIZE - at)
+            self._ring[at:at + first] = samples[:first]
+            self._ring[: len(samples) - first] = samples[first:]
+            self._written += len(samples)
+
+    def _samples(self, begin: int, end: int) -> np.ndarray:
+        """Samples [begin, end) from the ring; silence for any it doesn't hold."""
+        out = np.zeros(end - begin, dtype=np.float32)
+        lo = max(begin, self._start, self._written - _RING_SIZE)
+        hi = min(end, self._written)
+        if lo < hi:
+            index = (np.arange(lo, hi) - self._start) % _RING_SIZE
+            out[lo - begin:hi - begin] = self._ring[index]
+        return out
+
+    def _levels(self, samples: np.ndarray) -> np.ndarray:
+        spectrum = np.abs(np.fft.rfft(samples * self._window))[: self._end]
+        peaks = np.maximum.reduceat(spectrum, self._starts)
+        with np.errstate(divide="ignore"):
+            db = 20 * np.log10(peaks / self._full_scale)
+        return np.clip(1.0 + db / _RANGE_DB, 0.0, 1.0).astype(np.float32)
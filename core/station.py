@@ -0,0 +1,382 @@
+import argparse
+import json
+import math
+import sys
+import time
+
+import numpy as np
+
+from config import (
+    DB_PATH, STATION_HALF_LIFE_DAYS, STATION_KERNEL_BANDWIDTH, STATION_KERNEL_PRIOR, STATION_PRIOR_WEIGHT,
+    STATION_SCORING, STATION_SOUND_PRIOR_WEIGHT,
+)
+from core.db import MusicDatabase
+from core.library import TrackStore, song_from_row
+
+# Feedback rating → raw station score: poor (−1), ok (+1), great (+4)
+RATING_MAP = {1: -1, 2: 1, 3: 4}
+
+SCORING_MODES = ("nearest", "kernel")
+
+# Mood and energy are rated 1–5
+MOOD_CELLS = 5
+
+
+class FeedbackTable:
+    """
+    The feedback rollup as parallel arrays, one row per (track, mood cell):
+    store index, cell mood, number of ratings, their summed raw score, the
+    raw score and id of the newest rating and when it was given (Unix
+    seconds). Scoring is then a handful of NumPy reductions over the whole
+    table instead of a Python loop per track.
+    """
+
+    __slots__ = ("track", "pleasure", "arousal", "count", "score", "last_raw", "last_id", "created")
+
+    def __init__(self, track=(), pleasure=(), arousal=(), count=(), score=(),
+                 last_raw=(), last_id=(), created=()):
+        self.track = np.asarray(track, dtype=np.int64)
+        self.pleasure = np.asarray(pleasure, dtype=np.float64)
+        self.arousal = np.asarray(arousal, dtype=np.float64)
+        self.count = np.asarray(count, dtype=np.float64)
+        self.score = np.asarray(score, dtype=np.float64)
+        self.last_raw = np.asarray(last_raw, dtype=np.float64)
+        self.last_id = np.asarray(last_id, dtype=np.int64)
+        self.created = np.asarray(created, dtype=np.float64)
+
+    @classmethod
+    def from_rollup(cls, cells_by_track: dict[int, list]) -> "FeedbackTable":
+        """Build from {store index: rollup cells}, as returned by MusicDatabase.get_feedback_rollup."""
+        rows = [_table_row(index, cell) for index, cells in cells_by_track.items() for cell in cells]
+        return cls(*zip(*rows)) if rows else cls()
+
+    def replace_track(self, index: int, cells: list[dict]) -> "FeedbackTable":
+        """Swap in a track's current rollup cells, e.g. after new feedback; returns the rows replaced."""
+        keep = self.track != index
+        removed = FeedbackTable(*(getattr(self, name)[~keep] for name in self.__slots__))
+        rows = [_table_row(index, cell) for cell in cells]
+        for name, new in zip(self.__slots__, zip(*rows) if rows else [()] * len(self.__slots__)):
+            column = getattr(self, name)
+            setattr(self, name, np.concatenate([column[keep], np.asarray(new, dtype=column.dtype)]))
+        return removed
+
+    def relabelled(self, track_of: np.ndarray) -> "FeedbackTable":
+        """The same rows with each store index `i` replaced by `track_of[i]`, e.g. to pool copies' feedback."""
+        table = FeedbackTable.__new__(FeedbackTable)
+        for name in self.__slots__:
+            setattr(table, name, getattr(self, name))
+        table.track = track_of[self.track]
+        return table
+
+    def __len__(self) -> int:
+        return len(self.track)
+
+
+def _table_row(index: int, cell: dict) -> tuple:
+    score = sum(RATING_MAP[rating] * cell[name] for rating, name in ((1, "poor"), (2, "ok"), (3, "great")))
+    return (
+        index, float(cell["mood_pleasure"]), float(cell["mood_arousal"]), cell["count"], score,
+        RATING_MAP[cell["last_rating"]], cell["last_id"], _timestamp(cell.get("last_at")),
+    )
+
+
+def _timestamp(created_at: str | None) -> float:
+    """SQLite's UTC 'YYYY-MM-DD HH:MM:SS' as Unix seconds; NaN when unknown."""
+    if not created_at:
+        return math.nan
+    try:
+        return float(np.datetime64(created_at.replace(" ", "T"), "s").astype(np.int64))
+    except ValueError:
+        return math.nan
+
+
+def station_scores(table: FeedbackTable, size: int, pleasure: float, arousal: float,
+                   mode: str = STATION_SCORING, now: float | None = None) -> np.ndarray:
+    """
+    Raw station score for every store index; NaN for tracks without feedback.
+
+    "nearest" scores a track by its newest rating in the cell closest to
+    the session mood alone: rating / (1 + distance). "kernel" combines all
+    of a track's ratings, each cell weighted by a Gaussian of its distance
+    from the session mood and, with STATION_HALF_LIFE_DAYS set, halved for
+    every half-life since the cell was last rated:
+
+        Σ weight · rating / (STATION_KERNEL_PRIOR + Σ weight)
+
+    The prior acts as neutral pseudo-evidence, so one close rating counts
+    for less than several that agree. Decay is per cell, not per rating:
+    the rollup keeps a cell's count and summed score but only the time of
+    its newest rating, so all ratings in a cell take the age of the newest.
+    """
+    if mode not in SCORING_MODES:
+        raise ValueError(f"station scoring mode must be one of {', '.join(SCORING_MODES)}, not {mode!r}")
+    scores = np.full(size, np.nan)
+    keep = table.track < size
+    track = table.track[keep]
+    if not len(track):
+        return scores
+    dist = np.hypot(table.pleasure[keep] - pleasure, table.arousal[keep] - arousal)
+
+    if mode == "nearest":
+        nearest = np.full(size, np.inf)
+        np.minimum.at(nearest, track, dist)
+        # Of equally near cells the most recently rated wins: by when, then by id
+        candidates = np.flatnonzero(dist == nearest[track])
+        created = np.nan_to_num(table.created[keep][candidates], nan=-np.inf)
+        latest = np.full(size, -np.inf)
+        np.maximum.at(latest, track[candidates], created)
+        candidates = candidates[created == latest[track[candidates]]]
+        last_id = table.last_id[keep][candidates]
+        newest = np.full(size, -1)
+        np.maximum.at(newest, track[candidates], last_id)
+        rows = candidates[last_id == newest[track[candidates]]]
+        scores[track[rows]] = table.last_raw[keep][rows] / (1.0 + dist[rows])
+        return scores
+
+    weight = np.exp(-0.5 * (dist / STATION_KERNEL_BANDWIDTH) ** 2)
+    if STATION_HALF_LIFE_DAYS:
+        now = time.time() if now is None else now
+        age_days = np.maximum(0.0, np.nan_to_num(now - table.created[keep], nan=0.0)) / 86400
+        weight *= 0.5 ** (age_days / STATION_HALF_LIFE_DAYS)
+    rated = np.bincount(track, minlength=size) > 0
+    total = np.bincount(track, weights=weight * table.count[keep], minlength=size)
+    weighted = np.bincount(track, weights=weight * table.score[keep], minlength=size)
+    scores[rated] = weighted[rated] / (STATION_KERNEL_PRIOR + total[rated])
+    return scores
+
+
+class GroupPriors:
+    """
+    Feedback totals on the mood grid for each group of tracks — an artist
+    or an album — that stand in for the score of group members that have
+    no feedback of their own.
+
+    Two dense (groups, 5, 5) arrays hold the number of ratings and their
+    summed raw score in every mood/energy cell. They are kept in step with
+    the rollup by add(), so scoring a mood is a weighted sum over the grid
+    per group and one array lookup per track.
+    """
+
+    def __init__(self, group_of: np.ndarray):
+        self.group_of = group_of
+        groups = int(group_of.max()) + 1 if len(group_of) else 0
+        self.count = np.zeros((groups, MOOD_CELLS, MOOD_CELLS), dtype=np.float32)
+        self.score = np.zeros((groups, MOOD_CELLS, MOOD_CELLS), dtype=np.float32)
+
+    def add(self, table: FeedbackTable, sign: float = 1.0) -> None:
+        """Fold a table's cells into the totals of their tracks' groups; sign=-1 takes them out."""
+        known = table.track < len(self.group_of)
+        group = self.group_of[table.track[known]]
+        grouped = group >= 0
+        if not grouped.any():
+            return
+        group = group[grouped]
+        pleasure = _grid_cell(table.pleasure[known][grouped])
+        arousal = _grid_cell(table.arousal[known][grouped])
+        np.add.at(self.count, (group, pleasure, arousal), sign * table.count[known][grouped])
+        np.add.at(self.score, (group, pleasure, arousal), sign * table.score[known][grouped])
+
+    def track_scores(self, pleasure: float, arousal: float) -> np.ndarray:
+        """
+        Raw score of each track's group at the session mood, NaN where the
+        track has no group or the group no feedback. Cells are weighted by
+        the same kernel as kernel-mode station scoring.
+        """
+        grid = np.arange(1, MOOD_CELLS + 1)
+        dist = np.hypot(grid[:, None] - pleasure, grid[None, :] - arousal)
+        weight = np.exp(-0.5 * (dist / STATION_KERNEL_BANDWIDTH) ** 2)
+        total = np.einsum("gpa,pa->g", self.count, weight)
+        weighted = np.einsum("gpa,pa->g", self.score, weight)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            group_score = np.where(total > 0, weighted / (STATION_KERNEL_PRIOR + total), np.nan)
+        scores = np.full(len(self.group_of), np.nan)
+        grouped = self.group_of >= 0
+        scores[grouped] = group_score[self.group_of[grouped]]
+        return scores
+
+
+def _grid_cell(mood: np.ndarray) -> np.ndarray:
+    return np.clip(np.rint(mood).astype(np.int64) - 1, 0, MOOD_CELLS - 1)
+
+
+def prior_scores(album: GroupPriors, artist: GroupPriors, pleasure: float, arousal: float,
+                 sound: GroupPriors | None = None) -> np.ndarray:
+    """
+    Prior raw score per track: its album's, else its artist's, scaled by
+    STATION_PRIOR_WEIGHT since siblings say less about a track than its
+    own feedback; failing both, that of tracks that sound alike (`sound`,
+    grouped by measured tempo and loudness), scaled by the weaker
+    STATION_SOUND_PRIOR_WEIGHT. NaN where none has feedback.
+    """
+    album_scores = album.track_scores(pleasure, arousal)
+    scores = np.where(np.isnan(album_scores), artist.track_scores(pleasure, arousal), album_scores)
+    scores = scores * STATION_PRIOR_WEIGHT
+    if sound is not None and STATION_SOUND_PRIOR_WEIGHT:
+        sound_scores = sound.track_scores(pleasure, arousal) * STATION_SOUND_PRIOR_WEIGHT
+        scores = np.where(np.isnan(scores), sound_scores, scores)
+    return scores
+
+
+def song_station_score(cells: list, pleasure: float, arousal: float,
+                       mode: str = STATION_SCORING) -> float | None:
+    """Return the mood-proximity raw score for a single song's rollup cells, or None if it has none."""
+    score = station_scores(FeedbackTable.from_rollup({0: cells}), 1, pleasure, arousal, mode)[0]
+    return None if np.isnan(score) else float(score)
+
+
+def normalise_scores(raw: np.ndarray) -> np.ndarray:
+    """
+    Map raw scores onto the 1–5 station scale. Fixed mapping anchored at
+    0 → 3 (neutral/no-feedback); theoretical raw range is [-1, 4] from
+    RATING_MAP + distance scaling.
+    """
+    raw = np.nan_to_num(raw, nan=0.0)
+    return np.where(raw >= 0.0, 3.0 + 2.0 * raw / 4.0, 3.0 + 2.0 * raw)
+
+
+def pick_weights(normalised: np.ndarray, available: np.ndarray | None = None,
+                 duplicates: np.ndarray | None = None) -> np.ndarray:
+    """
+    Exponential selection weights: well-matched tracks dominate, poor ones
+    drop out. Tracks unset in the `available` mask get no weight at all.
+    Copies of one song (equal `duplicates` group ids, -1 for none) are one
+    pick: only the first copy that could be picked keeps its weight.
+    """
+    weights = 2.0 ** (normalised - 1.0) - 1.0
+    if available is not None:
+        weights[~available] = 0.0
+    if duplicates is not None:
+        pickable = np.flatnonzero((weights > 0) & (duplicates >= 0))
+        _, first = np.unique(duplicates[pickable], return_index=True)
+        copies = np.ones(len(pickable), dtype=bool)
+        copies[first] = False
+        weights[pickable[copies]] = 0.0
+    return weights
+
+
+# ── Scorer ────────────────────────────────────────────────────────────────────
+
+class StationScorer:
+    """
+    Station scoring state for one loaded library: the feedback rollup by
+    store index, as a FeedbackTable, and the album, artist and sound-alike
+    priors built from it. Shared by the player's station mode and the command line.
+
+    Copies of one song (scan --dedupe) are scored as one track, from the
+    feedback given to any of them.
+    """
+
+    def __init__(self, songs: TrackStore, cells: list[dict]):
+        """`cells` are the rollup rows from MusicDatabase.get_feedback_rollup."""
+        self.size = len(songs)
+        self.feedback: dict[int, list[dict]] = {}   # store index → rollup cells, newest first
+        for cell in cells:
+            index = songs.index_of(cell["path"])
+            if index >= 0:
+                self.feedback.setdefault(index, []).append(cell)
+        self.table = FeedbackTable.from_rollup(self.feedback)
+        self.album_priors = GroupPriors(songs.group_ids("album"))
+        self.artist_priors = GroupPriors(songs.group_ids("artist"))
+        self.sound_priors = GroupPriors(songs.group_ids("sound"))
+        for priors in (self.album_priors, self.artist_priors, self.sound_priors):
+            priors.add(self.table)
+        # Every track's first copy in the store, or the track itself
+        self.original = np.arange(self.size)
+        copies = songs.group_ids("duplicate")
+        grouped = np.flatnonzero(copies >= 0)
+        _, first = np.unique(copies[grouped], return_index=True)
+        self.original[grouped] = grouped[first][copies[grouped]]
+
+    def update_track(self, index: int, cells: list[dict]) -> None:
+        """Replace one track's rollup cells after new feedback, keeping the priors in step."""
+        self.feedback[index] = cells
+        replaced = self.table.replace_track(index, cells)
+        update = FeedbackTable.from_rollup({index: cells})
+        for priors in (self.album_priors, self.artist_priors, self.sound_priors):
+            priors.add(replaced, -1.0)
+            priors.add(update)
+
+    def scores(self, pleasure: float, arousal: float) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Raw scores at the session mood: each track's own (NaN without
+        feedback), and the ones picks use, which fall back on the
+        album/artist prior where a track has no feedback.
+        """
+        own = station_scores(self.table.relabelled(self.original), self.size, pleasure, arousal)[self.original]
+        prior = prior_scores(self.album_priors, self.artist_priors, pleasure, arousal, self.sound_priors)
+        return own, np.where(np.isnan(own), prior, own)
+
+
+def sample_without_replacement(weights: np.ndarray, count: int,
+                               rng: np.random.Generator | None = None) -> np.ndarray:
+    """
+    Up to `count` distinct indices drawn in proportion to `weights`, in
+    draw order (Efraimidis–Spirakis: each index gets the key u^(1/w) and
+    the largest keys win). Zero-weight indices are never drawn.
+    """
+    rng = np.random.default_rng() if rng is None else rng
+    candidates = np.flatnonzero(weights > 0)
+    count = min(count, len(candidates))
+    if count == 0:
+        return candidates[:0]
+    # log(u) / w orders the same as u^(1/w) without underflowing
+    keys = np.log(rng.random(len(candidates))) / weights[candidates]
+    top = np.argpartition(-keys, count - 1)[:count]
+    return candidates[top[np.argsort(-keys[top], kind="stable")]]
+
+
+# ── Command line ──────────────────────────────────────────────────────────────
+
+FORMATS = ("m3u", "paths", "jsonl")
+
+
+def _write_playlist(out, songs: TrackStore, indices: np.ndarray, scores: np.ndarray, fmt: str) -> None:
+    if fmt == "m3u":
+        out.write("#EXTM3U\n")
+    for i in indices.tolist():
+        song = songs[i]
+        if fmt == "m3u":
+            out.write(f"#EXTINF:{int(song.get('duration') or -1)},{song['name']}\n{song['path']}\n")
+        elif fmt == "jsonl":
+            out.write(json.dumps({"path": song["path"], "name": song["name"],
+                                  "score": round(float(scores[i]), 3)}, ensure_ascii=False) + "\n")
+        else:
+            out.write(song["path"] + "\n")
+
+
+def main() -> int:
+    """python -m core.station --mood 4 --energy 2 --count 500 --format m3u --out evening.m3u"""
+    parser = argparse.ArgumentParser(description="Write a mood-matched station playlist without the player")
+    parser.add_argument("--mood", type=int, required=True, choices=range(1, 6), help="Station mood (1–5)")
+    parser.add_argument("--energy", type=int, required=True, choices=range(1, 6), help="Station energy (1–5)")
+    parser.add_argument("--count", type=int, default=100, help="Tracks to pick, none repeated (default: 100)")
+    parser.add_argument("--format", choices=FORMATS, default="m3u", help="Output format (default: m3u)")
+    parser.add_argument("--out", type=str, default="-", help="Output file (default: stdout)")
+    parser.add_argument("--db", type=str, default=DB_PATH, help=f"Database file (default: {DB_PATH})")
+    parser.add_argument("--seed", type=int, default=None, help="Random seed, for a reproducible playlist")
+    args = parser.parse_args()
+
+    db = MusicDatabase(db_path=args.db)
+    try:
+        songs = TrackStore([song_from_row(row) for row in db.get_all_files()])
+        scorer = StationScorer(songs, db.get_feedback_rollup())
+    finally:
+        db.close()
+
+    _, raw = scorer.scores(args.mood, args.energy)
+    normalised = normalise_scores(raw)
+    weights = pick_weights(normalised, songs.availability(), songs.group_ids("duplicate"))
+    picks = sample_without_replacement(weights, args.count, np.random.default_rng(args.seed))
+    if len(picks) < args.count:
+        print(f"Only {len(picks)} of {len(songs)} tracks can be picked for this mood", file=sys.stderr)
+
+    if args.out == "-":
+        _write_playlist(sys.stdout, songs, picks, normalised, args.format)
+    else:
+        with open(args.out, "w", encoding="utf-8") as out:
+            _write_playlist(out, songs, picks, normalised, args.format)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
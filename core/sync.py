@@ -0,0 +1,270 @@
+"""
+Feedback sync between two databases, e.g. a desktop's and a laptop's.
+
+Each side exports the feedback recorded since its last export and merges
+the other side's:
+
+    python manage_db.py sync-export --since 1520 --out laptop.jsonl   # on the laptop
+    python manage_db.py sync-merge laptop.jsonl                      # on the desktop
+
+An export is JSON lines: a header, then one line per entry, oldest first.
+The header's watermark is the id of the newest entry exported; passed as
+--since next time, it exports only what was added after. Every entry keeps
+the UUID it was given when first recorded, so merging a file twice, or
+merging back entries that came from the other side, adds nothing.
+
+The two machines rarely keep the library at the same path, so entries name
+their track by file fingerprint (core/analysis.py), with the path only as
+a fallback. Entries for tracks the merging side doesn't have are skipped.
+A merge inserts the new entries, a few thousand per transaction, and
+updates the rollup of just the tracks they are for; the rest of the
+database is left alone.
+
+export_feedback() and import_feedback() move the whole log instead, as CSV
+or JSON lines keyed by path — a backup, or a history from elsewhere. Both
+stream, a batch of rows at a time, so memory stays flat however long the
+history is.
+"""
+
+import csv
+import json
+from datetime import datetime, timezone
+from operator import itemgetter
+from collections.abc import Iterable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+from typing import TextIO
+
+from config import INTEGRITY_WORKERS
+from core.analysis import file_fingerprint
+from core.db import MusicDatabase
+
+FORMAT = "aimu-feedback-delta"
+VERSION = 1
+
+# Entries inserted per executemany
+_BATCH = 5000
+
+# Formats and columns of export_feedback / import_feedback
+BULK_FORMATS = ("csv", "jsonl")
+BULK_COLUMNS = ("uuid", "path", "mood_pleasure", "mood_arousal", "rating", "created_at")
+
+
+def _try_fingerprint(path: str) -> str | None:
+    try:
+        return file_fingerprint(path)
+    except OSError:
+        return None
+
+
+def fingerprint_paths(db: MusicDatabase, paths: list[str]) -> None:
+    """Fingerprint those of `paths` whose file is there, and store the fingerprints."""
+    with ThreadPoolExecutor(INTEGRITY_WORKERS, thread_name_prefix="aimu-fingerprint") as pool:
+        fingerprints = [(path, fp) for path, fp in zip(paths, pool.map(_try_fingerprint, paths)) if fp]
+    db.set_fingerprints_batch(fingerprints)
+
+
+def export_delta(db: MusicDatabase, out: TextIO, since: int = 0) -> tuple[int, int]:
+    """
+    Write the feedback entries recorded after id `since` to `out`; returns
+    (entries written, watermark to pass as `since` next time). Tracks
+    without a fingerprint that have feedback in the delta get one first.
+    """
+    watermark = db.get_feedback_watermark()
+    unfingerprinted = [
+        row[0] for row in db.conn.execute("""
+            SELECT DISTINCT f.path FROM feedback f JOIN music_files m ON m.path = f.path
+            WHERE f.id > ? AND f.id <= ? AND m.fingerprint IS NULL
+        """, (since, watermark))
+    ]
+    if unfingerprinted:
+        fingerprint_paths(db, unfingerprinted)
+
+    out.write(json.dumps({"format": FORMAT, "version": VERSION, "since": since, "watermark": watermark}) + "\n")
+    count = 0
+    for entry in db.iter_feedback_since(since, watermark):
+        out.write(json.dumps(entry, separators=(",", ":")) + "\n")
+        count += 1
+    return count, max(since, watermark)
+
+
+def merge_delta(db: MusicDatabase, lines: Iterable[str]) -> dict:
+    """
+    Merge an export read line by line from `lines`. Returns counts of the
+    entries read, added, already known and skipped for an unknown track.
+    Raises ValueError if `lines` isn't an export this version can read.
+    """
+    lines = iter(lines)
+    try:
+        header = json.loads(next(lines))
+    except (StopIteration, json.JSONDecodeError):
+        raise ValueError("not a feedback export: no header") from None
+    if not isinstance(header, dict) or header.get("format") != FORMAT:
+        raise ValueError("not a feedback export")
+    if header.get("version") != VERSION:
+        raise ValueError(f"unsupported feedback export version {header.get('version')!r}")
+
+    by_fingerprint = db.get_fingerprint_paths()
+    known_paths = {row[0] for row in db.conn.execute("SELECT path FROM music_files")}
+    fingerprinted_all = False
+    stats = {"read": 0, "added": 0, "known": 0, "unmatched": 0}
+    batch = []
+
+    def flush() -> None:
+        added = db.merge_feedback(batch)
+        stats["added"] += added
+        stats["known"] += len(batch) - added
+        batch.clear()
+
+    for line in lines:
+        if not line.strip():
+            continue
+        entry = json.loads(line)
+        stats["read"] += 1
+        fingerprint = entry.get("fingerprint")
+        path = by_fingerprint.get(fingerprint) if fingerprint else None
+        if path is None and fingerprint and not fingerprinted_all:
+            # The track may be here with a file not fingerprinted yet:
+            # fingerprint the rest of the library, once
+            fingerprint_paths(db, db.get_paths_without_fingerprint())
+            by_fingerprint = db.get_fingerprint_paths()
+            fingerprinted_all = True
+            path = by_fingerprint.get(fingerprint)
+        if path is None and entry.get("path") in known_paths:
+            path = entry["path"]
+        if path is None:
+            stats["unmatched"] += 1
+            continue
+        batch.append((entry["uuid"], path, entry["mood_pleasure"], entry["mood_arousal"],
+                      entry["rating"], entry["created_at"]))
+        if len(batch) >= _BATCH:
+            flush()
+    flush()
+    return stats
+
+
+# ── Bulk import/export ────────────────────────────────────────────────────────
+
+def export_feedback(db: MusicDatabase, out: TextIO, fmt: str = "csv") -> int:
+    """Write the whole feedback log to `out` as BULK_COLUMNS, oldest first; returns the number of entries."""
+    if fmt not in BULK_FORMATS:
+        raise ValueError(f"format must be one of {', '.join(BULK_FORMATS)}, not {fmt!r}")
+    count = 0
+
+    def entries() -> Iterator[tuple]:
+        nonlocal count
+        for count, entry in enumerate(db.iter_feedback_log(), 1):
+            yield entry
+
+    if fmt == "csv":
+        writer = csv.writer(out)
+        writer.writerow(BULK_COLUMNS)
+        writer.writerows(entries())
+    else:
+        encode = json.JSONEncoder(separators=(",", ":")).encode
+        out.writelines(encode(dict(zip(BULK_COLUMNS, entry))) + "\n" for entry in entries())
+    return count
+
+
+# A missing value in either format
+_EMPTY = ("", None)
+
+
+def _number(value, convert, line: int, name: str):
+    if value in _EMPTY:
+        return None
+    try:
+        return convert(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"line {line}: {name} {value!r} is not a number") from None
+
+
+def _is_sqlite_time(value) -> bool:
+    return isinstance(value, str) and len(value) == 19 and value[10] == " "
+
+
+def _created_at(value, line: int) -> str | None:
+    """
+    `value` as SQLite's UTC 'YYYY-MM-DD HH:MM:SS', which the rollup orders
+    entries by; an ISO 8601 time with an offset is converted to UTC.
+    """
+    if not value:
+        return None
+    try:
+        when = datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"line {line}: created_at {value!r} is not a date and time") from None
+    if when.tzinfo is not None:
+        when = when.astimezone(timezone.utc).replace(tzinfo=None)
+    return when.strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _bulk_records(source: TextIO, fmt: str) -> Iterator[tuple[int, tuple]]:
+    """(line number, record as BULK_COLUMNS with "" or None for missing) per entry in `source`."""
+    if fmt == "csv":
+        reader = csv.reader(source)
+        header = next(reader, None)
+        if header is None or "path" not in header:
+            raise ValueError("CSV has no path column")
+        # Columns the file lacks are read from a "" appended to each row
+        pick = itemgetter(*(header.index(name) if name in header else -1 for name in BULK_COLUMNS))
+        width = len(header)
+        # Line numbers are those of the file for entries without line breaks
+        for line, values in enumerate(reader, 2):
+            if len(values) < width:
+                values.extend([""] * (width - len(values)))
+            values.append("")
+            yield line, pick(values)
+        return
+    for line, text in enumerate(source, 1):
+        if text.strip():
+            try:
+                record = json.loads(text)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"line {line}: {e.msg}") from None
+            if not isinstance(record, dict):
+                raise ValueError(f"line {line}: not an object")
+            yield line, tuple(map(record.get, BULK_COLUMNS))
+
+
+def _bulk_rows(source: TextIO, fmt: str, known_paths: set[str], counts: dict) -> Iterator[tuple]:
+    for line, (uuid, path, pleasure, arousal, rating, created_at) in _bulk_records(source, fmt):
+        counts["read"] += 1
+        if not path:
+            raise ValueError(f"line {line}: no path")
+        if path not in known_paths:
+            counts["unmatched"] += 1
+            continue
+        try:
+            row = (
+                uuid or None,
+                path,
+                None if pleasure in _EMPTY else float(pleasure),
+                None if arousal in _EMPTY else float(arousal),
+                None if rating in _EMPTY else int(rating),
+                created_at if _is_sqlite_time(created_at) else _created_at(created_at, line),
+            )
+        except (TypeError, ValueError):
+            # Name the field at fault
+            _number(pleasure, float, line, "mood_pleasure")
+            _number(arousal, float, line, "mood_arousal")
+            _number(rating, int, line, "rating")
+            raise
+        yield row
+
+
+def import_feedback(db: MusicDatabase, source: TextIO, fmt: str = "csv") -> dict:
+    """
+    Add the entries in `source` (CSV with a header row, or JSON lines, with
+    BULK_COLUMNS; only path is required) to the feedback log in one
+    transaction. Entries whose UUID is already there are skipped, so an
+    export can be imported back without doubling anything, and so are
+    entries for paths not in the library. Returns counts of the entries
+    read, added and skipped for an unknown track. Raises ValueError on a
+    malformed entry, leaving the log as it was.
+    """
+    if fmt not in BULK_FORMATS:
+        raise ValueError(f"format must be one of {', '.join(BULK_FORMATS)}, not {fmt!r}")
+    known_paths = {row[0] for row in db.conn.execute("SELECT path FROM music_files")}
+    counts = {"read": 0, "unmatched": 0}
+    added = db.import_feedback(_bulk_rows(source, fmt, known_paths, counts))
+    return {"read": counts["read"], "added": added, "unmatched": counts["unmatched"]}
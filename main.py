@@ -1,7 +1,25 @@
-from ui.app import MusicPlayerApp
+from ui.app import MusicPlayerApp, install_profiler
+from core.profiler import Profiler
+from config import DAEMON_SOCKET_PATH, PROFILE_PATH
 import sys
 
 if __name__ == "__main__":
     debug = "--debug" in sys.argv
-    app = MusicPlayerApp(debug=debug)
+    # --attach plays through the daemon started with `python -m core.daemon serve`
+    attach = DAEMON_SOCKET_PATH if "--attach" in sys.argv else None
+    profiler = None
+    if "--profile" in sys.argv:
+        profiler = Profiler()
+        install_profiler(profiler)
+    app = MusicPlayerApp(debug=debug, profiler=profiler, attach=attach)
     app.run()
+    if profiler is not None:
+        extra = {"animations": app.frames.stats()}
+        if getattr(app.session, "cache", None) is not None:
+            extra["track_cache"] = app.session.cache.stats()
+        if app.spectrum is not None:
+            extra["spectrum"] = app.spectrum.stats()
+        profiler.dump(PROFILE_PATH, extra)
+        print(f"Profile written to {PROFILE_PATH}")
+    if app.return_code:
+        sys.exit(app.return_code)
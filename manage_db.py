@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Maintenance commands for the music database.
+
+    python manage_db.py compact            # rebuild the feedback rollup from the raw log
+    python manage_db.py check              # find tracks whose files are missing
+    python manage_db.py duplicates         # list copies of the same song (found by scan --dedupe)
+    python manage_db.py sync-export        # write new feedback for another machine's database
+    python manage_db.py sync-merge F       # merge another machine's sync-export
+    python manage_db.py export-feedback    # write the whole feedback log as CSV or JSON lines
+    python manage_db.py import-feedback F  # add the feedback entries in such a file
+"""
+
+import argparse
+import sys
+import time
+
+from config import DB_PATH
+from core.db import MusicDatabase
+from core.integrity import check_paths
+from core.sync import BULK_FORMATS, export_delta, export_feedback, import_feedback, merge_delta
+
+
+def compact(db: MusicDatabase, vacuum: bool) -> None:
+    """Rebuild the feedback rollup from the raw feedback log, optionally reclaiming free pages."""
+    entries = db.conn.execute("SELECT COUNT(*) FROM feedback").fetchone()[0]
+    start = time.perf_counter()
+    cells = db.rebuild_feedback_rollup()
+    print(f"Rolled up {entries} feedback entries into {cells} track/mood cells "
+          f"in {time.perf_counter() - start:.2f}s")
+    if vacuum:
+        start = time.perf_counter()
+        db.conn.execute("VACUUM")
+        print(f"Vacuumed in {time.perf_counter() - start:.2f}s")
+
+
+def check(db: MusicDatabase, list_missing: bool) -> None:
+    """Stat every track's file and record which are missing, as the player does in the background."""
+    paths = [row[0] for row in db.conn.execute("SELECT path FROM music_files")]
+    start = time.perf_counter()
+    found = check_paths(paths).tolist()
+    missing = [path for path, ok in zip(paths, found) if not ok]
+    db.set_availability([path for path, ok in zip(paths, found) if ok], missing)
+    print(f"Checked {len(paths)} files in {time.perf_counter() - start:.2f}s: {len(missing)} missing")
+    if list_missing:
+        for path in missing:
+            print(path)
+
+
+def duplicates(db: MusicDatabase) -> None:
+    """Print each duplicate group found by scan_mp3_to_db.py --dedupe, one path per line."""
+    groups = db.get_duplicate_groups()
+    for group in groups:
+        print("\n".join(group), end="\n\n")
+    print(f"{len(groups)} songs with more than one copy ({sum(len(g) for g in groups)} tracks)")
+
+
+def sync_export(db: MusicDatabase, since: int, out_path: str) -> None:
+    """Export the feedback recorded after id `since`, to a file or stdout."""
+    start = time.perf_counter()
+    if out_path == "-":
+        count, watermark = export_delta(db, sys.stdout, since)
+    else:
+        with open(out_path, "w", encoding="utf-8") as out:
+            count, watermark = export_delta(db, out, since)
+    print(f"Exported {count} feedback entries in {time.perf_counter() - start:.2f}s; "
+          f"next time export with --since {watermark}", file=sys.stderr)
+
+
+def sync_merge(db: MusicDatabase, in_path: str) -> None:
+    """Merge a sync-export from another database, from a file or stdin."""
+    start = time.perf_counter()
+    if in_path == "-":
+        stats = merge_delta(db, sys.stdin)
+    else:
+        with open(in_path, encoding="utf-8") as lines:
+            stats = merge_delta(db, lines)
+    print(f"Read {stats['read']} feedback entries in {time.perf_counter() - start:.2f}s: "
+          f"{stats['added']} added, {stats['known']} already here, "
+          f"{stats['unmatched']} for tracks not in this library")
+
+
+def _bulk_format(path: str, fmt: str | None) -> str:
+    """The format given, else the one the file name ends in, else CSV."""
+    if fmt:
+        return fmt
+    return "jsonl" if path.endswith((".jsonl", ".ndjson")) else "csv"
+
+
+def export_log(db: MusicDatabase, out_path: str, fmt: str | None) -> None:
+    """Write the whole feedback log to a file or stdout."""
+    fmt = _bulk_format(out_path, fmt)
+    start = time.perf_counter()
+    if out_path == "-":
+        count = export_feedback(db, sys.stdout, fmt)
+    else:
+        with open(out_path, "w", encoding="utf-8", newline="") as out:
+            count = export_feedback(db, out, fmt)
+    print(f"Exported {count} feedback entries in {time.perf_counter() - start:.2f}s", file=sys.stderr)
+
+
+def import_log(db: MusicDatabase, in_path: str, fmt: str | None) -> None:
+    """Add the feedback entries in a file, or stdin, to the log."""
+    fmt = _bulk_format(in_path, fmt)
+    start = time.perf_counter()
+    if in_path == "-":
+        counts = import_feedback(db, sys.stdin, fmt)
+    else:
+        with open(in_path, encoding="utf-8", newline="") as source:
+            counts = import_feedback(db, source, fmt)
+    known = counts["read"] - counts["added"] - counts["unmatched"]
+    print(f"Imported {counts['added']} of {counts['read']} feedback entries in {time.perf_counter() - start:.2f}s: "
+          f"{known} already here, {counts['unmatched']} for tracks not in this library")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="AIMU database maintenance")
+    parser.add_argument("--db", type=str, default=DB_PATH, help=f"Database file (default: {DB_PATH})")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    compact_parser = sub.add_parser("compact", help="Rebuild the feedback rollup from the raw feedback log")
+    compact_parser.add_argument("--vacuum", action="store_true", help="Also VACUUM the database file")
+
+    check_parser = sub.add_parser("check", help="Record which tracks' files are missing")
+    check_parser.add_argument("--list", action="store_true", help="Print the missing paths")
+
+    sub.add_parser("duplicates", help="List tracks that are copies of the same song")
+
+    export_parser = sub.add_parser("sync-export", help="Export feedback for merging into another database")
+    export_parser.add_argument("--since", type=int, default=0,
+                               help="Export entries after this watermark, from the previous export (default: all)")
+    export_parser.add_argument("--out", type=str, default="-", help="Output file (default: stdout)")
+
+    merge_parser = sub.add_parser("sync-merge", help="Merge feedback exported from another database")
+    merge_parser.add_argument("file", help="A sync-export file, or - for stdin")
+
+    bulk_help = "File format (default: from the file name, else csv)"
+    export_log_parser = sub.add_parser("export-feedback", help="Write the whole feedback log as CSV or JSON lines")
+    export_log_parser.add_argument("--out", type=str, default="-", help="Output file (default: stdout)")
+    export_log_parser.add_argument("--format", choices=BULK_FORMATS, default=None, help=bulk_help)
+
+    import_log_parser = sub.add_parser("import-feedback", help="Add feedback entries from CSV or JSON lines")
+    import_log_parser.add_argument("file", help="A file as export-feedback writes, or - for stdin")
+    import_log_parser.add_argument("--format", choices=BULK_FORMATS, default=None, help=bulk_help)
+
+    args = parser.parse_args()
+    db = MusicDatabase(db_path=args.db)
+    try:
+        if args.command == "compact":
+            compact(db, args.vacuum)
+        elif args.command == "check":
+            check(db, args.list)
+        elif args.command == "duplicates":
+            duplicates(db)
+        elif args.command == "sync-export":
+            sync_export(db, args.since, args.out)
+        elif args.command == "sync-merge":
+            try:
+                sync_merge(db, args.file)
+            except ValueError as e:
+                print(f"Error: {e}", file=sys.stderr)
+                return 1
+        elif args.command == "export-feedback":
+            export_log(db, args.out, args.format)
+        elif args.command == "import-feedback":
+            try:
+                import_log(db, args.file, args.format)
+            except ValueError as e:
+                print(f"Error: {e}", file=sys.stderr)
+                return 1
+    finally:
+        db.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
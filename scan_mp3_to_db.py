@@ -5,12 +5,18 @@ Run this separately from the main app.
 """
 
 import argparse
+import os
 import sys
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from pathlib import Path
 from mutagen.mp3 import MP3
 from mutagen.easyid3 import EasyID3
 from mutagen.id3 import ID3NoHeaderError
+from core.analysis import (
+    WAVEFORM_BINS, analyze_features, analyze_signature, analyze_waveform, ffmpeg_available, file_fingerprint,
+)
 from core.db import MusicDatabase
+from core.duplicates import find_duplicates
 
 
 def extract_mp3_metadata(file_path: str, print_metadata: bool = True) -> dict:
@@ -138,6 +144,163 @@ def scan_mp3_files(root_path: str, print_metadata: bool = True) -> tuple[list[st
     return list(mp3_files), list(metadata_list)
 
 
+def _try_analyze_waveform(path: str) -> bytes | None:
+    try:
+        return analyze_waveform(path)
+    except (OSError, RuntimeError):
+        return None
+
+
+def analyze_waveforms(db: MusicDatabase, workers: int) -> None:
+    """
+    Decode every track that has no stored waveform envelope and save one.
+    Decoding happens in ffmpeg subprocesses, so a thread pool keeps
+    `workers` of them busy at once.
+    """
+    if not ffmpeg_available():
+        print("ffmpeg not found — skipping waveform analysis.")
+        return
+
+    paths = db.get_paths_without_waveform()
+    if not paths:
+        print("All tracks already have waveforms.")
+        return
+
+    print(f"Analysing waveforms for {len(paths)} tracks...")
+    batch = []
+    failed = 0
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for i, (path, envelope) in enumerate(zip(paths, pool.map(_try_analyze_waveform, paths)), 1):
+            if envelope is None:
+                failed += 1
+            else:
+                batch.append((path, WAVEFORM_BINS, envelope))
+            if len(batch) >= 100:
+                db.set_waveforms_batch(batch)
+                batch = []
+            if i % 100 == 0:
+                print(f"  {i}/{len(paths)}")
+    db.set_waveforms_batch(batch)
+
+    if failed:
+        print(f"Note: {failed} file(s) could not be decoded and have no waveform.")
+
+
+def _try_fingerprint(path: str) -> str | None:
+    try:
+        return file_fingerprint(path)
+    except OSError:
+        return None
+
+
+def _try_analyze_features(path: str) -> dict | None:
+    try:
+        return analyze_features(path)
+    except (OSError, RuntimeError, ValueError):
+        return None
+
+
+def fingerprint_files(db: MusicDatabase, workers: int) -> None:
+    """Fingerprint every track that has no fingerprint yet, reading files on `workers` threads."""
+    paths = db.get_paths_without_fingerprint()
+    if paths:
+        print(f"Fingerprinting {len(paths)} files...")
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            fingerprints = [
+                (path, fingerprint)
+                for path, fingerprint in zip(paths, pool.map(_try_fingerprint, paths))
+                if fingerprint is not None
+            ]
+        db.set_fingerprints_batch(fingerprints)
+
+
+def analyze_audio(db: MusicDatabase, workers: int) -> None:
+    """
+    Measure loudness, tempo and energy of every track whose file hasn't
+    been analysed before. Files are recognised by fingerprint, so a moved,
+    renamed or duplicated file isn't analysed again. The measuring is NumPy
+    work on the decoded audio, so it runs in a pool of `workers` processes.
+    """
+    if not ffmpeg_available():
+        print("ffmpeg not found — skipping audio analysis.")
+        return
+
+    fingerprint_files(db, workers)
+    files = db.get_files_without_features()
+    if not files:
+        print("All tracks are already analysed.")
+        return
+
+    print(f"Analysing loudness, tempo and energy of {len(files)} files...")
+    batch = []
+    failed = 0
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        results = pool.map(_try_analyze_features, [path for path, _ in files], chunksize=4)
+        for i, ((path, fingerprint), features) in enumerate(zip(files, results), 1):
+            if features is None:
+                failed += 1
+            else:
+                batch.append((fingerprint, features["loudness"], features["peak"],
+                              features["tempo"], features["energy"]))
+            if len(batch) >= 100:
+                db.set_features_batch(batch)
+                batch = []
+            if i % 100 == 0:
+                print(f"  {i}/{len(files)}")
+    db.set_features_batch(batch)
+
+    if failed:
+        print(f"Note: {failed} file(s) could not be decoded and were not analysed.")
+
+
+def _try_analyze_signature(path: str) -> bytes | None:
+    try:
+        return analyze_signature(path)
+    except (OSError, RuntimeError, ValueError):
+        return None
+
+
+def find_duplicate_tracks(db: MusicDatabase, workers: int) -> None:
+    """
+    Link tracks that are copies of the same song into duplicate groups.
+    Every file gets an acoustic signature, computed once per fingerprint
+    in a pool of `workers` processes; the signatures of the whole library
+    are then matched through a locality-sensitive hash index (see
+    core/duplicates.py) and the groups stored, replacing earlier ones.
+    """
+    if not ffmpeg_available():
+        print("ffmpeg not found — skipping duplicate detection.")
+        return
+
+    fingerprint_files(db, workers)
+    files = db.get_files_without_signature()
+    if files:
+        print(f"Computing acoustic signatures of {len(files)} files...")
+        batch = []
+        failed = 0
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = pool.map(_try_analyze_signature, [path for path, _ in files], chunksize=4)
+            for i, ((path, fingerprint), signature) in enumerate(zip(files, results), 1):
+                if signature is None:
+                    failed += 1
+                else:
+                    batch.append((fingerprint, signature))
+                if len(batch) >= 100:
+                    db.set_signatures_batch(batch)
+                    batch = []
+                if i % 100 == 0:
+                    print(f"  {i}/{len(files)}")
+        db.set_signatures_batch(batch)
+        if failed:
+            print(f"Note: {failed} file(s) could not be decoded and have no signature.")
+
+    tracks = db.get_signatures()
+    groups = find_duplicates([signature for _, _, signature in tracks], [duration for _, duration, _ in tracks])
+    db.set_duplicate_groups([[tracks[i][0] for i in group] for group in groups])
+    copies = sum(len(group) for group in groups)
+    print(f"Found {len(groups)} songs with more than one copy ({copies} tracks).")
+
+
 def main():
     parser = argparse.ArgumentParser(
         description="Scan a directory for MP3 files and store paths in SQLite database"
@@ -164,6 +327,27 @@ def main():
         action="store_true",
         help="Skip printing metadata for each file"
     )
+    parser.add_argument(
+        "--waveforms",
+        action="store_true",
+        help="Decode tracks without a stored waveform and save their envelope (requires ffmpeg)"
+    )
+    parser.add_argument(
+        "--analyze",
+        action="store_true",
+        help="Measure loudness, tempo and energy of tracks not analysed before (requires ffmpeg)"
+    )
+    parser.add_argument(
+        "--dedupe",
+        action="store_true",
+        help="Find tracks that are copies of the same song, so station mode treats them as one (requires ffmpeg)"
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Parallel decoders for --waveforms, --analyze and --dedupe (default: CPU count)"
+    )
     
     args = parser.parse_args()
     
@@ -187,6 +371,15 @@ def main():
     # Verify
     count = db.count()
     print(f"Database now contains {count} files")
+
+    if args.waveforms:
+        analyze_waveforms(db, workers=max(1, args.jobs))
+
+    if args.analyze:
+        analyze_audio(db, workers=max(1, args.jobs))
+
+    if args.dedupe:
+        find_duplicate_tracks(db, workers=max(1, args.jobs))
     
     # Close database connection
     db.close()
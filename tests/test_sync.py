@@ -0,0 +1,135 @@
+import io
+
+import pytest
+
+from core.db import MusicDatabase
+from core.sync import export_delta, import_feedback, merge_delta
+
+TRACK = "/music/a.mp3"
+
+
+def _database(path) -> MusicDatabase:
+    db = MusicDatabase(str(path))
+    db.add_file(TRACK)
+    return db
+
+
+def _date_feedback(db: MusicDatabase, created_at: str) -> None:
+    """Backdate every feedback entry of `db`, as if given on `created_at`."""
+    db.conn.execute("UPDATE feedback SET created_at = ?", (created_at,))
+    db.conn.commit()
+    db.rebuild_feedback_rollup()
+
+
+def _merge(into: MusicDatabase, source: MusicDatabase) -> dict:
+    out = io.StringIO()
+    export_delta(source, out)
+    return merge_delta(into, out.getvalue().splitlines())
+
+
+@pytest.fixture
+def machines(tmp_path):
+    return _database(tmp_path / "desktop.db"), _database(tmp_path / "laptop.db")
+
+
+def test_merged_older_rating_does_not_become_latest(machines):
+    desktop, laptop = machines
+    laptop.add_feedback(TRACK, 3, 3, 1)
+    _date_feedback(laptop, "2025-10-01 12:00:00")
+    desktop.add_feedback(TRACK, 3, 3, 3)
+    _date_feedback(desktop, "2026-10-18 12:00:00")
+
+    assert _merge(desktop, laptop)["added"] == 1
+
+    [cell] = desktop.get_feedback_rollup(TRACK)
+    assert (cell["count"], cell["last_rating"], cell["last_at"]) == (2, 3, "2026-10-18 12:00:00")
+    assert desktop.get_files_chunk()[0]["rating"] == 3
+    assert desktop.get_all_files()[0]["rating"] == 3
+
+
+def test_merged_newer_rating_becomes_latest(machines):
+    desktop, laptop = machines
+    desktop.add_feedback(TRACK, 3, 3, 3)
+    _date_feedback(desktop, "2025-10-01 12:00:00")
+    laptop.add_feedback(TRACK, 1, 1, 1)
+    _date_feedback(laptop, "2026-10-18 12:00:00")
+
+    _merge(desktop, laptop)
+
+    cells = desktop.get_feedback_rollup(TRACK)
+    assert [cell["last_at"] for cell in cells] == ["2026-10-18 12:00:00", "2025-10-01 12:00:00"]
+    assert desktop.get_files_chunk()[0]["rating"] == 1
+
+
+def test_feedback_after_a_later_dated_merge_keeps_it_latest(machines):
+    desktop, laptop = machines
+    laptop.add_feedback(TRACK, 3, 3, 1)
+    _date_feedback(laptop, "2999-01-01 00:00:00")
+    _merge(desktop, laptop)
+
+    desktop.add_feedback(TRACK, 3, 3, 3)
+
+    [cell] = desktop.get_feedback_rollup(TRACK)
+    assert (cell["count"], cell["last_rating"], cell["last_at"]) == (2, 1, "2999-01-01 00:00:00")
+    assert desktop.get_feedback_rollup(TRACK) == _rebuilt(desktop)
+
+
+def test_merge_is_idempotent(machines):
+    desktop, laptop = machines
+    laptop.add_feedback(TRACK, 2, 4, 2)
+
+    assert _merge(desktop, laptop)["added"] == 1
+    assert _merge(desktop, laptop) == {"read": 1, "added": 0, "known": 1, "unmatched": 0}
+
+
+def _rebuilt(db: MusicDatabase) -> list[dict]:
+    db.rebuild_feedback_rollup()
+    return db.get_feedback_rollup(TRACK)
+
+
+def _import(db: MusicDatabase, text: str, fmt: str = "csv") -> dict:
+    return import_feedback(db, io.StringIO(text), fmt)
+
+
+def _indexes(db: MusicDatabase) -> set[str]:
+    return {row[0] for row in db.conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+
+
+def test_imported_older_history_does_not_override_the_current_rating(tmp_path):
+    db = _database(tmp_path / "music.db")
+    db.add_feedback(TRACK, 3, 3, 3)
+
+    _import(db, f"path,mood_pleasure,mood_arousal,rating,created_at\n{TRACK},3,3,1,2020-01-01 00:00:00\n")
+
+    [cell] = db.get_feedback_rollup(TRACK)
+    assert (cell["count"], cell["last_rating"]) == (2, 3)
+    assert db.get_files_chunk()[0]["rating"] == 3
+
+
+def test_import_into_an_empty_log_skips_repeated_uuids(tmp_path):
+    db = _database(tmp_path / "music.db")
+    counts = _import(db, "uuid,path,rating\n" + f"u1,{TRACK},2\nu2,{TRACK},3\nu1,{TRACK},1\n")
+
+    assert counts == {"read": 3, "added": 2, "unmatched": 0}
+    assert [entry["rating"] for entry in db.get_feedback_history(TRACK)] == [3, 2]
+    assert {"idx_feedback_uuid", "idx_feedback_path"} <= _indexes(db)
+    assert _import(db, f"uuid,path\nu2,{TRACK}\n")["added"] == 0
+
+
+def test_import_converts_times_to_sqlite_utc(tmp_path):
+    db = _database(tmp_path / "music.db")
+    _import(db, f'{{"path": "{TRACK}", "mood_pleasure": 2, "mood_arousal": 2, "rating": 2, '
+                f'"created_at": "2026-03-01T12:30:00+02:00"}}\n', "jsonl")
+
+    assert db.get_feedback_history(TRACK)[0]["created_at"] == "2026-03-01 10:30:00"
+
+
+def test_malformed_import_leaves_the_log_and_its_indexes(tmp_path):
+    db = _database(tmp_path / "music.db")
+    indexes = _indexes(db)
+
+    with pytest.raises(ValueError, match="line 3: rating"):
+        _import(db, f"path,rating\n{TRACK},2\n{TRACK},great\n")
+
+    assert db.get_feedback_history(TRACK) == []
+    assert _indexes(db) == indexes
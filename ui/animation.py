@@ -0,0 +1,302 @@
+import os
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable
+
+from textual.app import App
+from textual.widget import Widget
+
+from config import ANIMATION_CPU_BUDGET, ANIMATION_IDLE_AFTER, ANIMATION_SLOWDOWN
+
+_POWER_SUPPLY = Path("/sys/class/power_supply")
+
+# How often to re-read the power supply state, in seconds
+_POWER_CHECK_INTERVAL = 30.0
+
+# Longest the scheduler sleeps, so paused animations notice they're visible again
+_MAX_SLEEP = 1.0
+
+# Weight of the newest sample in the running frame-cost averages
+_COST_SMOOTHING = 0.1
+
+
+def on_battery() -> bool:
+    """True if a Linux power supply reports running on battery; False where unknown."""
+    try:
+        supplies = list(_POWER_SUPPLY.iterdir())
+    except OSError:
+        return False
+    mains_seen = False
+    for supply in supplies:
+        try:
+            kind = (supply / "type").read_text().strip()
+            if kind == "Mains":
+                mains_seen = True
+                if (supply / "online").read_text().strip() == "1":
+                    return False
+            elif kind == "Battery" and (supply / "status").read_text().strip() == "Discharging":
+                return True
+        except OSError:
+            continue
+    # A mains adapter exists but none of them is online
+    return mains_seen
+
+
+def over_ssh() -> bool:
+    return bool(os.environ.get("SSH_CONNECTION") or os.environ.get("SSH_TTY"))
+
+
+@dataclass(eq=False)
+class Animation:
+    """A callback registered with the FrameScheduler, and its frame cost statistics."""
+
+    name: str
+    callback: Callable[[], object]
+    interval: float                 # requested seconds between frames
+    widget: Widget | None = None    # paused while this widget isn't on screen
+    essential: bool = False         # never paused or slowed down (e.g. the playback poll)
+    last_run: float = 0.0
+    next_due: float = 0.0
+    current_interval: float = 0.0   # interval after slowdown and throttling
+    paused: bool = False
+    frames: int = 0
+    update_cost: float = 0.0        # smoothed seconds per callback
+    render_cost: float = 0.0        # smoothed seconds rendering the widget per frame
+    max_cost: float = 0.0
+    _render_pending: float = 0.0
+    _mounted: bool = False
+
+    @property
+    def frame_cost(self) -> float:
+        return self.update_cost + self.render_cost
+
+    @property
+    def cpu_share(self) -> float:
+        """Fraction of one core this animation uses at its current rate."""
+        if self.paused or not self.current_interval:
+            return 0.0
+        return self.frame_cost / self.current_interval
+
+
+class FrameScheduler:
+    """
+    One timer for every animation in the app.
+
+    Widgets register a callback and the interval they'd like instead of
+    running their own set_interval. The scheduler sleeps until the next
+    callback is due, and on each wake-up:
+
+    - skips animations whose widget isn't on screen, and all non-essential
+      animations while the terminal window is unfocused;
+    - slows animations down by ANIMATION_SLOWDOWN when the player is idle
+      (playback paused or no input for ANIMATION_IDLE_AFTER seconds), and
+      again on battery power or over SSH;
+    - measures each animation's callback and its widget's render time, and
+      stretches non-essential intervals so their total stays within
+      ANIMATION_CPU_BUDGET of one core.
+    """
+
+    def __init__(
+        self,
+        app: App,
+        budget: float = ANIMATION_CPU_BUDGET,
+        idle_after: float = ANIMATION_IDLE_AFTER,
+        slowdown: float = ANIMATION_SLOWDOWN,
+    ):
+        self.app = app
+        self.budget = budget
+        self.idle_after = idle_after
+        self.slowdown = slowdown
+        self.playing = False
+        self.throttle = 1.0
+        self._animations: list[Animation] = []
+        self._timer = None
+        self._last_input = time.monotonic()
+        self._ssh = over_ssh()
+        self._battery = on_battery()
+        self._power_checked = time.monotonic()
+
+    # ── Registration ──────────────────────────────────────────────────────────
+
+    def register(
+        self,
+        callback: Callable[[], object],
+        interval: float,
+        *,
+        widget: Widget | None = None,
+        name: str | None = None,
+        essential: bool = False,
+    ) -> Animation:
+        """Run `callback` about every `interval` seconds. Returns a handle for unregister()."""
+        animation = Animation(
+            name=name or getattr(callback, "__qualname__", "animation"),
+            callback=callback,
+            interval=interval,
+            widget=widget,
+            essential=essential,
+            last_run=time.monotonic(),
+            next_due=time.monotonic() + interval,
+            current_interval=interval,
+            _mounted=widget is not None and widget.is_attached,
+        )
+        if widget is not None:
+            self._time_renders(animation)
+        self._animations.append(animation)
+        self._schedule()
+        return animation
+
+    def unregister(self, animation: Animation) -> None:
+        if animation not in self._animations:
+            return
+        self._animations.remove(animation)
+        if animation.widget is not None:
+            # Drop the instance-level render wrapper, restoring the class method
+            animation.widget.__dict__.pop("render_lines", None)
+
+    def _time_renders(self, animation: Animation) -> None:
+        """Wrap the widget's render_lines so its paint time counts toward the frame cost."""
+        widget = animation.widget
+        render_lines = widget.render_lines
+
+        def timed_render_lines(crop):
+            start = time.perf_counter()
+            try:
+                return render_lines(crop)
+            finally:
+                animation._render_pending += time.perf_counter() - start
+
+        widget.render_lines = timed_render_lines
+
+    # ── State ─────────────────────────────────────────────────────────────────
+
+    def note_activity(self) -> None:
+        """Record user input; wakes slowed-down animations if the player was idle."""
+        now = time.monotonic()
+        was_idle = now - self._last_input > self.idle_after
+        self._last_input = now
+        if was_idle:
+            self.wake()
+
+    def set_playing(self, playing: bool) -> None:
+        if playing != self.playing:
+            self.playing = playing
+            if playing:
+                self.wake()
+
+    def wake(self) -> None:
+        """
+        Bring every animation back to its requested rate, e.g. after a widget
+        becomes visible or input ends an idle spell. Nothing runs early.
+        """
+        now = time.monotonic()
+        for animation in self._animations:
+            animation.next_due = min(animation.next_due, now + animation.interval)
+        self._schedule()
+
+    def slowdown_factor(self, now: float | None = None) -> float:
+        now = time.monotonic() if now is None else now
+        factor = 1.0
+        if not self.playing or now - self._last_input > self.idle_after:
+            factor *= self.slowdown
+        if self._battery or self._ssh:
+            factor *= self.slowdown
+        return factor
+
+    def _visible(self, animation: Animation) -> bool:
+        if not self.app.app_focus:
+            return False
+        widget = animation.widget
+        if widget is None:
+            return True
+        return widget.is_attached and widget.region.area > 0
+
+    def stats(self) -> list[dict]:
+        """Per-animation frame rate and cost, for profiling and display."""
+        return [
+            {
+                "name": a.name,
+                "interval_ms": a.current_interval * 1000,
+                "paused": a.paused,
+                "frames": a.frames,
+                "update_ms": a.update_cost * 1000,
+                "render_ms": a.render_cost * 1000,
+                "max_ms": a.max_cost * 1000,
+                "cpu_share": a.cpu_share,
+            }
+            for a in self._animations
+        ]
+
+    # ── Scheduling ────────────────────────────────────────────────────────────
+
+    def _schedule(self) -> None:
+        if self._timer is not None:
+            self._timer.stop()
+            self._timer = None
+        if not self._animations:
+            return
+        delay = min(a.next_due for a in self._animations) - time.monotonic()
+        self._timer = self.app.set_timer(max(0.001, min(_MAX_SLEEP, delay)), self._tick)
+
+    def _tick(self) -> None:
+        self._timer = None
+        now = time.monotonic()
+        if now - self._power_checked > _POWER_CHECK_INTERVAL:
+            self._battery = on_battery()
+            self._power_checked = now
+        slowdown = self.slowdown_factor(now)
+
+        for animation in list(self._animations):
+            widget = animation.widget
+            if widget is not None:
+                if widget.is_attached:
+                    animation._mounted = True
+                elif animation._mounted:
+                    self.unregister(animation)   # widget was removed
+                    continue
+            interval = animation.interval
+            if not animation.essential:
+                interval *= slowdown * self.throttle
+            if not animation.paused:
+                # Pick up a faster rate at once rather than after the current wait
+                animation.next_due = min(animation.next_due, animation.last_run + interval)
+            if now < animation.next_due:
+                continue
+
+            if not animation.essential and not self._visible(animation):
+                animation.paused = True
+                animation.next_due = now + _MAX_SLEEP
+                continue
+            animation.paused = False
+
+            animation.current_interval = interval
+            animation.last_run = now
+            animation.next_due = now + interval
+            self._run(animation)
+
+        self._update_throttle(slowdown)
+        self._schedule()
+
+    def _run(self, animation: Animation) -> None:
+        start = time.perf_counter()
+        animation.callback()
+        update = time.perf_counter() - start
+        # Renders since the last frame are the cost of painting the last frame
+        render, animation._render_pending = animation._render_pending, 0.0
+
+        if animation.frames:
+            animation.update_cost += _COST_SMOOTHING * (update - animation.update_cost)
+            animation.render_cost += _COST_SMOOTHING * (render - animation.render_cost)
+        else:
+            animation.update_cost, animation.render_cost = update, render
+        animation.max_cost = max(animation.max_cost, update + render)
+        animation.frames += 1
+
+    def _update_throttle(self, slowdown: float) -> None:
+        """Stretch non-essential intervals so their combined CPU share fits the budget."""
+        demand = sum(
+            a.frame_cost / (a.interval * slowdown)
+            for a in self._animations
+            if not a.essential and not a.paused
+        )
+        self.throttle = max(1.0, demand / self.budget) if self.budget > 0 else 1.0
@@ -1,24 +1,48 @@
-import math
-import random
+import numpy as np
+from textual import events
 from textual.app import App, ComposeResult
+from textual.widget import Widget
 from textual.widgets import Header, Footer
 from textual.containers import Container, Horizontal
 
+from core.analysis import ffmpeg_available
 from core.audio import AudioEngine
+from core.daemon import DaemonError, RemoteSession
 from core.db import MusicDatabase
+from core.debuglog import DebugLog
 from core.keybindings import load_bindings
-from config import DEFAULT_VOLUME, DB_PATH, KEYBINDINGS_PATH
-from ui.playlist import TrackListView
+from core.library import TrackStore
+from core.profiler import Profiler
+from core.search import TrigramIndex, query_mask
+from core.session import PlayerSession, SEEK_STEP
+from core.spectrum import SpectrumAnalyzer
+from core.station import StationScorer
+from config import DB_PATH, KEYBINDINGS_PATH
+from ui.animation import FrameScheduler
+from ui.playlist import TrackListView, COLUMNS as PLAYLIST_COLUMNS
+from ui.search_bar import SearchBar
 from ui.status_bar import PlayerControlBar
 from ui.track_info import TrackInfoPanel
 from ui.station_view import StationView
 from ui.feedback_modal import FeedbackModal
 from ui.mood_modal import MoodModal
 from ui.help_modal import HelpModal
-from pathlib import Path
+from ui.profile_modal import ProfileModal
 
 _BINDINGS = load_bindings(KEYBINDINGS_PATH)
 
+# Minimum interval between info panel rebuilds while the cursor moves (~60 fps)
+INFO_PANEL_FRAME = 1 / 60
+
+# Player hot paths timed by --profile
+PROFILED_METHODS = [
+    "on_mount", "play_track", "check_playback_status", "_show_track", "_update_info_panel",
+    "_apply_search",
+]
+SESSION_PROFILED_METHODS = [
+    "load", "play", "next", "tick", "add_feedback", "pick_station_song", "refresh_station_scores",
+]
+
 
 class MusicPlayerApp(App):
     """The Main Controller."""
@@ -38,9 +62,15 @@ class MusicPlayerApp(App):
         height: 100%;
     }
 
+    SearchBar {
+        display: none;
+        border: solid green;
+        height: 3;
+    }
+
     TrackListView {
         width: 100%;
-        height: 100%;
+        height: 1fr;
         border: solid green;
     }
 
@@ -59,7 +89,7 @@ class MusicPlayerApp(App):
         margin-bottom: 1;
     }
 
-    ParticleField {
+    ParticleField, SpectrumWidget {
         height: 1fr;
     }
 
@@ -140,228 +170,340 @@ class MusicPlayerApp(App):
 
     BINDINGS = _BINDINGS
 
-    def __init__(self, debug: bool = False):
+    def __init__(
+        self,
+        debug: bool = False,
+        profiler: Profiler | None = None,
+        audio: AudioEngine | None = None,
+        db_path: str = DB_PATH,
+        attach: str | None = None,
+    ):
+        """`attach` is the socket of a playback daemon to attach to instead of playing in-process."""
         super().__init__()
         self.debug_mode = debug
-        self.audio = AudioEngine()
-        self.db = MusicDatabase(db_path=DB_PATH)
-        self.songs = []
-        self.current_index = -1
+        self.profiler = profiler
+        if attach is None:
+            self.session = PlayerSession(audio=audio, db_path=db_path, debug_log=DebugLog() if debug else None)
+        else:
+            self.session = RemoteSession(attach)
+        self.frames = FrameScheduler(self)
+        # Decodes the playing track alongside VLC for the station view's bars
+        self.spectrum = SpectrumAnalyzer(self.session.position_ms) if ffmpeg_available() else None
+        self.search_index: TrigramIndex | None = None
+        self.search_query = ""
+        self._info_panel: TrackInfoPanel | None = None
+        self._info_panel_timer = None
+        self._queue: np.ndarray | None = None
         self.highlighted_index = -1
+        # Whether the station view is shown; the session's station mode follows it
         self.station_mode = False
-        self.station_pleasure: int = 3
-        self.station_arousal: int = 3
-        self.volume_level: int = DEFAULT_VOLUME // 10
-        self.audio.set_volume(DEFAULT_VOLUME)
 
     def compose(self) -> ComposeResult:
         yield Header(show_clock=True)
         with Horizontal(id="main_content"):
             with Container(id="left_panel"):
+                yield SearchBar(id="search")
                 yield TrackListView(id="playlist")
                 yield StationView(id="station_view")
             yield TrackInfoPanel(id="track_info")
         yield PlayerControlBar(id="status_bar")
         yield Footer()
 
-    def on_mount(self) -> None:
+    async def on_mount(self) -> None:
         self.title = "AIMU"
+        self._info_panel = self.query_one(TrackInfoPanel)
 
-        try:
-            db_files = self.db.get_all_files()
-        except Exception as e:
-            self.notify(f"Error loading database: {e}", severity="error")
-            db_files = []
-
-        self.songs = []
-        for file_entry in db_files:
+        if isinstance(self.session, RemoteSession):
             try:
-                artist = file_entry.get("artist") if file_entry.get("artist") else "Unknown Artist"
-                title = file_entry.get("title") if file_entry.get("title") else Path(file_entry["path"]).stem
-                display_name = f"{artist} - {title}"
-
-                self.songs.append({
-                    "name": display_name,
-                    "path": file_entry["path"],
-                    "rating": file_entry.get("rating", 1),
-                    "duration": file_entry.get("duration"),
-                    "bitrate": file_entry.get("bitrate"),
-                    "album": file_entry.get("album"),
-                    "bpm": file_entry.get("bpm"),
-                    "title": file_entry.get("title"),
-                    "artist": file_entry.get("artist"),
-                    "albumartist": file_entry.get("albumartist"),
-                    "tracknumber": file_entry.get("tracknumber"),
-                    "genre": file_entry.get("genre"),
-                    "date": file_entry.get("date"),
-                    "feedback": file_entry.get("feedback"),
-                    "mood_pleasure": file_entry.get("mood_pleasure"),
-                    "mood_arousal": file_entry.get("mood_arousal"),
-                })
-            except Exception:
-                continue
-
-        self.songs.sort(key=lambda x: (x.get("artist") or "", x.get("title") or ""))
+                await self.session.attach()
+            except (OSError, DaemonError) as e:
+                self.exit(return_code=1, message=f"Could not attach to the daemon: {e}")
+                return
+            self.sub_title = "attached"
+        self.session.subscribe(self._on_session_event)
 
         playlist = self.query_one(TrackListView)
         playlist.load_tracks(self.songs)
         playlist.focus()
 
-        if not self.songs:
+        # The playlist fills in as chunks arrive, from the database or the
+        # daemon; see _show_library
+        self.run_worker(self._load_library(), exclusive=True, group="library")
+        if isinstance(self.session, PlayerSession):
+            # Essential: keeps running while unfocused so tracks still auto-advance.
+            # Tied to the status bar so it stops once the bar is torn down at exit
+            self.frames.register(
+                self.check_playback_status, 0.5,
+                widget=self.query_one(PlayerControlBar), name="playback status", essential=True,
+            )
+        else:
+            # The daemon polls playback itself and reports it in status events
+            self._show_station(self.session.station_mode)
+            self._show_status(self.session.status())
+        self._info_panel.update_volume(self.volume_level)
+
+    # ── Session ───────────────────────────────────────────────────────────────
+    # Library and playback state live in the session; these read through to it
+
+    @property
+    def songs(self) -> TrackStore:
+        return self.session.songs
+
+    @property
+    def station(self) -> StationScorer:
+        return self.session.station
+
+    @property
+    def audio(self) -> AudioEngine:
+        """The audio engine, when playing in-process."""
+        return self.session.audio
+
+    @property
+    def current_index(self) -> int:
+        return self.session.current_index
+
+    @property
+    def station_pleasure(self) -> int:
+        return self.session.station_pleasure
+
+    @property
+    def station_arousal(self) -> int:
+        return self.session.station_arousal
+
+    @property
+    def volume_level(self) -> int:
+        return self.session.volume_level
+
+    async def _load_library(self) -> None:
+        for error in await self.session.load():
+            self.notify(error, severity="error")
+        self.run_worker(self.session.watch_files(), group="integrity")
+
+    def _show_library(self, count: int, done: bool) -> None:
+        """More of the library arrived: show it, and once it's all there index it."""
+        playlist = self.query_one(TrackListView)
+        if self.search_query:
+            # The filter covers only the tracks there were when it was applied
+            self._apply_search(self.search_query)
+        else:
+            playlist.refresh_rows()
+        if not done:
+            return
+        # Attached to a daemon, a track may be playing already
+        if 0 <= self.current_index < len(self.songs):
+            playlist.move_to_track(self.current_index)
+        self.run_worker(self._build_indexes, thread=True, exclusive=True, group="indexes")
+        if not count:
             self.notify("No tracks found in database. Run scan_mp3_to_db.py first.", severity="warning")
 
-        self.set_interval(0.5, self.check_playback_status)
-        self.query_one(TrackInfoPanel).update_volume(self.volume_level)
+    def _still_loading(self) -> bool:
+        """Station mode and ratings need the station scores, which come after the whole library."""
+        if self.session.loaded.is_set():
+            return False
+        self.notify("Still loading the library…")
+        return True
+
+    def _on_session_event(self, event: str, data: dict) -> None:
+        if event == "library":
+            self._show_library(data["count"], data["done"])
+        elif event == "track":
+            self._show_track(data["index"], data["waveform"])
+        elif event == "status":
+            self._show_status(data)
+        elif event == "station":
+            self._show_station(data["on"])
+        elif event == "feedback":
+            self.query_one(TrackListView).refresh_rows()
+            self._update_info_panel()
+        elif event == "volume":
+            self._info_panel.update_volume(data["level"])
+        elif event == "availability":
+            self.query_one(TrackListView).refresh_rows()
+            if data["missing"]:
+                self.notify(f"{len(data['missing'])} tracks can't be found on disk and are hidden", severity="warning")
+        elif event == "error":
+            self.notify(data["message"], severity="error")
+
+    async def on_event(self, event: events.Event) -> None:
+        if isinstance(event, events.InputEvent):
+            self.frames.note_activity()
+        await super().on_event(event)
 
-    # ── Help overlay ──────────────────────────────────────────────────────────
+    def on_app_focus(self, event: events.AppFocus) -> None:
+        self.frames.wake()
+
+    # ── Overlays ──────────────────────────────────────────────────────────
 
     def action_help(self) -> None:
         self.push_screen(HelpModal(load_bindings(KEYBINDINGS_PATH), KEYBINDINGS_PATH))
 
+    def check_action(self, action: str, parameters: tuple[object, ...]) -> bool | None:
+        # The profiler key does nothing, and isn't shown, unless running with --profile
+        if action == "profile":
+            return self.profiler is not None
+        return True
+
+    def action_profile(self) -> None:
+        if self.profiler is not None and not isinstance(self.screen, ProfileModal):
+            self.push_screen(ProfileModal(
+                self.profiler, self.frames, getattr(self.session, "cache", None), self.spectrum,
+            ))
+
+    # ── Search ────────────────────────────────────────────────────────────────
+
+    def _build_indexes(self) -> None:
+        """
+        Index the library off the event loop: precompute every sort order,
+        then the search index. Searches start working once it's ready. The
+        sort orders are handed to the store on the loop, which drops any
+        whose column changed while they were built (e.g. station scores).
+        """
+        orders = self.songs.sort_orders([key for key, *_ in PLAYLIST_COLUMNS])
+        self.call_from_thread(self.songs.add_sort_orders, orders)
+        index = TrigramIndex()
+        index.add(self.songs)
+        self.call_from_thread(self._on_search_index_ready, index)
+
+    def _on_search_index_ready(self, index: TrigramIndex) -> None:
+        self.search_index = index
+        if self.search_query:
+            self._apply_search(self.search_query)
+
+    def _apply_search(self, query: str) -> None:
+        self.search_query = query
+        self.query_one(TrackListView).set_filter(query_mask(query, self.songs, self.search_index))
+
+    def action_cycle_sort(self) -> None:
+        if not self.station_mode:
+            self.query_one(TrackListView).cycle_sort()
+
+    def action_reverse_sort(self) -> None:
+        if not self.station_mode:
+            playlist = self.query_one(TrackListView)
+            playlist.sort_by(playlist.sort_column, not playlist.sort_descending)
+
+    def action_search(self) -> None:
+        if self.station_mode:
+            return
+        bar = self.query_one(SearchBar)
+        bar.display = True
+        bar.focus()
+
+    def on_input_changed(self, message: SearchBar.Changed) -> None:
+        if message.input.id == "search":
+            self._apply_search(message.value)
+
+    def on_search_bar_done(self, message: SearchBar.Done) -> None:
+        self.query_one(TrackListView).focus()
+
+    def on_search_bar_closed(self, message: SearchBar.Closed) -> None:
+        self.query_one(TrackListView).focus()
+
     # ── Station mode ──────────────────────────────────────────────────────────
 
-    def action_toggle_station(self) -> None:
-        if not self.songs:
+    async def action_toggle_station(self) -> None:
+        if not self.songs or self._still_loading():
             return
-        self.station_mode = not self.station_mode
+        if self.station_mode:
+            await self.session.set_station(False)
+            return
+
+        self._show_station(True)
+
+        async def on_mood(result: dict | None) -> None:
+            # Cancelling keeps the last mood; the station starts either way
+            if result is None:
+                await self.session.set_station(True)
+            else:
+                await self.session.set_station(True, result["mood_pleasure"], result["mood_arousal"])
+
+        self.push_screen(
+            MoodModal(self.station_pleasure, self.station_arousal),
+            on_mood,
+        )
+
+    def _show_station(self, on: bool) -> None:
+        """Show the station view or the playlist, whichever client switched station mode."""
+        was_on, self.station_mode = self.station_mode, on
 
         playlist = self.query_one(TrackListView)
+        search = self.query_one(SearchBar)
         station = self.query_one(StationView)
-        playlist.display = not self.station_mode
-        station.display = self.station_mode
+        playlist.display = not on
+        search.display = not on and bool(self.search_query)
+        station.display = on
 
-        if self.station_mode:
-            def on_mood(result: dict | None) -> None:
-                if result is not None:
-                    self.station_pleasure = result["mood_pleasure"]
-                    self.station_arousal  = result["mood_arousal"]
-                self.play_track(self._pick_station_song())
-
-            self.push_screen(
-                MoodModal(self.station_pleasure, self.station_arousal),
-                on_mood,
-            )
-        else:
-            # Sync playlist cursor back to the currently playing song
-            if 0 <= self.current_index < len(self.songs):
-                playlist.cursor_coordinate = (self.current_index, 0)
-            playlist.focus()
-            self._update_info_panel()
+        self.frames.wake()
 
-    def _song_station_score(self, feedback_history: list) -> float | None:
-        """Return the mood-proximity raw score for a single song, or None if no valid feedback."""
-        RATING_MAP = {1: -1, 2: 1, 3: 4}
-        px, py = self.station_pleasure, self.station_arousal
-        best_score: float | None = None
-        best_dist: float = float("inf")
-        for entry in feedback_history:
-            ep = entry.get("mood_pleasure")
-            ea = entry.get("mood_arousal")
-            er = entry.get("rating")
-            if ep is None or ea is None or er is None:
-                continue
-            raw = RATING_MAP.get(int(er))
-            if raw is None:
-                continue
-            dist = math.sqrt((ep - px) ** 2 + (ea - py) ** 2)
-            if dist < best_dist:
-                best_dist = dist
-                best_score = raw / (1.0 + dist)
-        return best_score
-
-    def _pick_station_song(self) -> int:
-        """Return a random song index weighted by mood-proximity and feedback rating."""
-        RATING_MAP = {1: -1, 2: 1, 3: 4}
-        px, py = self.station_pleasure, self.station_arousal
-
-        raw_scores: list[float] = []
-        for song in self.songs:
-            history = self.db.get_feedback_history(song["path"])
-            best_score: float | None = None
-            best_dist: float = float("inf")
-            for entry in history:
-                ep = entry.get("mood_pleasure")
-                ea = entry.get("mood_arousal")
-                er = entry.get("rating")
-                if ep is None or ea is None or er is None:
-                    continue
-                raw = RATING_MAP.get(int(er))
-                if raw is None:
-                    continue
-                dist = math.sqrt((ep - px) ** 2 + (ea - py) ** 2)
-                if dist < best_dist:
-                    best_dist = dist
-                    best_score = raw / (1.0 + dist)
-            raw_scores.append(best_score if best_score is not None else 0.0)
-
-        # Fixed mapping anchored at 0 → 3 (neutral/no-feedback).
-        # Theoretical raw range: [-1, 4] from RATING_MAP + distance scaling.
-        normalised = [
-            (3.0 + 2.0 * s / 4.0) if s >= 0.0 else (3.0 + 2.0 * s)
-            for s in raw_scores
-        ]
-
-        weights = [2.0 ** (n - 1.0) - 1.0 for n in normalised]
-
-        if self.debug_mode:
-            with open("debug.log", "a") as f:
-                f.write(f"\n--- station pick  mood={px}  arousal={py} ---\n")
-                for song, norm in zip(self.songs, normalised):
-                    f.write(f"  {norm:.2f}  {song['name']}\n")
-
-        return random.choices(range(len(self.songs)), weights=weights, k=1)[0]
+        if on or not was_on:
+            self._update_info_panel()
+            return
+        # Station scores may have changed with the session mood
+        playlist.refresh_rows()
+        # Sync playlist cursor back to the currently playing song
+        if 0 <= self.current_index < len(self.songs):
+            playlist.move_to_track(self.current_index)
+        playlist.focus()
+        self._update_info_panel()
 
     # ── Playback ──────────────────────────────────────────────────────────────
 
-    def on_data_table_row_highlighted(self, message: TrackListView.RowHighlighted) -> None:
-        if message.data_table.id != "playlist":
-            return
-        row_key = message.row_key.value
-        if not row_key:
-            return
-        index_str, _ = row_key.split("|", 1)
-        self.highlighted_index = int(index_str)
+    def on_track_list_view_highlighted(self, message: TrackListView.Highlighted) -> None:
+        self.highlighted_index = message.index
+        # Coalesce highlights to at most one panel update per frame, so holding
+        # an arrow key doesn't rebuild the panel for every row passed over
+        if self._info_panel_timer is None:
+            self._info_panel_timer = self.set_timer(INFO_PANEL_FRAME, self._flush_info_panel)
+
+    def _flush_info_panel(self) -> None:
+        self._info_panel_timer = None
         self._update_info_panel()
 
-    def on_data_table_row_selected(self, message: TrackListView.RowSelected) -> None:
-        if message.data_table.id != "playlist":
-            return
-        row_key = message.row_key.value
-        if not row_key:
-            return
-        index_str, _ = row_key.split("|", 1)
-        self.play_track(int(index_str))
+    async def on_track_list_view_selected(self, message: TrackListView.Selected) -> None:
+        await self.play_track(message.index)
 
-    def play_track(self, index: int) -> None:
-        if 0 <= index < len(self.songs):
-            self.current_index = index
-            # In station mode keep the info panel in sync with what's playing
-            if self.station_mode:
-                self.highlighted_index = index
-            song = self.songs[index]
+    def on_track_list_view_rows_changed(self, message: TrackListView.RowsChanged) -> None:
+        # Outside station mode the session plays on in the order shown
+        if self._queue is None or not np.array_equal(self._queue, message.rows):
+            self._queue = message.rows
+            self.session.set_queue(message.rows)
 
-            self.audio.play(song["path"])
+    async def play_track(self, index: int) -> None:
+        await self.session.play(index)
 
-            playlist = self.query_one(TrackListView)
-            playlist.cursor_coordinate = (index, 0)
+    def _show_track(self, index: int, waveform: bytes | None) -> None:
+        """A track started playing, whichever client started it."""
+        if not 0 <= index < len(self.songs):
+            return
+        # In station mode keep the info panel in sync with what's playing
+        if self.station_mode:
+            self.highlighted_index = index
+        song = self.songs[index]
 
-            bar = self.query_one(PlayerControlBar)
-            bar.update_status(song["name"], 0.0, 0, 0)
+        self._info_panel.set_waveform(waveform)
+        if self.spectrum is not None:
+            self.spectrum.play(song["path"])
 
-            self._update_info_panel()
+        playlist = self.query_one(TrackListView)
+        playlist.move_to_track(index)
+
+        bar = self.query_one(PlayerControlBar)
+        bar.update_status(song["name"], 0.0, 0, 0)
+
+        self._update_info_panel()
 
     def _update_info_panel(self) -> None:
-        panel = self.query_one(TrackInfoPanel)
+        panel = self._info_panel
         if self.highlighted_index < 0 or self.highlighted_index >= len(self.songs):
             panel.set_track(None)
             panel.set_station_mood(None, None)
             return
         song = self.songs[self.highlighted_index]
         is_playing = self.highlighted_index == self.current_index
-        feedback_history = self.db.get_feedback_history(song["path"])
-        panel.set_track(song, is_playing=is_playing, feedback_history=feedback_history)
+        cells = self.station.feedback.get(self.highlighted_index, [])
+        panel.set_track(song, is_playing=is_playing, feedback=cells)
         if self.station_mode:
-            station_score = self._song_station_score(feedback_history)
+            station_score = self.session.song_station_score(cells)
             panel.set_station_mood(self.station_pleasure, self.station_arousal, station_score)
         else:
             panel.set_station_mood(None, None)
@@ -371,7 +513,10 @@ class MusicPlayerApp(App):
     def action_feedback(self) -> None:
         if self.highlighted_index < 0 or self.highlighted_index >= len(self.songs):
             return
-        song = self.songs[self.highlighted_index]
+        if self._still_loading():
+            return
+        index = self.highlighted_index
+        song = self.songs[index]
 
         if self.station_mode:
             # Preselect session mood; land focus on rating
@@ -383,19 +528,16 @@ class MusicPlayerApp(App):
 
         rating = max(1, min(3, int(song.get("rating") or 2)))
 
-        def on_result(result: dict | None) -> None:
+        async def on_result(result: dict | None) -> None:
             if result is None:
                 return
-            song["mood_pleasure"] = result["mood_pleasure"]
-            song["mood_arousal"]  = result["mood_arousal"]
-            song["rating"]        = result["rating"]
-            self.db.add_feedback(
-                song["path"],
+            # The session's feedback event refreshes the playlist and the panel
+            await self.session.add_feedback(
+                index,
                 result["mood_pleasure"],
                 result["mood_arousal"],
                 result["rating"],
             )
-            self._update_info_panel()
 
         self.push_screen(
             FeedbackModal(
@@ -410,51 +552,63 @@ class MusicPlayerApp(App):
 
     def action_volume_up(self) -> None:
         if self.volume_level < 10:
-            self.volume_level += 1
-            self.audio.set_volume(self.volume_level * 10)
-            self.query_one(TrackInfoPanel).update_volume(self.volume_level)
+            self.session.set_volume(self.volume_level + 1)
 
     def action_volume_down(self) -> None:
         if self.volume_level > 1:
-            self.volume_level -= 1
-            self.audio.set_volume(self.volume_level * 10)
-            self.query_one(TrackInfoPanel).update_volume(self.volume_level)
+            self.session.set_volume(self.volume_level - 1)
 
     def action_seek_backward(self):
-        self.audio.seek_relative(-10)
+        self.session.seek(-SEEK_STEP)
 
     def action_seek_forward(self):
-        self.audio.seek_relative(10)
+        self.session.seek(SEEK_STEP)
 
     def action_toggle_pause(self):
-        self.audio.toggle_pause()
+        self.session.toggle_pause()
 
-    def action_next_song(self):
-        if self.station_mode:
-            self.play_track(self._pick_station_song())
-        else:
-            next_idx = self.current_index + 1
-            if next_idx < len(self.songs):
-                self.play_track(next_idx)
+    async def action_next_song(self):
+        await self.session.next()
 
     def check_playback_status(self):
-        info = self.audio.get_info()
+        # Publishes a status event, which _show_status handles, and auto-advances
+        self.session.tick()
 
+    def _show_status(self, status: dict) -> None:
+        if not status:
+            return
         current_song_name = ""
-        if self.current_index >= 0:
+        if 0 <= self.current_index < len(self.songs):
             current_song_name = self.songs[self.current_index]["name"]
 
         bar = self.query_one(PlayerControlBar)
         bar.update_status(
             song_name=current_song_name,
-            progress=info["progress"],
-            current_ms=info["current_ms"],
-            total_ms=info["total_ms"],
+            progress=status["progress"],
+            current_ms=status["current_ms"],
+            total_ms=status["total_ms"],
         )
-
-        if self.audio.has_finished() and self.current_index != -1:
-            self.action_next_song()
+        self._info_panel.set_playback_position(status["progress"])
+        self.frames.set_playing(status["is_playing"])
 
     def on_unmount(self) -> None:
-        if hasattr(self, 'db'):
-            self.db.close()
+        # Detaching leaves a daemon playing; an in-process session stops
+        self.session.close()
+        if self.spectrum is not None:
+            self.spectrum.close()
+
+
+def install_profiler(profiler: Profiler) -> None:
+    """
+    Time the player's hot paths, every database query, the VLC calls that
+    can block and every widget render. Call before the app is created.
+    """
+    profiler.instrument(MusicPlayerApp, PROFILED_METHODS, "app")
+    profiler.instrument(PlayerSession, SESSION_PROFILED_METHODS, "session")
+    profiler.instrument(
+        MusicDatabase,
+        [name for name, value in vars(MusicDatabase).items() if callable(value) and not name.startswith("_")],
+        "db",
+    )
+    profiler.instrument(AudioEngine, ["play", "get_info", "has_finished"], "audio")
+    profiler.instrument_by_class(Widget, "render_lines", "render")
@@ -1,43 +1,63 @@
-import random
-from rich.text import Text
+import numpy as np
+from rich.segment import Segment
+from rich.style import Style
+from textual.geometry import Region
+from textual.strip import Strip
 from textual.widget import Widget
 
 
 _CHARS  = ['·', '·', '·', '·', '•', '◦']
 _STYLES = ['dim', 'dim', 'dim', 'dim cyan', 'dim magenta', 'dim green']
+_PARSED_STYLES = [Style.parse(s) for s in _STYLES]
 
 
 class ParticleField(Widget):
     """
     Sparse field of slowly drifting dots.
     Abstract, calm — makes no pretense of reacting to music.
+
+    Particles live in flat NumPy arrays and move in one vectorized step.
+    Rendering is per line: only rows whose particles changed cell are
+    re-rendered, and each row is a handful of segments rather than one
+    styled character per cell.
     """
 
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
-        self._particles: list[dict] = []
+        self._rng = np.random.default_rng()
+        self._x = self._y = self._vx = self._vy = np.empty(0)
+        self._char = self._style = np.empty(0, dtype=np.int8)
+        self._cells = (np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64))
+        self._field_size = (0, 0)
+        self._lines: dict[int, Strip] = {}
         self._ready = False
 
     def on_mount(self) -> None:
-        self.set_interval(0.15, self._update)   # ~6 fps — intentionally slow
+        # ~6 fps — intentionally slow
+        self._animation = self.app.frames.register(self._update, 0.15, widget=self, name="particles")
+
+    def on_unmount(self) -> None:
+        self.app.frames.unregister(self._animation)
 
     # ── Setup ─────────────────────────────────────────────────────────────────
 
     def _init(self, w: int, h: int) -> None:
         n = max(10, (w * h) // 50)             # roughly 1 dot per 50 cells
-        self._particles = [
-            {
-                'x':     random.uniform(0, w),
-                'y':     random.uniform(0, h),
-                'vx':    random.uniform(-0.06, 0.06),
-                'vy':    random.uniform(-0.04, 0.04),
-                'char':  random.choice(_CHARS),
-                'style': random.choice(_STYLES),
-            }
-            for _ in range(n)
-        ]
+        rng = self._rng
+        self._x = rng.uniform(0, w, n)
+        self._y = rng.uniform(0, h, n)
+        self._vx = rng.uniform(-0.06, 0.06, n)
+        self._vy = rng.uniform(-0.04, 0.04, n)
+        self._char = rng.integers(0, len(_CHARS), n, dtype=np.int8)
+        self._style = rng.integers(0, len(_STYLES), n, dtype=np.int8)
+        self._cells = self._cell_positions(w, h)
+        self._field_size = (w, h)
+        self._lines.clear()
         self._ready = True
 
+    def _cell_positions(self, w: int, h: int) -> tuple[np.ndarray, np.ndarray]:
+        return self._x.astype(np.int64) % w, self._y.astype(np.int64) % h
+
     # ── Update ────────────────────────────────────────────────────────────────
 
     def _update(self) -> None:
@@ -46,41 +66,113 @@ class ParticleField(Widget):
         w, h = self.size.width, self.size.height
         if w == 0 or h == 0:
             return
-        if not self._ready:
+        if not self._ready or self._field_size != (w, h):
             self._init(w, h)
+            self.refresh()
             return
 
-        for p in self._particles:
-            p['x'] = (p['x'] + p['vx']) % w
-            p['y'] = (p['y'] + p['vy']) % h
-            # Rare tiny velocity nudge so paths drift rather than loop
-            if random.random() < 0.015:
-                p['vx'] = max(-0.08, min(0.08, p['vx'] + random.uniform(-0.02, 0.02)))
-                p['vy'] = max(-0.05, min(0.05, p['vy'] + random.uniform(-0.015, 0.015)))
+        rng = self._rng
+        self._x = (self._x + self._vx) % w
+        self._y = (self._y + self._vy) % h
+        # Rare tiny velocity nudge so paths drift rather than loop
+        nudge = rng.random(len(self._x)) < 0.015
+        k = int(nudge.sum())
+        if k:
+            self._vx[nudge] = np.clip(self._vx[nudge] + rng.uniform(-0.02, 0.02, k), -0.08, 0.08)
+            self._vy[nudge] = np.clip(self._vy[nudge] + rng.uniform(-0.015, 0.015, k), -0.05, 0.05)
+
+        old_cx, old_cy = self._cells
+        cx, cy = self._cells = self._cell_positions(w, h)
+        moved = (cx != old_cx) | (cy != old_cy)
+        if not moved.any():
+            return
 
-        self.refresh()
+        # A row changes if a particle entered or left it, or moved within it
+        for row in np.unique(np.concatenate([cy[moved], old_cy[moved]])).tolist():
+            self._lines.pop(row, None)
+            self.refresh(Region(0, row, w, 1))
 
     # ── Render ────────────────────────────────────────────────────────────────
 
-    def render(self) -> Text:
+    def render_line(self, y: int) -> Strip:
         w, h = self.size.width, self.size.height
-        if w == 0 or h == 0 or not self._ready:
-            return Text("")
-
-        # Build a blank grid then stamp each particle onto it
-        grid: list[list[tuple[str, str]]] = [
-            [(' ', '') for _ in range(w)] for _ in range(h)
-        ]
-        for p in self._particles:
-            px = int(p['x']) % w
-            py = int(p['y']) % h
-            grid[py][px] = (p['char'], p['style'])
-
-        result = Text()
-        for ri, row in enumerate(grid):
-            for ch, style in row:
-                result.append(ch, style=style) if style else result.append(ch)
-            if ri < h - 1:
-                result.append('\n')
-
-        return result
+        base = self.rich_style
+        if w == 0 or h == 0 or not self._ready or self._field_size != (w, h):
+            return Strip.blank(w, base)
+
+        strip = self._lines.get(y)
+        if strip is None:
+            strip = self._lines[y] = self._render_row(y, w, base)
+        return strip
+
+    def _render_row(self, y: int, w: int, base: Style) -> Strip:
+        cx, cy = self._cells
+        members = np.flatnonzero(cy == y)
+        if not len(members):
+            return Strip.blank(w, base)
+
+        # Later particles win a shared cell, as they would stamping a grid
+        cells: dict[int, int] = {}
+        for i in members.tolist():
+            cells[int(cx[i])] = i
+
+        segments = []
+        pos = 0
+        for x in sorted(cells):
+            if x > pos:
+                segments.append(Segment(" " * (x - pos), base))
+            i = cells[x]
+            segments.append(Segment(_CHARS[self._char[i]], base + _PARSED_STYLES[self._style[i]]))
+            pos = x + 1
+        if pos < w:
+            segments.append(Segment(" " * (w - pos), base))
+        return Strip(segments, w)
+
+
+# --- Quick Benchmark Block ---
+# python -m ui.particles [WIDTH HEIGHT]  — CPU time per frame for the particle
+# update and for re-rendering the rows it dirtied, with no terminal attached.
+if __name__ == "__main__":
+    import sys
+    import time
+
+    from textual.geometry import Size
+
+    w, h = (int(sys.argv[1]), int(sys.argv[2])) if len(sys.argv) > 2 else (240, 70)
+    frames = 500
+
+    class DetachedField(ParticleField):
+        """The real widget at a fixed size, collecting dirty rows instead of repainting."""
+
+        is_attached = True
+        size = Size(w, h)
+        rich_style = Style()
+
+        def __init__(self):
+            super().__init__()
+            self.dirty: list[Region] = []
+
+        def refresh(self, *regions: Region, **kwargs) -> "DetachedField":
+            self.dirty.extend(regions)
+            return self
+
+    field = DetachedField()
+    field._update()                        # first frame sizes the field
+
+    update_s = render_s = 0.0
+    rows_rendered = 0
+    for _ in range(frames):
+        field.dirty.clear()
+        t0 = time.perf_counter()
+        field._update()
+        t1 = time.perf_counter()
+        for region in field.dirty:
+            field.render_line(region.y)
+        t2 = time.perf_counter()
+        update_s += t1 - t0
+        render_s += t2 - t1
+        rows_rendered += len(field.dirty)
+
+    print(f"{w}x{h}, {len(field._x)} particles, {frames} frames")
+    print(f"  update  {update_s / frames * 1e6:8.1f} µs/frame")
+    print(f"  render  {render_s / frames * 1e6:8.1f} µs/frame  ({rows_rendered / frames:.1f} of {h} rows)")
@@ -1,35 +1,371 @@
-from textual.widgets import DataTable
+import numpy as np
+from rich.cells import cell_len
+from rich.segment import Segment
 from textual.binding import Binding
+from textual.events import Click
+from textual.geometry import Region, Size, Spacing
+from textual.message import Message
+from textual.scroll_view import ScrollView
+from textual.strip import Strip
 
+from core.library import TrackStore
 
-class TrackListView(DataTable):
+
+def _fmt_number(value) -> str:
+    return "" if value is None or value == "" else str(value)
+
+
+def _fmt_year(song: dict) -> str:
+    return str(song.get("date") or "")[:4]
+
+
+def _fmt_time(song: dict) -> str:
+    seconds = song.get("duration")
+    if not seconds:
+        return ""
+    return f"{int(seconds) // 60}:{int(seconds) % 60:02}"
+
+
+def _fmt_rating(song: dict) -> str:
+    try:
+        rating = max(0, min(3, int(song.get("rating") or 0)))
+    except (TypeError, ValueError):
+        return ""
+    return "■" * rating + "□" * (3 - rating)
+
+
+# (sort column, header, width or None for the flexible column, right-aligned)
+COLUMNS = [
+    ("artist",   "TRACK", None, False),
+    ("album",    "ALBUM", 16,   False),
+    ("year",     "YEAR",  5,    True),
+    ("bpm",      "BPM",   4,    True),
+    ("duration", "TIME",  5,    True),
+    ("rating",   "RATE",  5,    False),
+    ("station",  "STN",   4,    True),
+]
+
+# Columns whose natural order is best-first
+_DESCENDING_FIRST = {"rating", "station"}
+
+
+class TrackListView(ScrollView, can_focus=True):
     """
-    A scrollable list of music tracks.
+    A scrollable, sortable list of music tracks.
+
+    Virtual: the widget holds a reference to the track store plus an array
+    of store indices (one per visible row) and renders only the lines that
+    are on screen, so painting and scrolling cost the same for 100 tracks
+    or 100k. Sorting takes a cached permutation from the store and filtering
+    applies a boolean mask to it; neither re-sorts nor rebuilds anything.
+    """
+
+    COMPONENT_CLASSES = {
+        "track-list--header",
+        "track-list--cursor",
+        "track-list--even-row",
+    }
+
+    DEFAULT_CSS = """
+    TrackListView {
+        background: $surface;
+    }
+
+    TrackListView > .track-list--header {
+        background: $panel;
+        text-style: bold;
+    }
+
+    TrackListView > .track-list--even-row {
+        background: $surface-lighten-1 50%;
+    }
+
+    TrackListView > .track-list--cursor {
+        background: $secondary 50%;
+    }
+
+    TrackListView:focus > .track-list--cursor {
+        background: $secondary;
+        color: $text;
+    }
     """
 
-    # We can add custom key bindings if needed, but default
-    # arrow keys and Enter are handled by DataTable automatically.
+    BINDINGS = [
+        Binding("enter", "select_cursor", "Play", show=False),
+        Binding("up", "cursor_up", "Up", show=False),
+        Binding("down", "cursor_down", "Down", show=False),
+        Binding("pageup", "page_up", "Page Up", show=False),
+        Binding("pagedown", "page_down", "Page Down", show=False),
+        Binding("home", "scroll_top", "Top", show=False),
+        Binding("end", "scroll_bottom", "Bottom", show=False),
+    ]
+
+    class Highlighted(Message):
+        """Posted when the cursor moves to a different track."""
+
+        def __init__(self, track_list: "TrackListView", index: int) -> None:
+            super().__init__()
+            self.track_list = track_list
+            self.index = index  # store index of the highlighted track
+
+        @property
+        def control(self) -> "TrackListView":
+            return self.track_list
+
+    class Selected(Message):
+        """Posted when a track is chosen with Enter or a click on the cursor row."""
 
-    def on_mount(self) -> None:
-        # Set up the table structure
-        self.cursor_type = "row"
-        self.zebra_stripes = True
-        self.add_column("Track Name", width=None)
+        def __init__(self, track_list: "TrackListView", index: int) -> None:
+            super().__init__()
+            self.track_list = track_list
+            self.index = index  # store index of the selected track
 
-    def load_tracks(self, songs: list):
+        @property
+        def control(self) -> "TrackListView":
+            return self.track_list
+
+    class RowsChanged(Message):
+        """Posted when the shown tracks or their order change."""
+
+        def __init__(self, track_list: "TrackListView", rows: np.ndarray) -> None:
+            super().__init__()
+            self.track_list = track_list
+            self.rows = rows  # store indices, top to bottom
+
+        @property
+        def control(self) -> "TrackListView":
+            return self.track_list
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._store = TrackStore()
+        self._rows = np.arange(0)
+        self._filter: np.ndarray | None = None
+        self.sort_column = "artist"
+        self.sort_descending = False
+        self.cursor_row = -1
+
+    # ── Data ──────────────────────────────────────────────────────────────────
+
+    def load_tracks(self, songs: TrackStore) -> None:
+        """Show the given track store, in the current sort order and filter."""
+        self._store = songs
+        self._filter = None
+        self.refresh_rows()
+
+    def set_filter(self, mask: np.ndarray | None) -> None:
         """
-        Populate the table with the list of songs.
+        Show only tracks whose store index is set in `mask`; None shows every
+        track. The mask must cover the whole store: set it again when the
+        store grows.
         """
-        self.clear()
+        self._filter = mask
+        self.refresh_rows()
+
+    def sort_by(self, column: str, descending: bool | None = None) -> None:
+        """
+        Order rows by `column`. Sorting by the current column again flips the
+        direction; otherwise the column's natural direction is used.
+        """
+        if descending is None:
+            if column == self.sort_column:
+                descending = not self.sort_descending
+            else:
+                descending = column in _DESCENDING_FIRST
+        self.sort_column = column
+        self.sort_descending = descending
+        self.refresh_rows()
+
+    def cycle_sort(self) -> None:
+        """Sort by the next column."""
+        keys = [key for key, *_ in COLUMNS]
+        self.sort_by(keys[(keys.index(self.sort_column) + 1) % len(keys)])
+
+    def refresh_rows(self) -> None:
+        """
+        Recompute the displayed rows from the cached sort permutation, the
+        filter mask and the store's availability mask, which hides tracks
+        whose files are missing. The cursor stays on the same track if it is
+        still shown.
+        """
+        perm = self._store.sort_permutation(self.sort_column, self.sort_descending)
+        mask = self._filter
+        if mask is not None:
+            if len(mask) != len(perm):
+                raise ValueError(f"filter covers {len(mask)} tracks but the store has {len(perm)}")
+            perm = perm[mask[perm]]
+        available = self._store.availability()
+        if not available.all():
+            perm = perm[available[perm]]
+
+        current = self.cursor_index
+        self._rows = perm
+        self.virtual_size = Size(0, len(self._rows) + 1)
+        self.cursor_row = -1
+        self.refresh()
+        self.post_message(self.RowsChanged(self, perm))
+
+        if not len(self._rows):
+            self.scroll_to(0, 0, animate=False)
+            return
+        # Select the first row by default if the current track isn't shown
+        row = self._row_of(current)
+        self._move_cursor(row if row >= 0 else 0)
+
+    @property
+    def row_count(self) -> int:
+        return len(self._rows)
+
+    @property
+    def cursor_index(self) -> int:
+        """Store index of the track under the cursor, or -1."""
+        if 0 <= self.cursor_row < len(self._rows):
+            return int(self._rows[self.cursor_row])
+        return -1
+
+    def _row_of(self, index: int) -> int:
+        hits = np.flatnonzero(self._rows == index)
+        return int(hits[0]) if len(hits) else -1
+
+    def index_after(self, index: int) -> int:
+        """Store index of the track shown after `index`, or -1 at the end or if `index` isn't shown."""
+        row = self._row_of(index)
+        if row < 0 or row + 1 >= len(self._rows):
+            return -1
+        return int(self._rows[row + 1])
+
+    def move_to_track(self, index: int) -> None:
+        """Move the cursor to the row showing store index `index`, if visible."""
+        row = self._row_of(index)
+        if row >= 0:
+            self._move_cursor(row)
+
+    # ── Cursor ────────────────────────────────────────────────────────────────
+
+    # Rows sit one line below the header, so row r is virtual line r + 1.
+
+    def _move_cursor(self, row: int) -> None:
+        if not len(self._rows):
+            return
+        row = max(0, min(len(self._rows) - 1, row))
+        if row == self.cursor_row:
+            return
+        old_row = self.cursor_row
+        self.cursor_row = row
+        if old_row >= 0:
+            self.refresh_line(old_row + 1)
+        self.refresh_line(row + 1)
+        self.scroll_to_region(Region(0, row + 1, 1, 1), animate=False, spacing=Spacing(top=1))
+        self.post_message(self.Highlighted(self, int(self._rows[row])))
+
+    def action_cursor_up(self) -> None:
+        self._move_cursor(self.cursor_row - 1)
+
+    def action_cursor_down(self) -> None:
+        self._move_cursor(self.cursor_row + 1)
+
+    def action_page_up(self) -> None:
+        self._move_cursor(self.cursor_row - max(1, self.scrollable_content_region.height - 1))
+
+    def action_page_down(self) -> None:
+        self._move_cursor(self.cursor_row + max(1, self.scrollable_content_region.height - 1))
+
+    def action_scroll_top(self) -> None:
+        self._move_cursor(0)
+
+    def action_scroll_bottom(self) -> None:
+        self._move_cursor(len(self._rows) - 1)
+
+    def action_select_cursor(self) -> None:
+        if 0 <= self.cursor_row < len(self._rows):
+            self.post_message(self.Selected(self, int(self._rows[self.cursor_row])))
+
+    def on_click(self, event: Click) -> None:
+        offset = event.get_content_offset(self)
+        if offset is None:
+            return
+        if offset.y == 0:
+            column = self._column_at(offset.x)
+            if column is not None:
+                self.sort_by(column)
+            return
+        row = offset.y + self.scroll_offset.y - 1
+        if not 0 <= row < len(self._rows):
+            return
+        if row == self.cursor_row:
+            self.action_select_cursor()
+        else:
+            self._move_cursor(row)
+
+    # ── Render ────────────────────────────────────────────────────────────────
+
+    def _layout(self, width: int) -> list[tuple[str, str, int, bool]]:
+        """Columns that fit in `width`, with the flexible column's width resolved."""
+        columns = list(COLUMNS)
+        fixed = sum(w + 1 for _, _, w, _ in columns if w is not None)
+        if width - fixed < 16:
+            # Too narrow: drop the album column first
+            columns = [c for c in columns if c[0] != "album"]
+            fixed = sum(w + 1 for _, _, w, _ in columns if w is not None)
+        flex = max(1, width - fixed - 1)
+        return [(key, header, flex if w is None else w, right) for key, header, w, right in columns]
+
+    def _column_at(self, x: int) -> str | None:
+        pos = 1
+        for key, _, width, _ in self._layout(self.scrollable_content_region.width):
+            if pos <= x < pos + width + 1:
+                return key
+            pos += width + 1
+        return None
+
+    @staticmethod
+    def _cells(values: dict[str, str], layout) -> str:
+        parts = []
+        for key, _, width, right in layout:
+            value = values[key]
+            if cell_len(value) > width:
+                value = Strip([Segment(value)]).crop(0, width - 1).text + "…"
+            pad = " " * (width - cell_len(value))
+            parts.append(pad + value if right else value + pad)
+        return " " + " ".join(parts)
+
+    def _row_values(self, index: int) -> dict[str, str]:
+        song = self._store[index]
+        station = self._store.column("station")[index]
+        return {
+            "artist":   song["name"],
+            "album":    song.get("album") or "",
+            "year":     _fmt_year(song),
+            "bpm":      _fmt_number(song.get("bpm")),
+            "duration": _fmt_time(song),
+            "rating":   _fmt_rating(song),
+            "station":  "" if np.isnan(station) else f"{station:.1f}",
+        }
+
+    def render_line(self, y: int) -> Strip:
+        width = self.scrollable_content_region.width
+        layout = self._layout(width)
+        base_style = self.rich_style
+
+        if y == 0:
+            style = base_style + self.get_component_rich_style("track-list--header")
+            arrow = "▼" if self.sort_descending else "▲"
+            headers = {
+                key: f"{header}{arrow}" if key == self.sort_column else header
+                for key, header, _, _ in layout
+            }
+            return Strip([Segment(self._cells(headers, layout), style)]).crop_extend(0, width, style)
 
-        for index, song in enumerate(songs):
-            # add_row returns a key, but we can also manually specify a key (the index).
-            # We store the FULL PATH as the row identifier so we can retrieve it easily.
-            # We use the index as a prefix to ensure uniqueness just in case.
-            row_key = f"{index}|{song['path']}"
+        row = y + self.scroll_offset.y - 1
+        if row >= len(self._rows):
+            return Strip.blank(width, base_style)
 
-            self.add_row(song["name"], key=row_key)
+        if row == self.cursor_row:
+            style = base_style + self.get_component_rich_style("track-list--cursor")
+        elif row % 2 == 0:
+            style = base_style + self.get_component_rich_style("track-list--even-row")
+        else:
+            style = base_style
 
-        # Select the first row by default if list is not empty
-        if songs:
-            self.action_cursor_down()
+        strip = Strip([Segment(self._cells(self._row_values(int(self._rows[row])), layout), style)])
+        return strip.crop_extend(0, width, style)
@@ -0,0 +1,100 @@
+from textual.app import ComposeResult
+from textual.containers import Container
+from textual.screen import ModalScreen
+from textual.widgets import DataTable, Label
+
+from core.cache import TrackCache
+from core.profiler import Profiler
+from core.spectrum import SpectrumAnalyzer
+from ui.animation import FrameScheduler
+
+
+class ProfileModal(ModalScreen):
+    """Live overlay of --profile latency histograms and animation frame costs."""
+
+    DEFAULT_CSS = """
+    ProfileModal { align: center middle; }
+    #profile_dialog {
+        width: 100;
+        height: 34;
+        border: solid yellow;
+        background: $surface;
+        padding: 1 2;
+    }
+    #profile_title  { text-align: center; margin-bottom: 1; }
+    #timings_table  { height: 1fr; }
+    #frames_table   { height: 8; margin-top: 1; }
+    #cache_stats    { margin-top: 1; }
+    #spectrum_stats { margin-top: 1; }
+    #profile_hint   { text-align: center; margin-top: 1; }
+    """
+
+    def __init__(self, profiler: Profiler, frames: FrameScheduler, cache: TrackCache | None = None,
+                 spectrum: SpectrumAnalyzer | None = None) -> None:
+        super().__init__()
+        self._profiler = profiler
+        self._frames = frames
+        self._cache = cache
+        self._spectrum = spectrum
+
+    def compose(self) -> ComposeResult:
+        with Container(id="profile_dialog"):
+            yield Label("[bold]PROFILE[/bold]", id="profile_title")
+            yield DataTable(id="timings_table", cursor_type="none", zebra_stripes=True)
+            yield DataTable(id="frames_table", cursor_type="none")
+            if self._cache is not None:
+                yield Label(id="cache_stats")
+            if self._spectrum is not None:
+                yield Label(id="spectrum_stats")
+            yield Label("Updates every second   ·   Esc  close", id="profile_hint")
+
+    def on_mount(self) -> None:
+        self.query_one("#timings_table", DataTable).add_columns(
+            "NAME", "COUNT", "P50 ms", "P95 ms", "P99 ms", "MAX ms", "TOTAL ms"
+        )
+        self.query_one("#frames_table", DataTable).add_columns(
+            "ANIMATION", "INTERVAL ms", "FRAMES", "UPDATE ms", "RENDER ms", "CPU %", ""
+        )
+        self._refresh()
+        self.set_interval(1.0, self._refresh)
+
+    def _refresh(self) -> None:
+        timings = self.query_one("#timings_table", DataTable)
+        timings.clear()
+        for name, s in self._profiler.report().items():
+            timings.add_row(
+                name, s["count"],
+                f"{s['p50_ms']:.2f}", f"{s['p95_ms']:.2f}", f"{s['p99_ms']:.2f}",
+                f"{s['max_ms']:.2f}", f"{s['total_ms']:.0f}",
+            )
+
+        frames = self.query_one("#frames_table", DataTable)
+        frames.clear()
+        for s in self._frames.stats():
+            frames.add_row(
+                s["name"], f"{s['interval_ms']:.0f}", s["frames"],
+                f"{s['update_ms']:.2f}", f"{s['render_ms']:.2f}",
+                f"{s['cpu_share'] * 100:.1f}", "paused" if s["paused"] else "",
+            )
+
+        if self._cache is not None:
+            c = self._cache.stats()
+            self.query_one("#cache_stats", Label).update(
+                f"Track cache: {c['hit_rate'] * 100:.0f}% hits ({c['hits']}/{c['hits'] + c['misses']})"
+                f"   ·   {c['bytes_fetched'] / 2**20:.1f} MiB fetched"
+                f"   ·   {c['files']} files, {c['bytes_cached'] / 2**20:.1f} MiB"
+            )
+
+        if self._spectrum is not None:
+            s = self._spectrum.stats()
+            self.query_one("#spectrum_stats", Label).update(
+                f"Spectrum worker: {s['frames']} frames"
+                f"   ·   {s['frame_ms']:.2f} ms CPU/frame"
+                f"   ·   {s['cpu_share'] * 100:.1f}% of a core"
+                f"   ·   {s['decoder_restarts']} decoder starts"
+            )
+
+    def on_key(self, event) -> None:
+        if event.key == "escape":
+            event.stop()
+            self.dismiss()
@@ -0,0 +1,38 @@
+from textual.binding import Binding
+from textual.message import Message
+from textual.widgets import Input
+
+
+class SearchBar(Input):
+    """Search-as-you-type filter shown above the playlist."""
+
+    BINDINGS = [
+        Binding("escape", "close", "Close search", show=False),
+        Binding("down", "done", "To results", show=False),
+    ]
+
+    class Closed(Message):
+        """Posted when the search is cleared and the bar hidden."""
+
+    class Done(Message):
+        """Posted when the user moves from the query to the results."""
+
+    def __init__(self, **kwargs):
+        super().__init__(placeholder="Search title, artist, album, genre…", **kwargs)
+
+    def allow_focus(self) -> bool:
+        # While hidden, never inherit focus from the playlist — keys typed
+        # into an invisible input would never reach the app bindings
+        return self.display and super().allow_focus()
+
+    def action_close(self) -> None:
+        self.value = ""
+        self.display = False
+        self.post_message(self.Closed())
+
+    def action_done(self) -> None:
+        self.post_message(self.Done())
+
+    def on_input_submitted(self, event: Input.Submitted) -> None:
+        event.stop()
+        self.post_message(self.Done())
@@ -0,0 +1,83 @@
+import numpy as np
+from rich.segment import Segment
+from rich.style import Style
+from textual.geometry import Region
+from textual.strip import Strip
+from textual.widget import Widget
+
+from config import SPECTRUM_FPS
+from core.spectrum import SpectrumAnalyzer
+
+# Eight sub-cell heights from lowest to highest
+_CHARS = np.array(list(" ▁▂▃▄▅▆▇█"))
+
+# Colour by height, from the bottom row up
+_STYLES = [Style.parse(s) for s in ("green", "green", "cyan", "cyan", "magenta", "bold magenta")]
+
+
+class SpectrumWidget(Widget):
+    """
+    Bars for the band levels of the playing track, read from a
+    SpectrumAnalyzer at the widget's own frame rate.
+
+    A frame turns the levels into one text row per line of bars; only rows
+    whose text changed are repainted, each as a single segment.
+    """
+
+    def __init__(self, analyzer: SpectrumAnalyzer, **kwargs):
+        super().__init__(**kwargs)
+        self._analyzer = analyzer
+        self._shown: np.ndarray | None = None
+        self._rows: list[str] = []
+        self._drawn_size = (0, 0)
+
+    def on_mount(self) -> None:
+        self._animation = self.app.frames.register(
+            self._update, 1.0 / SPECTRUM_FPS, widget=self, name="spectrum",
+        )
+
+    def on_unmount(self) -> None:
+        self.app.frames.unregister(self._animation)
+
+    def _update(self) -> None:
+        if not self.is_attached:
+            return
+        w, h = self.size.width, self.size.height
+        bands = self._analyzer.latest()
+        if w == 0 or h == 0 or (bands is self._shown and self._drawn_size == (w, h)):
+            return
+        self._shown = bands
+        rows = self.bar_rows(bands, w, h)
+        if self._drawn_size != (w, h):
+            self._drawn_size = (w, h)
+            self._rows = rows
+            self.refresh()
+            return
+        for y, (old, new) in enumerate(zip(self._rows, rows)):
+            if old != new:
+                self.refresh(Region(0, y, w, 1))
+        self._rows = rows
+
+    @staticmethod
+    def bar_rows(levels: np.ndarray, w: int, h: int) -> list[str]:
+        """Text of each line, top first, drawing `levels` (0–1) as bars across `w` columns."""
+        bars = min(len(levels), w)
+        if not bars:
+            return [" " * w] * h
+        # Bars share the width evenly; at three or more columns each, the last one is a gap
+        column_bar = np.arange(w) * bars // w
+        eighths = np.rint(levels[:bars] * h * 8).astype(np.int64)[column_bar]
+        if w >= 3 * bars:
+            eighths[np.append(column_bar[1:] != column_bar[:-1], True)] = 0
+        floors = (h - 1 - np.arange(h))[:, None] * 8
+        fill = np.clip(eighths[None, :] - floors, 0, 8)
+        return ["".join(row) for row in _CHARS[fill].tolist()]
+
+    def render_line(self, y: int) -> Strip:
+        w = self.size.width
+        base = self.rich_style
+        if y >= len(self._rows) or self._drawn_size != (w, self.size.height):
+            return Strip.blank(w, base)
+        height = len(self._rows)
+        style = _STYLES[min(len(_STYLES) - 1, (height - 1 - y) * len(_STYLES) // height)]
+        return Strip([Segment(self._rows[y], base + style)], w)
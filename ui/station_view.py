@@ -4,6 +4,7 @@ from textual.containers import Container
 from textual.widgets import Label
 
 from ui.particles import ParticleField
+from ui.spectrum import SpectrumWidget
 
 
 QUIRKY_MESSAGES = [
@@ -38,14 +39,23 @@ class StationView(Container):
             "[bold magenta]◈  S T A T I O N  M O D E  ◈[/bold magenta]",
             id="station_title",
         )
-        yield ParticleField(id="particles")
+        # Drifting dots stand in for the spectrum when ffmpeg isn't installed
+        if self.app.spectrum is not None:
+            yield SpectrumWidget(self.app.spectrum, id="spectrum")
+        else:
+            yield ParticleField(id="particles")
         yield Label("", id="station_message")
 
     def on_mount(self) -> None:
         self._last_message = ""
-        self.set_interval(15.0, self._cycle_message)
+        self._animation = self.app.frames.register(
+            self._cycle_message, 15.0, widget=self, name="station message"
+        )
         self._cycle_message()
 
+    def on_unmount(self) -> None:
+        self.app.frames.unregister(self._animation)
+
     def _cycle_message(self) -> None:
         choices = [m for m in QUIRKY_MESSAGES if m != self._last_message]
         msg = random.choice(choices)
@@ -1,9 +1,22 @@
+from collections import OrderedDict
+
 from textual.app import ComposeResult
 from textual.containers import Container, Horizontal
 from textual.widgets import Label
 from ui.waveform import WaveformWidget
 
 
+# How many tracks' rendered panel content to keep
+_CACHE_SIZE = 512
+
+# Labels filled by set_track(), in display order
+_TRACK_LABELS = (
+    "info_now_playing", "info_title", "info_artist", "info_sep",
+    "info_album", "info_genre", "info_date", "info_bpm",
+    "info_feedback_sep", "info_feedback",
+)
+
+
 def _squares(value: int, total: int, color: str) -> str:
     """Render spaced filled/empty squares, e.g. '■ ■ □ □ □'."""
     parts = [f"[{color}]■[/{color}]"] * value + ["[dim]□[/dim]"] * (total - value)
@@ -11,7 +24,21 @@ def _squares(value: int, total: int, color: str) -> str:
 
 
 class TrackInfoPanel(Container):
-    """Right panel showing metadata for the currently highlighted track."""
+    """
+    Right panel showing metadata for the currently highlighted track.
+
+    Label references are resolved once on mount, the markup for each track
+    is kept in a small LRU cache, and a label is only updated when its text
+    actually changes — scrolling through the playlist touches a handful of
+    labels per frame instead of rebuilding the whole panel.
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._labels: dict[str, Label] = {}
+        self._texts: dict[str, str] = {}
+        self._cache: OrderedDict[tuple, dict[str, str]] = OrderedDict()
+        self._waveform: WaveformWidget | None = None
 
     def compose(self) -> ComposeResult:
         yield Label("", id="info_now_playing")
@@ -30,6 +57,16 @@ class TrackInfoPanel(Container):
         yield Label("", id="info_feedback_sep")
         yield Label("", id="info_feedback")
 
+    def on_mount(self) -> None:
+        self._labels = {label.id: label for label in self.query(Label)}
+        self._waveform = self.query_one(WaveformWidget)
+
+    def _set(self, label_id: str, text: str) -> None:
+        """Update a label only if its text changed."""
+        if self._texts.get(label_id) != text:
+            self._texts[label_id] = text
+            self._labels[label_id].update(text)
+
     def _volume_bar(self, level: int) -> str:
         lines = ["[dim]VOLUME[/dim]"]
         for i in range(10, 0, -1):
@@ -39,49 +76,66 @@ class TrackInfoPanel(Container):
         return "\n".join(lines)
 
     def update_volume(self, level: int) -> None:
-        self.query_one("#info_volume", Label).update(self._volume_bar(level))
+        self._set("info_volume", self._volume_bar(level))
+
+    def set_waveform(self, envelope: bytes | None) -> None:
+        """Show the playing track's stored envelope; None falls back to a synthetic wave."""
+        self._waveform.set_envelope(envelope)
+
+    def set_playback_position(self, progress: float) -> None:
+        self._waveform.set_position(progress)
 
     def set_track(
         self,
         song: dict | None,
         is_playing: bool = False,
-        feedback_history: list[dict] | None = None,
+        feedback: list[dict] | None = None,
     ) -> None:
-        """Update the panel to show metadata for the given song."""
-        all_ids = [
-            "#info_now_playing", "#info_title", "#info_artist", "#info_sep",
-            "#info_album", "#info_genre", "#info_date", "#info_bpm",
-            "#info_station_mood", "#info_station_rating", "#info_feedback_sep", "#info_feedback",
-        ]
-
+        """Update the panel to show metadata and the feedback rollup cells for the given song."""
         if song is None:
-            for wid in all_ids:
-                self.query_one(wid, Label).update("")
-            self.query_one(WaveformWidget).display = False
+            for label_id in _TRACK_LABELS:
+                self._set(label_id, "")
+            self._set("info_station_mood", "")
+            self._set("info_station_rating", "")
+            self._waveform.display = False
             return
 
+        cells = feedback or []
+        # Feedback is append-only, so the number of ratings versions the rollup
+        key = (song["path"], is_playing, sum(cell["count"] for cell in cells))
+        texts = self._cache.get(key)
+        if texts is None:
+            texts = self._render_track(song, is_playing, cells)
+            self._cache[key] = texts
+            if len(self._cache) > _CACHE_SIZE:
+                self._cache.popitem(last=False)
+        else:
+            self._cache.move_to_end(key)
+
+        for label_id in _TRACK_LABELS:
+            self._set(label_id, texts[label_id])
+        if self._waveform.display != is_playing:
+            self._waveform.display = is_playing
+
+    def _render_track(self, song: dict, is_playing: bool, cells: list[dict]) -> dict[str, str]:
+        """Build the markup for every track label."""
+        texts: dict[str, str] = {}
+
         # Now playing indicator
-        self.query_one("#info_now_playing", Label).update(
+        texts["info_now_playing"] = (
             "[bold green reverse] ▶  NOW PLAYING [/bold green reverse]" if is_playing else ""
         )
-        self.query_one(WaveformWidget).display = is_playing
 
         # Title — big and loud
         title = song.get("title") or ""
-        self.query_one("#info_title", Label).update(
-            f"\n[bold bright_yellow]{title.upper()}[/bold bright_yellow]" if title else ""
-        )
+        texts["info_title"] = f"\n[bold bright_yellow]{title.upper()}[/bold bright_yellow]" if title else ""
 
         # Artist — softer, indented feel
         artist = song.get("artist") or ""
-        self.query_one("#info_artist", Label).update(
-            f"[italic cyan]  {artist}[/italic cyan]" if artist else ""
-        )
+        texts["info_artist"] = f"[italic cyan]  {artist}[/italic cyan]" if artist else ""
 
         # Separator
-        self.query_one("#info_sep", Label).update(
-            "\n[dim]  ·  ·  ·  ·  ·  ·  ·  ·  ·  ·  ·  ·[/dim]\n" if (title or artist) else ""
-        )
+        texts["info_sep"] = "\n[dim]  ·  ·  ·  ·  ·  ·  ·  ·  ·  ·  ·  ·[/dim]\n" if (title or artist) else ""
 
         # Metadata rows — each field gets its own color
         def row(color: str, icon: str, label: str, val) -> str:
@@ -89,32 +143,34 @@ class TrackInfoPanel(Container):
                 return ""
             return f"  [bold {color}]{icon} {label:<7}[/bold {color}]  {val}"
 
-        self.query_one("#info_album", Label).update(row("magenta",     "◆", "ALBUM",  song.get("album")))
-        self.query_one("#info_genre", Label).update(row("blue",        "◆", "GENRE",  song.get("genre")))
-        self.query_one("#info_date",  Label).update(row("yellow",      "◆", "YEAR",   song.get("date")))
-        self.query_one("#info_bpm",   Label).update(row("green",       "◆", "BPM",    song.get("bpm")))
+        texts["info_album"] = row("magenta",     "◆", "ALBUM",  song.get("album"))
+        texts["info_genre"] = row("blue",        "◆", "GENRE",  song.get("genre"))
+        texts["info_date"]  = row("yellow",      "◆", "YEAR",   song.get("date"))
+        texts["info_bpm"]   = row("green",       "◆", "BPM",    song.get("bpm"))
 
-        # Feedback history
-        entries = feedback_history or []
+        # Feedback, one column per mood cell with its average rating
         lines = [
             "\n[dim]  ·  ·  ·  ·  ·  ·  ·  ·  ·  ·  ·  ·[/dim]",
             "",
             "  [bold cyan]◆ FEEDBACK[/bold cyan]",
             "",
         ]
-        if not entries:
+        if not cells:
             lines.append("  [dim]None[/dim]")
         else:
             sep = "   [dim]│[/dim]   "
-            moods   = [_squares(int(e.get("mood_pleasure") or 0), 5, "magenta") for e in entries]
-            energies = [_squares(int(e.get("mood_arousal")  or 0), 5, "yellow")  for e in entries]
-            ratings  = [_squares(int(e.get("rating")        or 0), 3, "green") + "    " for e in entries]
+            moods    = [_squares(int(c["mood_pleasure"]), 5, "magenta") for c in cells]
+            energies = [_squares(int(c["mood_arousal"]),  5, "yellow")  for c in cells]
+            ratings  = [_squares(round(c["rating_sum"] / c["count"]), 3, "green") + "    " for c in cells]
+            counts   = [f"[dim]×{c['count']:<8}[/dim]" for c in cells]
             lines.append(f"  [dim]MOOD  [/dim]  " + sep.join(moods))
             lines.append(f"  [dim]ENERGY[/dim]  " + sep.join(energies))
             lines.append(f"  [dim]RATING[/dim]  " + sep.join(ratings))
+            lines.append(f"  [dim]TIMES [/dim]  " + sep.join(counts))
 
-        self.query_one("#info_feedback_sep", Label).update("")
-        self.query_one("#info_feedback", Label).update("\n".join(lines))
+        texts["info_feedback_sep"] = ""
+        texts["info_feedback"] = "\n".join(lines)
+        return texts
 
     def set_station_mood(
         self,
@@ -123,17 +179,15 @@ class TrackInfoPanel(Container):
         station_score: float | None = None,
     ) -> None:
         """Show the session station mood and per-song rating, or clear both."""
-        mood_lbl   = self.query_one("#info_station_mood",   Label)
-        rating_lbl = self.query_one("#info_station_rating", Label)
         if pleasure is None or arousal is None:
-            mood_lbl.update("")
-            rating_lbl.update("")
+            self._set("info_station_mood", "")
+            self._set("info_station_rating", "")
             return
 
         # Left: station mood
         mood   = _squares(pleasure, 5, "magenta")
         energy = _squares(arousal,  5, "yellow")
-        mood_lbl.update("\n".join([
+        self._set("info_station_mood", "\n".join([
             "\n[dim]  ·  ·  ·  ·  ·  ·  ·  ·  ·[/dim]",
             "",
             "  [bold magenta]◈ STATION MOOD[/bold magenta]",
@@ -148,7 +202,7 @@ class TrackInfoPanel(Container):
             stars_int = max(1, min(5, round(stars_val)))
         else:
             stars_int = 3
-        rating_lbl.update("\n".join([
+        self._set("info_station_rating", "\n".join([
             "\n[dim]  ·  ·  ·  ·  ·  ·  ·  ·  ·[/dim]",
             "",
             "  [bold magenta]◈ RATING FOR STATION[/bold magenta]",
@@ -1,52 +1,91 @@
-import math
-from rich.text import Text
+import numpy as np
+from rich.segment import Segment
+from rich.style import Style
+from textual.strip import Strip
 from textual.widget import Widget
 
+from core.analysis import WAVEFORM_BINS, decode_envelope
+
 # Eight sub-cell heights from lowest to highest
 _CHARS = " ▁▂▃▄▅▆▇█"
 
+# Row 0 shows peak level, row 1 RMS level; already-played columns are dimmed
+_ROW_STYLES = [Style.parse("green"), Style.parse("cyan")]
+_PLAYED_STYLES = [Style.parse("dim green"), Style.parse("dim cyan")]
+
+_INDENT = 2
+
+
+def _synthetic_envelope() -> tuple[np.ndarray, np.ndarray]:
+    """Two overlapping sine waves, computed once, for tracks with no analysed envelope."""
+    x = np.arange(WAVEFORM_BINS)
+    peak = np.sin(x * 0.30) * 0.6 + np.sin(x * 0.13) * 0.4
+    rms = np.sin(x * 0.30 + np.pi) * 0.6 + np.sin(x * 0.13 + np.pi * 0.71) * 0.4
+    return (peak + 1) / 2, (rms + 1) / 2
+
+
+_SYNTHETIC = _synthetic_envelope()
+
 
 class WaveformWidget(Widget):
     """
-    A compact two-row animated waveform shown in the track info panel.
-    Row 0: green sine wave.  Row 1: cyan counter-phase sine wave.
-    Pure decoration — not connected to audio data.
+    A compact two-row waveform shown in the track info panel.
+    Row 0: green peak level.  Row 1: cyan RMS level.
+
+    Shows the track's stored envelope scrolling past a playhead in the
+    middle of the widget, or a synthetic wave when the track hasn't been
+    analysed. Glyph rows are built once per envelope and width; a frame is
+    a slice of them, and the widget only repaints when the playhead moves
+    to a new bin.
     """
 
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
-        self._phase = 0.0
-
-    def on_mount(self) -> None:
-        self.set_interval(0.08, self._tick)  # ~12 fps
+        self._levels = _SYNTHETIC
+        self._glyphs: dict[int, tuple[str, str]] = {}
+        self._bin = 0
 
-    def _tick(self) -> None:
-        self._phase += 0.28
+    def set_envelope(self, envelope: bytes | None) -> None:
+        """Show a stored envelope (see core.analysis), or the synthetic wave for None."""
+        self._levels = decode_envelope(envelope) if envelope else _SYNTHETIC
+        self._glyphs.clear()
+        self._bin = 0
         self.refresh()
 
-    def render(self) -> Text:
+    def set_position(self, progress: float) -> None:
+        """Move the playhead to `progress` (0.0–1.0) through the track."""
+        bins = len(self._levels[0])
+        position = max(0, min(bins - 1, int(progress * bins)))
+        if position != self._bin:
+            self._bin = position
+            self.refresh()
+
+    def _glyph_rows(self, draw_w: int) -> tuple[str, str]:
+        """The whole envelope as two glyph strings, padded so any playhead position can be sliced."""
+        rows = self._glyphs.get(draw_w)
+        if rows is None:
+            pad = " " * (draw_w // 2)
+            top = len(_CHARS) - 1
+            rows = tuple(
+                pad + "".join(_CHARS[i] for i in np.rint(level * top).astype(int).tolist()) + pad
+                for level in self._levels
+            )
+            self._glyphs[draw_w] = rows
+        return rows
+
+    def render_line(self, y: int) -> Strip:
         w = self.size.width
-        draw_w = w - 4          # leave a 2-char indent on each side
-        if draw_w <= 0:
-            return Text("")
-
-        result = Text()
-        for row in range(2):
-            phase = self._phase + (math.pi if row == 1 else 0.0)
-            color = "green" if row == 0 else "cyan"
-
-            result.append("  ")
-            for x in range(draw_w):
-                # Two overlapping sine waves for a more organic shape
-                val = (
-                    math.sin(x * 0.30 + phase) * 0.6 +
-                    math.sin(x * 0.13 + phase * 0.71) * 0.4
-                )
-                normalized = (val + 1) / 2           # 0.0 – 1.0
-                idx = int(normalized * (len(_CHARS) - 1))
-                result.append(_CHARS[idx], style=color)
-
-            if row == 0:
-                result.append("\n")
-
-        return result
+        draw_w = w - 2 * _INDENT     # leave a 2-char indent on each side
+        base = self.rich_style
+        if draw_w <= 0 or y > 1:
+            return Strip.blank(w, base)
+
+        # Column draw_w // 2 is the playhead; everything left of it has played
+        window = self._glyph_rows(draw_w)[y][self._bin: self._bin + draw_w]
+        played = draw_w // 2
+        strip = Strip([
+            Segment(" " * _INDENT, base),
+            Segment(window[:played], base + _PLAYED_STYLES[y]),
+            Segment(window[played:], base + _ROW_STYLES[y]),
+        ])
+        return strip.crop_extend(0, w, base)